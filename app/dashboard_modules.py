@@ -3,6 +3,7 @@ from django.db.models import Count
 from jet.dashboard.modules import DashboardModule
 
 from applications.models import Application
+from stats.models import StatsCounter
 from user.models import User
 
 
@@ -49,11 +50,11 @@ class AppsStats(DashboardModule):
         self.status = settings.get('status', self.status)
 
     def init_with_context(self, context):
-        qs = Application.objects.all()
-
-        if self.status != '__all__':
-            qs = qs.filter(status=self.status)
-
-        self.tshirts = qs.values('tshirt_size') \
-            .annotate(count=Count('tshirt_size'))
-        self.diets = qs.values('diet').annotate(count=Count('diet'))
+        statuses = None if self.status == '__all__' else [self.status]
+        status_names = dict(Application.STATUS)
+
+        self.tshirts = [{'tshirt_size': tshirt_size, 'count': count}
+                        for tshirt_size, count in StatsCounter.counts('tshirt_size', statuses).items()]
+        self.diets = [{'diet': diet, 'count': count} for diet, count in StatsCounter.counts('diet', statuses).items()]
+        self.count_status = [{'status': status_names.get(status, status), 'count': count}
+                             for status, count in StatsCounter.counts('status', statuses).items()]
@@ -1,11 +1,68 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
 from django.conf import settings
 from django.core.mail import EmailMultiAlternatives, EmailMessage
+from django.db import connections
 from django.template import TemplateDoesNotExist
-from django.template.loader import render_to_string
+from django.template.loader import get_template
 
 from app import utils
 
 FROM_EMAIL = settings.HACKATHON_NAME + ' Team <' + settings.HACKATHON_CONTACT_EMAIL + '>'
+# Smaller batches are rendered in the calling process, starting the workers would take longer than rendering them
+PARALLEL_RENDER_MIN_EMAILS = 200
+
+
+class MailRenderer:
+    """
+    Renders one e-mail for many recipients. Templates are loaded and compiled once
+    and the context shared by every recipient is computed once, so each e-mail
+    only costs the rendering itself.
+    """
+
+    def __init__(self, template_prefix, substitutions=None, from_email=FROM_EMAIL, action_required=False):
+        self.from_email = from_email
+        self.subject_template = get_template('{0}_subject.txt'.format(template_prefix))
+        self.body_templates = {}
+        for ext in ['html', 'txt']:
+            try:
+                template_name = '{0}_message.{1}'.format(template_prefix, ext)
+                self.body_templates[ext] = get_template(template_name)
+            except TemplateDoesNotExist:
+                if ext == 'txt' and not self.body_templates:
+                    # We need at least one body
+                    raise
+        self.substitutions = substitutions or {}
+        self.hackathon_substitutions = utils.get_substitutions_templates()
+        self.prefix = '[' + settings.HACKATHON_NAME + ']'
+        if action_required:
+            self.prefix = '[ACTION REQUIRED]'
+
+    def render(self, recipient_email, substitutions):
+        context = dict(self.substitutions, **substitutions)
+        context.update(self.hackathon_substitutions)
+        subject = self.subject_template.render(context)
+        # remove superfluous line breaks
+        subject = " ".join(subject.splitlines()).strip()
+        subject = self.prefix + ' ' + subject
+        context.update({'subject': subject})
+
+        bodies = {ext: template.render(context).strip() for ext, template in self.body_templates.items()}
+        if 'txt' in bodies:
+            msg = EmailMultiAlternatives(subject,
+                                         bodies['txt'],
+                                         self.from_email,
+                                         [recipient_email])
+            if 'html' in bodies:
+                msg.attach_alternative(bodies['html'], 'text/html')
+        else:
+            msg = EmailMessage(subject,
+                               bodies['html'],
+                               self.from_email,
+                               [recipient_email])
+            msg.content_subtype = 'html'  # Main content is now text/html
+        return msg
 
 
 def render_mail(template_prefix, recipient_email, substitutions,
@@ -14,41 +71,48 @@ def render_mail(template_prefix, recipient_email, substitutions,
     Renders an e-mail to `email`.  `template_prefix` identifies the
     e-mail that is to be sent, e.g. "account/email/email_confirmation"
     """
-    substitutions.update(utils.get_substitutions_templates())
-    subject = render_to_string('{0}_subject.txt'.format(template_prefix),
-                               context=substitutions)
-    # remove superfluous line breaks
-    subject = " ".join(subject.splitlines()).strip()
-    prefix = '[' + settings.HACKATHON_NAME + ']'
-    if action_required:
-        prefix = '[ACTION REQUIRED]'
-    subject = prefix + ' ' + subject
-    substitutions.update({'subject': subject})
-
-    bodies = {}
-    for ext in ['html', 'txt']:
-        try:
-            template_name = '{0}_message.{1}'.format(template_prefix, ext)
-            bodies[ext] = render_to_string(template_name,
-                                           substitutions).strip()
-        except TemplateDoesNotExist:
-            if ext == 'txt' and not bodies:
-                # We need at least one body
-                raise
-    if 'txt' in bodies:
-        msg = EmailMultiAlternatives(subject,
-                                     bodies['txt'],
-                                     from_email,
-                                     [recipient_email])
-        if 'html' in bodies:
-            msg.attach_alternative(bodies['html'], 'text/html')
-    else:
-        msg = EmailMessage(subject,
-                           bodies['html'],
-                           from_email,
-                           [recipient_email])
-        msg.content_subtype = 'html'  # Main content is now text/html
-    return msg
+    return MailRenderer(template_prefix, from_email=from_email,
+                        action_required=action_required).render(recipient_email, substitutions)
+
+
+# Renderer of each worker process of render_mails
+_worker_renderer = None
+
+
+def _init_render_worker(*args):
+    global _worker_renderer
+    _worker_renderer = MailRenderer(*args)
+
+
+def _render_in_worker(recipient):
+    return _worker_renderer.render(*recipient)
+
+
+def render_mails(template_prefix, recipients, substitutions=None,
+                 from_email=FROM_EMAIL, action_required=False, processes=None):
+    """
+    Batch version of render_mail. Big batches are rendered by a pool of
+    processes, each one compiling the templates once.
+    :param recipients: list of (recipient email, substitutions of the recipient)
+    :param substitutions: substitutions shared by every recipient
+    :param processes: number of processes, by default one per CPU for
+    batches of at least PARALLEL_RENDER_MIN_EMAILS
+    :return: list of messages in the same order as recipients, ready to be sent
+    through a single connection
+    """
+    recipients = list(recipients)
+    args = (template_prefix, substitutions, from_email, action_required)
+    if processes is None:
+        processes = (os.cpu_count() or 1) if len(recipients) >= PARALLEL_RENDER_MIN_EMAILS else 1
+    # Database connections can't be shared with the workers, and closing them would break the transaction
+    if processes <= 1 or any(conn.in_atomic_block for conn in connections.all()):
+        renderer = MailRenderer(*args)
+        return [renderer.render(*recipient) for recipient in recipients]
+    # Workers open their own connections if a template needs the database
+    connections.close_all()
+    with ProcessPoolExecutor(processes, initializer=_init_render_worker, initargs=args) as executor:
+        return list(executor.map(_render_in_worker, recipients,
+                                 chunksize=max(1, len(recipients) // (processes * 4))))
 
 
 def send_email(template_prefix, recipient_email, substitutions,
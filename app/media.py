@@ -0,0 +1,108 @@
+import mimetypes
+import os
+import re
+from urllib.parse import quote
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+
+# Protected files can only be cached by the browser of the user that was allowed to download them. They are checked
+# again with the ETag, so a file replaced under the same name is never shown stale.
+MEDIA_CACHE_CONTROL = 'private, no-cache'
+# Image copies are named after their content, so they never change
+DERIVATIVE_CACHE_CONTROL = 'private, max-age=31536000, immutable'
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+CHUNK_SIZE = 64 * 1024
+
+
+# Same format as the ETags of nginx, so they match whoever sends the file
+def media_etag(stat):
+    return '"%x-%x"' % (int(stat.st_mtime), stat.st_size)
+
+
+def parse_range(header, size):
+    """
+    Parses a single range Range header.
+    :return: (start, end) both included, None if the whole file should be sent or False if it can't be satisfied
+    """
+    match = RANGE_RE.match(header.strip())
+    # Multiple ranges are rare enough to just send the whole file
+    if not match or match.groups() == ('', ''):
+        return None
+    start, end = match.groups()
+    if not start:
+        # Last bytes of the file
+        start, end = max(size - int(end), 0), size - 1
+    else:
+        start, end = int(start), min(int(end), size - 1) if end else size - 1
+    if start >= size or start > end:
+        return False
+    return start, end
+
+
+def file_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(CHUNK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+def send_file(path, name, content_type):
+    """
+    Response with the whole file, sent by the front proxy when MEDIA_SENDFILE is set and by the WSGI server
+    (with sendfile where available) otherwise.
+    """
+    sendfile = getattr(settings, 'MEDIA_SENDFILE', '')
+    if sendfile == 'nginx':
+        response = HttpResponse(content_type=content_type)
+        response['X-Accel-Redirect'] = settings.MEDIA_ACCEL_REDIRECT_URL + quote(name)
+    elif sendfile == 'apache':
+        response = HttpResponse(content_type=content_type)
+        response['X-Sendfile'] = path
+    else:
+        # FileResponse closes the file once sent
+        response = FileResponse(open(path, 'rb'), content_type=content_type)
+    return response
+
+
+def serve_media(request, path, name):
+    """
+    Serves a media file the user has already been allowed to download, with ETag, Last-Modified and Range support.
+    :param path: local path of the file
+    :param name: storage name of the file
+    """
+    file_name = os.path.basename(name)
+    content_type = mimetypes.guess_type(file_name)[0] or 'application/octet-stream'
+    stat = os.stat(path)
+    etag = media_etag(stat)
+    response = get_conditional_response(request, etag=etag, last_modified=int(stat.st_mtime))
+    if response is None:
+        byte_range = None
+        if request.META.get('HTTP_RANGE') and request.META.get('HTTP_IF_RANGE', etag) == etag:
+            byte_range = parse_range(request.META['HTTP_RANGE'], stat.st_size)
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = 'bytes */%s' % stat.st_size
+        elif byte_range and getattr(settings, 'MEDIA_SENDFILE', ''):
+            # The front proxy answers the range itself
+            response = send_file(path, name, content_type)
+        elif byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(file_range(path, start, end - start + 1), status=206,
+                                             content_type=content_type)
+            response['Content-Range'] = 'bytes %s-%s/%s' % (start, end, stat.st_size)
+            response['Content-Length'] = end - start + 1
+        else:
+            response = send_file(path, name, content_type)
+        response['Content-Disposition'] = 'attachment; filename*=UTF-8\'\'%s' % quote(file_name)
+        response['Accept-Ranges'] = 'bytes'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = DERIVATIVE_CACHE_CONTROL if name.startswith('derivatives/') else MEDIA_CACHE_CONTROL
+    return response
@@ -1,4 +1,18 @@
+import csv
+import tempfile
+from datetime import datetime
+from itertools import islice
+
+from django.core.exceptions import FieldDoesNotExist
 from django.forms import model_to_dict
+from django.http import FileResponse, StreamingHttpResponse
+from django.utils import timezone
+from django_tables2 import RequestConfig
+from django_tables2.export import ExportMixin
+from openpyxl import Workbook
+
+# Rows fetched at once from the database cursor
+EXPORT_CHUNK_SIZE = 2000
 
 
 class TabsViewMixin(object):
@@ -39,3 +53,93 @@ class OverwriteOnlyModelFormMixin(object):
         model_data = model_to_dict(self.instance)
         model_data.update(cleaned_data)
         return model_data
+
+
+class Echo(object):
+    """File-like object that returns what is written, so csv.writer can produce lines to stream"""
+
+    def write(self, value):
+        return value
+
+
+class StreamingExportMixin(ExportMixin):
+    """
+    ExportMixin that streams CSV and XLSX exports. Only the model fields of the exported columns are read, with
+    values_list and a server-side cursor, so memory stays constant no matter how many rows are exported. Columns that
+    are not model fields (e.g. buttons) are left out. Other formats are exported by ExportMixin.
+    """
+    XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+
+    def render_to_response(self, context, **kwargs):
+        export_format = self.request.GET.get(self.export_trigger_param, None)
+        if export_format == 'csv':
+            return self.stream_csv()
+        if export_format == 'xlsx':
+            return self.stream_xlsx()
+        return super(StreamingExportMixin, self).render_to_response(context, **kwargs)
+
+    def get_export_columns(self, table):
+        """:return: list of (header, ORM lookup, model field) of the exported columns"""
+        columns = []
+        for column in table.columns:
+            if column.name in self.exclude_columns or column.column.exclude_from_export:
+                continue
+            model, field, lookup = table._meta.model, None, []
+            try:
+                for name in str(column.accessor).split('.'):
+                    if field is not None:
+                        model = field.related_model
+                    field = model._meta.get_field(name)
+                    lookup.append(name)
+            except (AttributeError, FieldDoesNotExist):
+                continue
+            columns.append((str(column.header), '__'.join(lookup), field))
+        return columns
+
+    def export_rows(self):
+        """Yields the headers and then the rows of the export, values as shown in the table"""
+        table = self.get_table_class()(data=self.get_table_data(), **self.get_table_kwargs())
+        # Applies the ordering of the request
+        RequestConfig(self.request, paginate=False).configure(table)
+        columns = self.get_export_columns(table)
+        yield [header for header, _, _ in columns]
+        rows = table.data.data.values_list(*[lookup for _, lookup, _ in columns]).iterator(EXPORT_CHUNK_SIZE)
+        while True:
+            chunk = list(islice(rows, EXPORT_CHUNK_SIZE))
+            if not chunk:
+                break
+            converters = []
+            for index, (_, _, field) in enumerate(columns):
+                if field.is_relation:
+                    # Related objects are shown by their name, loaded once per chunk
+                    related = field.related_model.objects.in_bulk({row[index] for row in chunk} - {None})
+                    converters.append(lambda value, related=related: str(related[value]) if value in related else '')
+                elif field.choices:
+                    choices = dict(field.flatchoices)
+                    converters.append(lambda value, choices=choices: choices.get(value, value))
+                else:
+                    converters.append(None)
+            for row in chunk:
+                yield ['' if value is None else converter(value) if converter else value
+                       for value, converter in zip(row, converters)]
+
+    def stream_csv(self):
+        writer = csv.writer(Echo())
+        response = StreamingHttpResponse((writer.writerow(row) for row in self.export_rows()),
+                                         content_type='text/csv; charset=utf-8')
+        response['Content-Disposition'] = 'attachment; filename="{}"'.format(self.get_export_filename('csv'))
+        return response
+
+    def stream_xlsx(self):
+        # Write-only workbooks keep the rows in a temporary file instead of in memory
+        workbook = Workbook(write_only=True)
+        sheet = workbook.create_sheet()
+        for row in self.export_rows():
+            # Excel does not support timezones
+            sheet.append([timezone.localtime(value).replace(tzinfo=None)
+                          if isinstance(value, datetime) and timezone.is_aware(value) else value for value in row])
+        output = tempfile.TemporaryFile()
+        workbook.save(output)
+        output.seek(0)
+        return FileResponse(output, as_attachment=True, filename=self.get_export_filename('xlsx'),
+                            content_type=self.XLSX_CONTENT_TYPE)
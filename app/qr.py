@@ -0,0 +1,76 @@
+import hashlib
+from email.mime.image import MIMEImage
+from io import BytesIO
+
+import qrcode
+from django.conf import settings
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+# QR images never change for the same data, so they are generated once and kept in the storage
+QR_PATH = 'qr/{0}.png'
+QR_SALT = 'app.qr'
+QR_BOX_SIZE = 10
+QR_BORDER = 2
+
+
+def qr_hash(data):
+    # Badge identifiers are free text, hash them so they are always valid file names
+    return hashlib.sha256(str(data).encode('utf-8')).hexdigest()
+
+
+def render_qr(data):
+    """:return: PNG image of the QR code of data"""
+    qr = qrcode.QRCode(error_correction=qrcode.constants.ERROR_CORRECT_M, box_size=QR_BOX_SIZE, border=QR_BORDER)
+    qr.add_data(str(data))
+    qr.make(fit=True)
+    image = BytesIO()
+    # 1-bit images keep the PNG at a few hundred bytes
+    qr.make_image().save(image, format='PNG')
+    return image.getvalue()
+
+
+def get_qr(data):
+    """:return: PNG image of the QR code of data, rendered only the first time it is requested"""
+    path = QR_PATH.format(qr_hash(data))
+    if default_storage.exists(path):
+        with default_storage.open(path, 'rb') as f:
+            return f.read()
+    image = render_qr(data)
+    default_storage.save(path, ContentFile(image))
+    return image
+
+
+def qr_url(data):
+    """
+    URL of the QR image of data. Data is signed so that only QR codes issued by us are generated and stored, and
+    the URL is always the same so browsers can keep the image.
+    """
+    return reverse('qr_code', kwargs={'token': signing.Signer(salt=QR_SALT).sign(str(data))})
+
+
+def qr_data(token):
+    """:return: data of a token from qr_url, None if it was not issued by us"""
+    try:
+        return signing.Signer(salt=QR_SALT).unsign(token)
+    except signing.BadSignature:
+        return None
+
+
+def qr_content_id(data):
+    return 'qr-{0}@{1}'.format(qr_hash(data)[:16], settings.HACKATHON_DOMAIN)
+
+
+def attach_qr(message, data):
+    """
+    Attaches the QR image of data inline to message, where templates can show it with the URL cid:<qr_content_id>
+    """
+    image = MIMEImage(get_qr(data), 'png')
+    image.add_header('Content-ID', '<{0}>'.format(qr_content_id(data)))
+    image.add_header('Content-Disposition', 'inline', filename='qr.png')
+    # Inline images have to be related to the body instead of being regular attachments
+    message.mixed_subtype = 'related'
+    message.attach(image)
+    return message
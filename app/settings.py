@@ -88,6 +88,8 @@ INSTALLED_APPS = [
     'blog',
     'taggit',
     'blogadmin',
+    'outbox',
+    'derivatives',
 ]
 
 
@@ -241,6 +243,11 @@ APPLICATIONS_STATIC_URL = BASE_DIR + '/applications/static/'
 #  File upload configuration
 MEDIA_ROOT = 'files'
 MEDIA_URL = '/files/'
+# Protected files are sent by the front proxy after checking permissions: 'nginx' with X-Accel-Redirect to
+# MEDIA_ACCEL_REDIRECT_URL (an internal location aliased to MEDIA_ROOT) or 'apache' with X-Sendfile. Empty sends
+# them from Django.
+MEDIA_SENDFILE = os.environ.get('MEDIA_SENDFILE', '')
+MEDIA_ACCEL_REDIRECT_URL = os.environ.get('MEDIA_ACCEL_REDIRECT_URL', '/protected-files/')
 
 EXPORT_FILES_URL = BASE_DIR + MEDIA_URL
 
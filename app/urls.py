@@ -25,6 +25,7 @@ urlpatterns = [
     url(r'privacy_and_cookies/$', views.privacy_and_cookies, name='privacy_and_cookies'),
     url(r'terms_and_conditions/$', views.terms_and_conditions, name='terms_and_conditions'),
     url(r'^files/(?P<file_>.*)$', views.protectedMedia, name="protect_media"),
+    url(r'^qr/(?P<token>.+)\.png$', views.qr_code, name='qr_code'),
     url(r'^meals/', include('meals.urls')),
     url(r'^judging/', include('judging.urls')),
     url(r'^workshops/', include('workshops.urls')),
@@ -8,10 +8,11 @@ from django.utils.functional import keep_lazy_text
 
 
 def reverse(viewname, args=None, kwargs=None, request=None, format=None,
-            **extra):
+            base_url=None, **extra):
     """
     Same as `django.urls.reverse`, but optionally takes a request
     and returns a fully qualified URL, using the request to get the base URL.
+    Without a request (e.g. in background jobs) the base URL can be given instead.
     """
     if format is not None:
         kwargs = kwargs or {}
@@ -19,6 +20,8 @@ def reverse(viewname, args=None, kwargs=None, request=None, format=None,
     url = django_reverse(viewname, args=args, kwargs=kwargs, **extra)
     if request:
         return request.build_absolute_uri(url)
+    if base_url:
+        return base_url.rstrip('/') + url
     return url
 
 
@@ -1,18 +1,18 @@
 import os
-from urllib.parse import quote
 
+from django.apps import apps
 from django.conf import settings
-from django.http import HttpResponseRedirect
-from django.http import StreamingHttpResponse
-# from baggage.models import Bag
+from django.core.files.storage import default_storage
+from django.http import Http404, HttpResponse, HttpResponseNotModified, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from django.shortcuts import render
 from django.urls import reverse
 from django.views.generic import TemplateView
 
-from app import mixins
+from app import media, mixins, qr
 from applications.models import Application
 from blog.models import Blog
+from derivatives.models import ImageDerivative
 from user.models import User
 from sponsors.models import SponsorApplication
 from reimbursement.models import Reimbursement
@@ -50,7 +50,8 @@ def terms_and_conditions(request):
     return render(request, 'terms_and_conditions.html')
 
 
-def protectedMedia(request, file_):
+def media_path(request, file_):
+    """:return: local path of a media file if the user can download it, None otherwise"""
     path, file_name = os.path.split(file_)
     downloadable_path = None
     if path == "resumes":
@@ -62,14 +63,17 @@ def protectedMedia(request, file_):
         blog = get_object_or_404(Blog, thumbnail=file_)
         downloadable_path = blog.thumbnail.path
     elif path == "user/profile_pictures":
-        user = get_object_or_404(User, thumbnail=file_)
+        user = User.objects.filter(profile_picture=file_).first()
+        if user is None:
+            raise Http404
         downloadable_path = user.profile_picture.path
     elif path == "receipt":
         app = get_object_or_404(Reimbursement, receipt=file_)
         if request.user.is_authenticated and (request.user.is_organizer or
                                               (app and (app.hacker_id == request.user.id))):
             downloadable_path = app.receipt.path
-    elif path == "baggage":
+    elif path == "baggage" and apps.is_installed('baggage'):
+        from baggage.models import Bag
         bag = get_object_or_404(Bag, image=file_)
         if request.user.is_authenticated and (request.user.is_organizer or request.user.is_volunteer):
             downloadable_path = bag.image.path
@@ -77,17 +81,41 @@ def protectedMedia(request, file_):
         sponsor_logo = get_object_or_404(SponsorApplication, company_logo=file_)
         if request.user.is_authenticated and (request.user.is_organizer or request.user.is_volunteer):
             downloadable_path = sponsor_logo.company_logo.path
+    elif path.startswith("derivatives/"):
+        # Copies can be downloaded by whoever can download one of their originals
+        for source in ImageDerivative.objects.filter(name=file_).values_list('source', flat=True).distinct():
+            try:
+                if media_path(request, source):
+                    return default_storage.path(file_)
+            except Http404:
+                pass
+    return downloadable_path
+
+
+def protectedMedia(request, file_):
+    downloadable_path = media_path(request, file_)
     if downloadable_path:
-        response = StreamingHttpResponse(open(downloadable_path, 'rb'))
-        response['Content-Type'] = ''
-        response['Content-Disposition'] = 'attachment; filename*=UTF-8\'\'%s' % quote(file_name)
-        response['Content-Transfer-Encoding'] = 'binary'
-        response['Expires'] = '0'
-        response['Cache-Control'] = 'must-revalidate'
-        response['Pragma'] = 'public'
-        return response
+        return media.serve_media(request, downloadable_path, file_)
     return HttpResponseRedirect(reverse('account_login'))
 
 
+# QR images of the same URL never change
+QR_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+
+def qr_code(request, token):
+    data = qr.qr_data(token)
+    if data is None:
+        raise Http404
+    etag = '"%s"' % qr.qr_hash(data)
+    if request.META.get('HTTP_IF_NONE_MATCH') == etag:
+        response = HttpResponseNotModified()
+    else:
+        response = HttpResponse(qr.get_qr(data), content_type='image/png')
+    response['ETag'] = etag
+    response['Cache-Control'] = QR_CACHE_CONTROL
+    return response
+
+
 class TabsView(mixins.TabsViewMixin, TemplateView):
     pass
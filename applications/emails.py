@@ -1,25 +1,37 @@
 import typing as t
 
 from django.conf import settings
-from django.core import mail
 
-from app import emails
+from app import emails, qr
 from app.utils import reverse
 
 from applications.models import Application
+from outbox.models import EmailOutbox
 
-def create_invite_email(application, request):
-    c = {
+def invite_context(application, request, base_url=None):
+    return {
         'name': application.user.get_full_name,
         'reimb': getattr(application.user, 'reimbursement', None),
-        'confirm_url': str(reverse('confirm_app', request=request, kwargs={'id': application.uuid_str})),
-        'cancel_url': str(reverse('cancel_app', request=request, kwargs={'id': application.uuid_str})),
-        'IS_ONLINE_HACKATHON': settings.IS_ONLINE_HACKATHON,
+        'confirm_url': str(reverse('confirm_app', request=request, base_url=base_url,
+                                   kwargs={'id': application.uuid_str})),
+        'cancel_url': str(reverse('cancel_app', request=request, base_url=base_url,
+                                  kwargs={'id': application.uuid_str})),
     }
+
+
+def create_invite_email(application, request):
+    c = invite_context(application, request)
+    c['IS_ONLINE_HACKATHON'] = settings.IS_ONLINE_HACKATHON
     return emails.render_mail('mails/invitation',
                               application.user.email, c)
 
 
+def create_invite_emails(applications, request, base_url=None):
+    return emails.render_mails('mails/invitation',
+                               [(app.user.email, invite_context(app, request, base_url)) for app in applications],
+                               {'IS_ONLINE_HACKATHON': settings.IS_ONLINE_HACKATHON})
+
+
 def create_waitlist_email(application, request):
     c = {
         'name': application.user.get_full_name
@@ -28,21 +40,29 @@ def create_waitlist_email(application, request):
                               application.user.email, c)
 
 
+def create_waitlist_emails(applications):
+    return emails.render_mails('mails/waitlist',
+                               [(app.user.email, {'name': app.user.get_full_name}) for app in applications])
+
+
 def create_confirmation_email(application, request):
     c = {
         'name': application.user.get_full_name,
         'token': application.uuid_str,
-        'qr_url': 'http://chart.googleapis.com/chart?cht=qr&chs=350x350&chl=%s'
-                  % application.uuid_str,
+        # The QR image goes inline with the e-mail
+        'qr_url': 'cid:%s' % qr.qr_content_id(application.uuid_str),
         'cancel_url': str(reverse('cancel_app', request=request, kwargs={'id': application.uuid_str})),
         'IS_ONLINE_HACKATHON': settings.IS_ONLINE_HACKATHON,
     }
-    return emails.render_mail('mails/confirmation',
-                              application.user.email, c)
+    msg = emails.render_mail('mails/confirmation',
+                             application.user.email, c)
+    if not settings.IS_ONLINE_HACKATHON:
+        qr.attach_qr(msg, application.uuid_str)
+    return msg
 
 
-def create_lastreminder_email(application):
-    c = {
+def lastreminder_context(application):
+    return {
         'name': application.user.get_full_name,
         # We need to make sure to redirect HTTP to HTTPS in production
         'confirm_url': 'http://%s%s' % (settings.HACKATHON_DOMAIN,
@@ -50,29 +70,60 @@ def create_lastreminder_email(application):
         'cancel_url': 'http://%s%s' % (settings.HACKATHON_DOMAIN,
                                        reverse('cancel_app', kwargs={'id': application.uuid_str})),
     }
+
+
+def create_lastreminder_email(application):
     return emails.render_mail('mails/last_reminder',
-                              application.user.email, c, action_required=True)
+                              application.user.email, lastreminder_context(application), action_required=True)
 
 
-def send_batch_emails(emails):
-    connection = mail.get_connection()
-    connection.send_messages(emails)
+def create_lastreminder_emails(applications):
+    return emails.render_mails('mails/last_reminder',
+                               [(app.user.email, lastreminder_context(app)) for app in applications],
+                               action_required=True)
 
 
-def create_online_checkin_email(application: Application) -> t.Any:
-    context = {
+def send_batch_emails(emails, template_prefix, object_keys):
+    """
+    Queues the e-mails for the send_outbox command, which delivers them throttled. E-mails already queued for the
+    same recipient and object are skipped.
+    :return: number of e-mails queued
+    """
+    return EmailOutbox.enqueue(template_prefix, emails, object_keys)
+
+
+POST_EVENT_CONTEXT = {
+    'recruit_url': 'https://ugeorgia.ca1.qualtrics.com/jfe/form/SV_5orFOdgzddQwY74',
+    'cert_url': 'https://my.ugahacks.com/static/docs/proof_of_attendance.pdf',
+    'photos_url': 'https://photos.google.com/share/AF1QipPftVrQsQ2hrI0biMNr5qdGpRBx1rn89GHhJR87u4NaelK61_m7DYCnnoc2QkOQOg?key=NDRWeGk4cFRnNzJWdGxvOWJNeGlGY1NEVnd4eVVB'
+}
+
+
+def online_checkin_context(application: Application) -> t.Dict[str, t.Any]:
+    return {
         'name': application.user.get_full_name,
         'checkin_url': f'http://{settings.HACKATHON_DOMAIN}/checkin/me/{application.uuid}',
-        'IS_ONLINE_HACKATHON': settings.IS_ONLINE_HACKATHON,
     }
+
+
+def create_online_checkin_email(application: Application) -> t.Any:
+    context = online_checkin_context(application)
+    context['IS_ONLINE_HACKATHON'] = settings.IS_ONLINE_HACKATHON
     return emails.render_mail('mails/online_checkin', application.user.email, context, action_required=True)
 
 
+def create_online_checkin_emails(applications: t.Iterable[Application]) -> t.List[t.Any]:
+    return emails.render_mails('mails/online_checkin',
+                               [(app.user.email, online_checkin_context(app)) for app in applications],
+                               {'IS_ONLINE_HACKATHON': settings.IS_ONLINE_HACKATHON}, action_required=True)
+
+
 def create_post_event_email(application: Application) -> t.Any:
-    context = {
-        'name': application.user.get_full_name,
-        'recruit_url': 'https://ugeorgia.ca1.qualtrics.com/jfe/form/SV_5orFOdgzddQwY74',
-        'cert_url': 'https://my.ugahacks.com/static/docs/proof_of_attendance.pdf',
-        'photos_url': 'https://photos.google.com/share/AF1QipPftVrQsQ2hrI0biMNr5qdGpRBx1rn89GHhJR87u4NaelK61_m7DYCnnoc2QkOQOg?key=NDRWeGk4cFRnNzJWdGxvOWJNeGlGY1NEVnd4eVVB'
-    }
+    context = dict(POST_EVENT_CONTEXT, name=application.user.get_full_name)
     return emails.render_mail('mails/post_event', application.user.email, context)
+
+
+def create_post_event_emails(applications: t.Iterable[Application]) -> t.List[t.Any]:
+    return emails.render_mails('mails/post_event',
+                               [(app.user.email, {'name': app.user.get_full_name}) for app in applications],
+                               POST_EVENT_CONTEXT)
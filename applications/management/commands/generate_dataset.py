@@ -0,0 +1,314 @@
+import random
+import string
+import time
+import uuid
+from collections import defaultdict
+from datetime import timedelta
+
+from django.apps import apps
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from applications.models import Application
+from checkin.models import CheckIn
+from meals.models import Meal, Eaten, EatenCounter
+from organizers.models import ReviewerStats, ReviewQueueEntry, Vote
+from points.models import Points, PointsTransaction
+from stats.models import StatsCounter
+from teams.models import TEAM_ID_LENGTH, Team
+from user.models import User
+from workshops.models import Workshop, Attendance, Timeslot
+
+# Every generated user has an email in this domain, so that the dataset can be told apart and flushed
+SYNTHETIC_DOMAIN = 'synthetic.ugahacks.com'
+SYNTHETIC_PREFIX = '[Synthetic]'
+DEFAULT_PASSWORD = 'password1'
+
+FIRST_NAMES = ('Alex', 'Sam', 'Jordan', 'Taylor', 'Morgan', 'Casey', 'Riley', 'Jamie', 'Avery', 'Quinn', 'Maria',
+               'Wei', 'Priya', 'Omar', 'Chen', 'Fatima', 'Diego', 'Aisha', 'Lucas', 'Emma', 'Noah', 'Olivia')
+LAST_NAMES = ('Smith', 'Johnson', 'Lee', 'Garcia', 'Brown', 'Nguyen', 'Patel', 'Kim', 'Martinez', 'Davis',
+              'Lopez', 'Wilson', 'Anderson', 'Thomas', 'Moore', 'Jackson', 'White', 'Harris', 'Clark', 'Lewis')
+UNIVERSITIES = ('University of Georgia', 'Georgia Institute of Technology', 'Georgia State University',
+                'Kennesaw State University', 'Emory University', 'Clemson University', 'University of Florida',
+                'Auburn University', 'University of Tennessee', 'Mercer University')
+DEGREES = ('Computer Science', 'Computer Engineering', 'Electrical Engineering', 'Mathematics', 'Data Science',
+           'Information Systems', 'Biology', 'Business', 'Mechanical Engineering', 'Cognitive Science')
+ORIGINS = ('Athens, GA', 'Atlanta, GA', 'Savannah, GA', 'Macon, GA', 'Augusta, GA', 'Clemson, SC',
+           'Gainesville, FL', 'Knoxville, TN', 'Auburn, AL', 'Charlotte, NC')
+BAG_TYPES = ('Backpack', 'Bag', 'Laptop', 'Suitcase', 'Other')
+BAG_COLORS = ('Black', 'Blue', 'Grey', 'Green', 'Red', 'White')
+
+# Relative frequency of each application status
+STATUS_WEIGHTS = (
+    (Application.PENDING, 30),
+    (Application.REJECTED, 10),
+    (Application.INVITED, 8),
+    (Application.LAST_REMINDER, 2),
+    (Application.CONFIRMED, 15),
+    (Application.CANCELLED, 5),
+    (Application.ATTENDED, 25),
+    (Application.EXPIRED, 4),
+    (Application.DUBIOUS, 1),
+)
+REVIEWED_STATUSES = set(status for status, _ in STATUS_WEIGHTS) - {Application.PENDING}
+
+
+def weighted(rnd, choices, weights=None):
+    """Value of a random item of a Django choices list"""
+    return rnd.choices(choices, weights)[0][0]
+
+
+class Command(BaseCommand):
+    """
+    Generates a production sized dataset to benchmark and profile against. Everything is inserted with bulk_create
+    in batches and all users share one precomputed password hash, so 100k users load in seconds. The same seed
+    always generates the same data.
+    """
+    help = 'Generates synthetic users, applications, votes, teams, check-ins, meals, workshops, bags and ' \
+           'reimbursements for benchmarking'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=10000, help='Number of hackers. Default: 10000')
+        parser.add_argument('--organizers', type=int, default=20, help='Number of organizers. Default: 20')
+        parser.add_argument('--meals', type=int, default=8, help='Number of meals. Default: 8')
+        parser.add_argument('--workshops', type=int, default=15, help='Number of workshops. Default: 15')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed. Default: 0')
+        parser.add_argument('--batch-size', type=int, default=2000, help='Rows per INSERT. Default: 2000')
+        parser.add_argument('--password', default=DEFAULT_PASSWORD,
+                            help='Password of every generated user. Default: %s' % DEFAULT_PASSWORD)
+        parser.add_argument('--flush', action='store_true',
+                            help='Delete a previously generated dataset before generating the new one')
+
+    def handle(self, *args, **options):
+        if options['users'] < 1 or options['organizers'] < 1:
+            raise CommandError('At least one user and one organizer are needed')
+        if options['flush']:
+            self.flush()
+        elif User.objects.filter(email__endswith='@' + SYNTHETIC_DOMAIN).exists():
+            raise CommandError('There is already a synthetic dataset. Use --flush to replace it')
+
+        self.rnd = random.Random(options['seed'])
+        self.batch_size = options['batch_size']
+        self.now = timezone.now()
+        start = time.perf_counter()
+        with transaction.atomic():
+            organizers, hackers = self.create_users(options['users'], options['organizers'], options['password'])
+            applications = self.create_applications(hackers)
+            self.create_votes(applications, organizers)
+            self.create_teams(applications)
+            attended = [app for app in applications if app.status == Application.ATTENDED]
+            self.create_checkins(attended, organizers)
+            self.create_meals(attended, options['meals'])
+            self.create_workshops(attended, organizers, options['workshops'])
+            if apps.is_installed('baggage'):
+                self.create_bags(attended, organizers)
+            if apps.is_installed('reimbursement'):
+                self.create_reimbursements(applications, organizers)
+        self.stdout.write(self.style.SUCCESS('Generated dataset in %.1fs' % (time.perf_counter() - start)))
+
+    def flush(self):
+        self.stdout.write('Deleting previous synthetic dataset...')
+        with transaction.atomic():
+            Meal.objects.filter(name__startswith=SYNTHETIC_PREFIX).delete()
+            Timeslot.objects.filter(workshop_one__title__startswith=SYNTHETIC_PREFIX).delete()
+            Workshop.objects.filter(title__startswith=SYNTHETIC_PREFIX).delete()
+            User.objects.filter(email__endswith='@' + SYNTHETIC_DOMAIN).delete()
+
+    def bulk_create(self, model, objects):
+        # Some backends (SQLite) limit how many rows fit in one INSERT
+        batch_size = min(self.batch_size, connection.ops.bulk_batch_size(model._meta.concrete_fields, objects))
+        model.objects.bulk_create(objects, batch_size=max(batch_size, 1))
+        self.stdout.write('%s: %s created' % (model.__name__, len(objects)))
+
+    def create_users(self, count, organizers_count, password):
+        # Hashing is the slow part of creating users, hash once and share it
+        password_hash = make_password(password)
+        users = []
+        for i in range(organizers_count):
+            users.append(User(email='organizer%s@%s' % (i, SYNTHETIC_DOMAIN), name='Organizer %s' % i,
+                              password=password_hash, email_verified=True, is_organizer=True, is_volunteer=True))
+        for i in range(count):
+            users.append(User(email='hacker%s@%s' % (i, SYNTHETIC_DOMAIN),
+                              name='%s %s' % (self.rnd.choice(FIRST_NAMES), self.rnd.choice(LAST_NAMES)),
+                              password=password_hash, email_verified=True,
+                              created_time=self.now - timedelta(minutes=self.rnd.randint(0, 60 * 24 * 90))))
+        self.bulk_create(User, users)
+        # SQLite doesn't return the ids from bulk_create
+        users = list(User.objects.filter(email__endswith='@' + SYNTHETIC_DOMAIN).order_by('id'))
+        organizers = [user for user in users if user.is_organizer]
+        hackers = [user for user in users if not user.is_organizer]
+        return organizers, hackers
+
+    def create_applications(self, hackers):
+        statuses, status_weights = zip(*STATUS_WEIGHTS)
+        applications = []
+        for user in hackers:
+            submission_date = user.created_time + timedelta(minutes=self.rnd.randint(5, 60 * 24 * 7))
+            reimb = self.rnd.random() < 0.2
+            applications.append(Application(
+                user=user,
+                uuid=uuid.UUID(int=self.rnd.getrandbits(128), version=4),
+                submission_date=submission_date,
+                status_update_date=submission_date + timedelta(days=self.rnd.randint(0, 14)),
+                status=self.rnd.choices(statuses, status_weights)[0],
+                gender=weighted(self.rnd, Application.GENDERS),
+                origin=self.rnd.choice(ORIGINS),
+                first_timer=self.rnd.random() < 0.4,
+                first_ugahacks=self.rnd.random() < 0.6,
+                description='Synthetic application',
+                hearabout=weighted(self.rnd, Application.HEARABOUT),
+                reimb=reimb,
+                reimb_amount=self.rnd.choice((50, 100, 150, 200)) if reimb else None,
+                attendance_type=weighted(self.rnd, Application.ATTENDANCE),
+                participant=weighted(self.rnd, Application.PARTICIPANTS, (90, 7, 3)),
+                code_of_conduct=True,
+                terms_and_conditions=True,
+                graduation_year=weighted(self.rnd, Application.YEARS),
+                class_status=weighted(self.rnd, Application.CLASSSTATUS),
+                university=self.rnd.choice(UNIVERSITIES),
+                degree=self.rnd.choice(DEGREES),
+                diet=weighted(self.rnd, Application.DIETS, (70, 8, 4, 3, 2, 3, 3, 3, 2, 2)),
+                tshirt_size=weighted(self.rnd, Application.TSHIRT_SIZES),
+            ))
+        self.bulk_create(Application, applications)
+        StatsCounter.track(added=Application.objects.filter(user__email__endswith='@' + SYNTHETIC_DOMAIN)
+                           .values(*StatsCounter.FIELDS))
+        return applications
+
+    def create_votes(self, applications, organizers):
+        votes = []
+        for application in applications:
+            if application.status not in REVIEWED_STATUSES:
+                continue
+            for organizer in self.rnd.sample(organizers, min(len(organizers), self.rnd.randint(1, 3))):
+                votes.append(Vote(application_id=application.pk, user_id=organizer.pk,
+                                  tech=self.rnd.randint(1, 10), personal=self.rnd.randint(1, 10)))
+        self.calculate_votes(votes)
+        self.bulk_create(Vote, votes)
+        Vote.update_scores(Vote.objects.filter(user_id__in=[organizer.pk for organizer in organizers])
+                           .values('application_id'))
+        self.bulk_create(ReviewQueueEntry, [
+            ReviewQueueEntry(application_id=application.pk, submission_date=application.submission_date)
+            for application in applications if application.status == Application.PENDING
+        ])
+
+    def calculate_votes(self, votes):
+        """Same standardization that Vote.save does, with the final stats of each organizer"""
+        stats = {}
+        for vote in votes:
+            stats.setdefault(vote.user_id, ReviewerStats(user_id=vote.user_id)).add(vote.tech, vote.personal)
+        for vote in votes:
+            vote.calculated_vote = stats[vote.user_id].calculate(vote.tech, vote.personal)
+        self.bulk_create(ReviewerStats, list(stats.values()))
+
+    def create_teams(self, applications):
+        teams = []
+        members = [app.user_id for app in applications if self.rnd.random() < 0.6]
+        start = 0
+        while start < len(members):
+            team_code = ''.join(self.rnd.choice(string.ascii_letters + string.digits) for _ in range(TEAM_ID_LENGTH))
+            size = self.rnd.randint(1, 4)
+            teams.extend(Team(team_code=team_code, user_id=user_id) for user_id in members[start:start + size])
+            start += size
+        self.bulk_create(Team, teams)
+
+    def create_checkins(self, attended, organizers):
+        self.bulk_create(CheckIn, [
+            CheckIn(application_id=app.pk, user_id=self.rnd.choice(organizers).pk,
+                    qr_identifier='syn-%s' % app.user_id, update_time=app.status_update_date)
+            for app in attended
+        ])
+
+    def create_meals(self, attended, count):
+        meals = []
+        for i in range(count):
+            starts = self.now + timedelta(hours=6 * i)
+            meals.append(Meal(name='%s Meal %s' % (SYNTHETIC_PREFIX, i), kind=self.rnd.choice(Meal.TYPES)[0],
+                              starts=starts, ends=starts + timedelta(hours=2), times=self.rnd.randint(1, 2),
+                              opened=i == 0))
+        self.bulk_create(Meal, meals)
+        meals = list(Meal.objects.filter(name__startswith=SYNTHETIC_PREFIX).order_by('id'))
+        eatens = []
+        counters = []
+        for meal in meals:
+            for app in attended:
+                if self.rnd.random() < 0.8:
+                    times = self.rnd.randint(1, meal.times)
+                    eatens.extend(Eaten(meal_id=meal.pk, user_id=app.user_id) for _ in range(times))
+                    counters.append(EatenCounter(meal_id=meal.pk, user_id=app.user_id, times=times))
+        self.bulk_create(Eaten, eatens)
+        self.bulk_create(EatenCounter, counters)
+
+    def create_workshops(self, attended, organizers, count):
+        self.bulk_create(Workshop, [
+            Workshop(title='%s Workshop %s' % (SYNTHETIC_PREFIX, i), host=self.rnd.choice(organizers).name,
+                     description='Synthetic workshop', open=True, points=self.rnd.choice((0, 5, 10, 20)))
+            for i in range(count)
+        ])
+        workshops = list(Workshop.objects.filter(title__startswith=SYNTHETIC_PREFIX).order_by('id'))
+        # Two workshops per hour, the last ones going on right now
+        start = self.now.replace(minute=0, second=0, microsecond=0) - timedelta(hours=(len(workshops) - 1) // 2)
+        self.bulk_create(Timeslot, [
+            Timeslot(start=start + timedelta(hours=i // 2), end=start + timedelta(hours=i // 2 + 1),
+                     workshop_one=workshops[i], workshop_two=workshops[i + 1] if i + 1 < len(workshops) else None)
+            for i in range(0, len(workshops), 2)
+        ])
+        attendances = []
+        transactions = []
+        balances = defaultdict(int)
+        for workshop in workshops:
+            for app in attended:
+                if self.rnd.random() < 0.3:
+                    attendances.append(Attendance(workshop_id=workshop.pk, user_id=app.user_id))
+                    if workshop.points:
+                        transactions.append(PointsTransaction(
+                            user_id=app.user_id, amount=workshop.points, source=PointsTransaction.WORKSHOP,
+                            scanner_id=self.rnd.choice(organizers).pk, workshop_id=workshop.pk,
+                            key=PointsTransaction.workshop_key(workshop.pk, app.user_id)))
+                        balances[app.user_id] += workshop.points
+        self.bulk_create(Attendance, attendances)
+        self.bulk_create(PointsTransaction, transactions)
+        self.bulk_create(Points, [Points(user_id=user_id, points=points) for user_id, points in balances.items()])
+
+    def create_bags(self, attended, organizers):
+        from baggage.models import Bag, Room, Slot
+        from baggage.utils import invalidate_baggage_map
+        rooms = list(Room.objects.all())
+        if not rooms:
+            rooms = [Room(room=room, row=20, col=30) for room, _ in Room.BUILDINGS]
+            self.bulk_create(Room, rooms)
+        color_length = Bag._meta.get_field('color').max_length
+        bags = []
+        for app in attended:
+            if self.rnd.random() < 0.3:
+                room = self.rnd.choice(rooms)
+                status = Bag.ADDED if self.rnd.random() < 0.7 else Bag.REMOVED
+                inby = self.rnd.choice(organizers)
+                bags.append(Bag(owner_id=app.user_id, inby_id=inby.pk, status=status, room=room,
+                                outby_id=self.rnd.choice(organizers).pk if status == Bag.REMOVED else None,
+                                row=chr(65 + self.rnd.randrange(max(room.row, 1))),
+                                col=self.rnd.randrange(max(room.col, 1)), btype=self.rnd.choice(BAG_TYPES),
+                                color=self.rnd.choice(BAG_COLORS)[:color_length]))
+        self.bulk_create(Bag, bags)
+        # Bulk inserts skip the signals that keep the positions up to date
+        Slot.rebuild()
+        invalidate_baggage_map()
+
+    def create_reimbursements(self, applications, organizers):
+        from reimbursement.models import Reimbursement
+        statuses = [status for status, _ in Reimbursement.STATUS if status != Reimbursement.FRIEND_SUBMISSION]
+        reimbursements = []
+        for app in applications:
+            if not app.reimb:
+                continue
+            status = Reimbursement.DRAFT if app.status == Application.PENDING else self.rnd.choice(statuses)
+            sent = status != Reimbursement.DRAFT
+            reimbursements.append(Reimbursement(
+                hacker_id=app.user_id, origin=app.origin, assigned_money=app.reimb_amount, status=status,
+                reimbursement_money=app.reimb_amount if status == Reimbursement.APPROVED else None,
+                reimbursed_by_id=self.rnd.choice(organizers).pk if sent else None,
+                expiration_time=app.status_update_date + timedelta(days=5) if sent else None,
+                creation_time=app.submission_date, update_time=app.status_update_date))
+        self.bulk_create(Reimbursement, reimbursements)
@@ -0,0 +1,28 @@
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from app import qr
+from applications.models import Application
+from checkin.models import CheckIn
+
+
+class Command(BaseCommand):
+    help = 'Generates the QR images of every confirmed application (and of the badges with --badges) ahead of ' \
+           'the tickets being opened. Images already generated are skipped.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--badges', action='store_true', help='also generate the QR images of the badges')
+
+    def handle(self, *args, **options):
+        codes = [str(uuid) for uuid in Application.objects.filter(
+            status__in=[Application.CONFIRMED, Application.ATTENDED]).values_list('uuid', flat=True)]
+        if options['badges']:
+            codes += list(CheckIn.objects.exclude(qr_identifier__isnull=True).exclude(qr_identifier='')
+                          .values_list('qr_identifier', flat=True))
+        self.stdout.write('Generating QR codes...%s found' % len(codes))
+        generated = 0
+        for code in codes:
+            if not default_storage.exists(qr.QR_PATH.format(qr.qr_hash(code))):
+                qr.get_qr(code)
+                generated += 1
+        self.stdout.write(self.style.SUCCESS('Generating QR codes... Successfully generated %s QR codes' % generated))
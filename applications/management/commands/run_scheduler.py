@@ -0,0 +1,53 @@
+from datetime import timedelta
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from applications import emails
+from applications.models import Application
+from outbox.models import EmailOutbox
+from stats.models import StatsCounter
+from stats.utils import invalidate_app_stats
+
+# Invites get a last reminder REMINDER_DAYS after being sent, and expire EXPIRE_DAYS after the reminder
+REMINDER_DAYS = 4
+EXPIRE_DAYS = 1
+
+
+class Command(BaseCommand):
+    help = 'Applies every time based transition: sends the last reminder of old invites, expires the invites not ' \
+           'answered after the reminder and expires the reimbursements without receipt. Only touches the rows ' \
+           'that change, so it is safe to run every minute.'
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        self.stdout.write('Sending reminders...')
+        with transaction.atomic():
+            reminded = StatsCounter.set_status(Application.objects.filter(
+                status=Application.INVITED, status_update_date__lte=now - timedelta(days=REMINDER_DAYS)),
+                Application.LAST_REMINDER)
+            # Queued in the same transaction, so reminders are never lost nor sent twice
+            applications = list(Application.objects.filter(pk__in=list(reminded)).select_related('user'))
+            # One reminder per invite, identified by the date it was sent
+            emails.send_batch_emails(emails.create_lastreminder_emails(applications), 'mails/last_reminder',
+                                     [EmailOutbox.key(app, reminded[app.pk]) for app in applications])
+        self.stdout.write(self.style.SUCCESS('Sending reminders... Successfully queued %s reminders' % len(reminded)))
+
+        self.stdout.write('Setting expired...')
+        with transaction.atomic():
+            expired = StatsCounter.set_status(Application.objects.filter(
+                status=Application.LAST_REMINDER, status_update_date__lte=now - timedelta(days=EXPIRE_DAYS)),
+                Application.EXPIRED)
+        self.stdout.write(self.style.SUCCESS('Setting expired... Successfully expired %s applications' % len(expired)))
+        if reminded or expired:
+            invalidate_app_stats()
+
+        if apps.is_installed('reimbursement'):
+            from reimbursement.models import Reimbursement
+            self.stdout.write('Setting expired reimbursements...')
+            count = Reimbursement.objects.filter(status=Reimbursement.PEND_TICKET, expiration_time__lte=now) \
+                .update(status=Reimbursement.EXPIRED)
+            self.stdout.write(self.style.SUCCESS(
+                'Setting expired reimbursements... Successfully expired %s reimbursements' % count))
@@ -0,0 +1,48 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField, OuterRef, Subquery
+from django.db.models.functions import Cast, Coalesce
+
+TECH_WEIGHT = 0.2
+PERSONAL_WEIGHT = 0.8
+
+
+def fill_scores(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    Vote = apps.get_model('organizers', 'Vote')
+    personal = (Cast(F('personal'), FloatField()) - F('user__reviewer_stats__personal_mean')) / \
+        F('user__reviewer_stats__personal_scale')
+    tech = (Cast(F('tech'), FloatField()) - F('user__reviewer_stats__tech_mean')) / \
+        F('user__reviewer_stats__tech_scale')
+    score = ExpressionWrapper(PERSONAL_WEIGHT * personal + TECH_WEIGHT * tech, output_field=FloatField())
+    votes = Vote.objects.filter(application_id=OuterRef('pk')).order_by().values('application_id')
+    Application.objects.update(
+        score=Subquery(votes.annotate(avg=Avg(score)).values('avg'), output_field=FloatField()),
+        review_count=Coalesce(Subquery(votes.annotate(count=Count('pk')).values('count')), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0039_application_mlh_promotional'),
+        ('organizers', '0003_review_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='application',
+            name='score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AlterIndexTogether(
+            name='application',
+            index_together={('status', 'score')},
+        ),
+        migrations.RunPython(fill_scores, migrations.RunPython.noop),
+    ]
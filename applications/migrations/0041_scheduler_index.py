@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0040_application_score'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='application',
+            index_together={('status', 'score'), ('status', 'status_update_date')},
+        ),
+    ]
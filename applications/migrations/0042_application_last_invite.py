@@ -0,0 +1,18 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0041_scheduler_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='application',
+            name='last_invite',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
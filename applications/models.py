@@ -5,8 +5,8 @@ import json
 import uuid as uuid
 from django.core.exceptions import ValidationError
 from django.core.validators import RegexValidator, MinValueValidator
-from django.db import models
-from django.db.models import Avg
+from django.db import models, transaction
+from django.db.models import F
 from django.utils import timezone
 
 from app import utils
@@ -165,9 +165,14 @@ class Application(models.Model):
     submission_date = models.DateTimeField(default=timezone.now)
     # When was the last status update
     status_update_date = models.DateTimeField(blank=True, null=True)
+    # When was the last invite sent
+    last_invite = models.DateTimeField(blank=True, null=True)
     # Application status
     status = models.CharField(choices=STATUS, default=PENDING,
                               max_length=2)
+    # Average standardized vote and number of reviews, kept up to date by organizers.models.Vote
+    score = models.FloatField(null=True, blank=True)
+    review_count = models.PositiveIntegerField(default=0)
 
     # managers
     objects = models.Manager()
@@ -247,9 +252,13 @@ class Application(models.Model):
     state = models.CharField(max_length=2, null=True, blank=True)
     zip_code = models.CharField(max_length=15, null=True, blank=True)
 
+    class Meta:
+        # Invite lists show the best scored pending applications first, and run_scheduler looks for old invites
+        index_together = [('status', 'score'), ('status', 'status_update_date')]
+
     @classmethod
     def annotate_vote(cls, qs):
-        return qs.annotate(vote_avg=Avg('vote__calculated_vote'))
+        return qs.annotate(vote_avg=F('score'))
 
     @property
     def uuid_str(self):
@@ -266,7 +275,9 @@ class Application(models.Model):
 
     def save(self, **kwargs):
         self.status_update_date = timezone.now()
-        super(Application, self).save(**kwargs)
+        # The stats counters are updated by the save signals, keep them in the same transaction
+        with transaction.atomic():
+            super(Application, self).save(**kwargs)
 
     def invite(self, user):
         # We can't re-invite someone invited
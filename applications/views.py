@@ -14,7 +14,7 @@ from django.shortcuts import render, get_object_or_404
 from django.utils import timezone
 from django.views import View
 
-from app import slack
+from app import qr, slack
 from app.slack import SlackInvitationException
 from app.utils import reverse, hacker_tabs
 from app.views import TabsView
@@ -119,13 +119,12 @@ class HackerDashboard(IsHackerMixin, TabsView):
         except:
             form = forms.ApplicationForm()
         context.update({'form': form})
-        try:
-            application = Application.objects.get(user=self.request.user)
-            deadline = get_deadline(application)
-            context.update({'invite_timeleft': deadline - timezone.now()})
-        except:
-            # We ignore this as we are okay if the user has not created an application yet
-            pass
+        # We are okay if the user has not created an application yet
+        application = Application.objects.filter(user=self.request.user).first()
+        if application:
+            context.update({'qr_url': qr.qr_url(application.uuid_str)})
+            if application.status_update_date:
+                context.update({'invite_timeleft': get_deadline(application) - timezone.now()})
 
         return context
 
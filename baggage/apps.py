@@ -3,3 +3,9 @@ from django.apps import AppConfig
 
 class BaggageConfig(AppConfig):
     name = 'baggage'
+
+    def ready(self):
+        super(BaggageConfig, self).ready()
+        from .signals import room_slots_rebuild, baggage_map_invalidate
+        room_slots_rebuild
+        baggage_map_invalidate
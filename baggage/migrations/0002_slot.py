@@ -0,0 +1,55 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+import math
+
+
+def fill_slots(apps, schema_editor):
+    Room = apps.get_model('baggage', 'Room')
+    Bag = apps.get_model('baggage', 'Bag')
+    Slot = apps.get_model('baggage', 'Slot')
+    bags = Bag.objects.filter(status='A')
+    occupied = set(bags.values_list('room_id', 'row', 'col'))
+    slots = [Slot(room_id=None, row='EXTRA', col=col, occupied=True)
+             for col in set(bags.filter(room__isnull=True).values_list('col', flat=True))]
+    for room in Room.objects.all():
+        slots.extend(Slot(room_id=room.pk, row=chr(row + 65), col=col,
+                          occupied=(room.pk, chr(row + 65), col) in occupied,
+                          distance=math.sqrt(pow(row - room.door_row, 2) + pow(col - room.door_col, 2)))
+                     for row in range(room.row) for col in range(room.col))
+    Slot.objects.bulk_create(slots)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('baggage', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Slot',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row', models.CharField(max_length=15)),
+                ('col', models.PositiveIntegerField()),
+                ('distance', models.FloatField(default=0)),
+                ('occupied', models.BooleanField(default=False)),
+                ('room', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, to='baggage.Room')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='slot',
+            index=models.Index(condition=models.Q(('occupied', False), ('room__isnull', False)), fields=['distance', 'room', 'row', 'col'], name='baggage_slot_free_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='slot',
+            constraint=models.UniqueConstraint(fields=('room', 'row', 'col'), name='baggage_slot_unique'),
+        ),
+        migrations.AddConstraint(
+            model_name='slot',
+            constraint=models.UniqueConstraint(condition=models.Q(room__isnull=True), fields=('col',), name='baggage_slot_extra_unique'),
+        ),
+        migrations.RunPython(fill_slots, migrations.RunPython.noop),
+    ]
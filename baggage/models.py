@@ -1,4 +1,7 @@
-from django.db import models
+import math
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import Max, Q
 
 from user.models import User
 
@@ -76,3 +79,114 @@ class Bag(models.Model):
         if self.special:
             return '@' + str(self.col)
         return str(self.row) + str(self.col)
+
+
+class Slot(models.Model):
+    """
+    Represents a position where a bag can be stored. Free slots are kept ordered by distance to the door, so
+    allocating the nearest free position is a single indexed query instead of one query per position.
+    Slots without room are the extra positions, used for special items and when the rooms are full.
+    """
+    EXTRA = 'EXTRA'
+
+    # Room of the position, null for extra positions
+    room = models.ForeignKey(Room, null=True, on_delete=models.CASCADE)
+    # Row of the position, as stored in the bags
+    row = models.CharField(max_length=15, null=False)
+    # Column of the position
+    col = models.PositiveIntegerField(null=False)
+    # Distance from the door of the room
+    distance = models.FloatField(null=False, default=0)
+    # Reflects if a bag is stored in the position
+    occupied = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['room', 'row', 'col'], name='baggage_slot_unique'),
+            # Null rooms are never equal, extra positions need their own constraint
+            models.UniqueConstraint(fields=['col'], condition=Q(room__isnull=True), name='baggage_slot_extra_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['distance', 'room', 'row', 'col'], condition=Q(occupied=False, room__isnull=False),
+                         name='baggage_slot_free_idx'),
+        ]
+
+    def __str__(self):
+        return '%s-%s%s' % (self.room_id or self.EXTRA, self.row, self.col)
+
+    @classmethod
+    def room_slots(cls, room, occupied=()):
+        """:return: unsaved slots of every position of the room"""
+        # I am not responsible for what will happen if you add more than 26 rows ;)
+        return [cls(room=room, row=chr(row + 65), col=col, occupied=(room.room, chr(row + 65), col) in occupied,
+                    distance=math.sqrt(pow(row - room.door_row, 2) + pow(col - room.door_col, 2)))
+                for row in range(room.row) for col in range(room.col)]
+
+    @classmethod
+    def rebuild(cls, rooms=None):
+        """
+        Rebuilds the slots of the rooms (every room and the extra positions if None) from the bags stored in them.
+        Needed whenever rooms or bags are changed without going through allocate and release.
+        """
+        bags = Bag.objects.filter(status=Bag.ADDED)
+        with transaction.atomic():
+            if rooms is None:
+                rooms = list(Room.objects.all())
+                cls.objects.filter(room__isnull=True).delete()
+                cls.objects.bulk_create(cls(room=None, row=cls.EXTRA, col=col, occupied=True) for col in set(
+                    bags.filter(room__isnull=True).values_list('col', flat=True)))
+            occupied = set(bags.filter(room__in=rooms).values_list('room_id', 'row', 'col'))
+            cls.objects.filter(room__in=rooms).delete()
+            cls.objects.bulk_create([slot for room in rooms for slot in cls.room_slots(room, occupied)])
+
+    @classmethod
+    def allocate(cls, special):
+        """
+        Takes the free position nearest to a door, or the first free extra position for special items or when
+        the rooms are full. Must be called in the transaction that stores the bag.
+        :return: (room, row, col) of the position taken
+        """
+        if not special:
+            free = cls.objects.filter(occupied=False, room__isnull=False).order_by('distance', 'room', 'row', 'col')
+            while True:
+                # Volunteers checking in at the same time skip the positions being taken by the others
+                slot = free.select_for_update(skip_locked=True).first()
+                if slot is None:
+                    break
+                # Backends without row locks may give the same position twice, only one of them takes it
+                if cls.objects.filter(pk=slot.pk, occupied=False).update(occupied=True):
+                    return slot.room_id, slot.row, slot.col
+        while True:
+            slot = cls.objects.filter(occupied=False, room__isnull=True).order_by('col') \
+                .select_for_update(skip_locked=True).first()
+            if slot is not None:
+                if cls.objects.filter(pk=slot.pk, occupied=False).update(occupied=True):
+                    return None, cls.EXTRA, slot.col
+                continue
+            col = cls.objects.filter(room__isnull=True).aggregate(col=Max('col'))['col']
+            try:
+                with transaction.atomic():
+                    slot = cls.objects.create(room=None, row=cls.EXTRA, col=0 if col is None else col + 1,
+                                              occupied=True)
+                return None, cls.EXTRA, slot.col
+            except IntegrityError:
+                # Another volunteer created the same extra position
+                pass
+
+    @classmethod
+    def take(cls, room, row, col):
+        """
+        Takes the given position. Must be called in the transaction that stores the bag.
+        :return: False if the position is already taken
+        """
+        if cls.objects.filter(room=room, row=row, col=col, occupied=False).update(occupied=True):
+            return True
+        if cls.objects.filter(room=room, row=row, col=col).exists():
+            return False
+        # Positions outside of the room
+        return not Bag.objects.filter(status=Bag.ADDED, room=room, row=row, col=col).exists()
+
+    @classmethod
+    def release(cls, bag):
+        """Frees the position of a bag that has been checked-out"""
+        cls.objects.filter(room=bag.room_id, row=bag.row, col=bag.col).update(occupied=False)
@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from baggage.models import Bag, Room, Slot
+from baggage.utils import invalidate_baggage_map
+
+
+# Positions depend on the size of the room and on its door, rebuild them when the room changes
+@receiver(post_save, sender=Room)
+def room_slots_rebuild(sender, instance, *args, **kwargs):
+    Slot.rebuild([instance])
+    invalidate_baggage_map()
+
+
+# Every check-in and check-out changes the map
+@receiver(post_save, sender=Bag)
+@receiver(post_delete, sender=Bag)
+@receiver(post_delete, sender=Room)
+def baggage_map_invalidate(sender, *args, **kwargs):
+    invalidate_baggage_map()
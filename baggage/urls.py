@@ -9,6 +9,7 @@ urlpatterns = [
     url(r'^out/(?P<user_id>[\w-]+)$', views.BaggageHacker.as_view(), name='baggage_hacker'),
     url(r'^(?P<first>[\w-]+\/)?(?P<id>[\w-]+)$', views.BaggageDetail.as_view(), name='baggage_detail'),
     url(r'^map/$', views.BaggageMap.as_view(), name='baggage_map'),
+    url(r'^map/data/$', views.BaggageMapData.as_view(), name='baggage_map_data'),
     url(r'^history/$', views.BaggageHistory.as_view(), name='baggage_history'),
     url(r'^current/$', views.BaggageCurrentHacker.as_view(), name='baggage_currenthacker')
 ]
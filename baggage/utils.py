@@ -1,46 +1,61 @@
-import itertools
-import math
+import hashlib
+import json
 
-from baggage.models import Room, Bag
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
 
+from baggage.models import Bag, Room, Slot
 
-def calculate_distance(name, ini_x, ini_y, end_x, end_y):
-    return ((name, end_x, end_y), math.sqrt(pow(abs(end_x - ini_x), 2) + pow(abs(end_y - ini_y), 2)))
-
-
-def get_positions(size_x, size_y, door_x, door_y):
-    return list(itertools.product(list(map(str, range(0, size_x))), list(map(str, range(0, size_y)))))
-
-
-def get_positions_dist(size_x, size_y, door_x, door_y, name):
-    positions = get_positions(size_x, size_y, door_x, door_y)
-    return list(map(lambda x: calculate_distance(name, door_x, door_y, int(x[0]), int(x[1])), positions))
-
-
-def get_all_positions(rooms):
-    return dict(map(lambda room: (room.room, get_positions(room.row, room.col, room.door_row, room.door_col)), rooms))
+# The map only changes on check-in and check-out, which invalidate the cache
+BAGGAGE_MAP_CACHE_KEY = 'baggage_map'
+BAGGAGE_MAP_CACHE_TIMEOUT = 24 * 60 * 60
 
 
 def get_position(special):
-    extra = 'SPECIAL'
-    if not special:
-        rooms = Room.objects.all()
-        positions = []
-        for room in rooms:
-            positions.extend(get_positions_dist(room.row, room.col, room.door_row, room.door_col, room.room))
-        positions_sort = sorted(positions, key=(lambda x: x[1]))
-        for i in range(0, len(positions_sort)):
-            # I am not responsible for what will happen if you add more than 26 rows ;)
-            row_char = chr(positions_sort[i][0][1] + 65)
-            num_bags = Bag.objects.filter(status=Bag.ADDED, room=positions_sort[i][0][0],
-                                          row=row_char, col=positions_sort[i][0][2]).count()
-            if num_bags == 0:
-                return (1, positions_sort[i][0][0], row_char, positions_sort[i][0][2])
-        extra = 'EXTRA'
-    i = 0
-    while i < 10000:
-        num_bags = Bag.objects.filter(status=Bag.ADDED, room=extra, row=0, col=i).count()
-        if num_bags == 0:
-            return (2, extra, 'EXTRA', i)
-        i += 1
-    return (0, '', 'ERROR', 0)
+    """
+    Takes the position for a new bag, must be called in the transaction that stores the bag
+    :return: (1 if in a room or 2 if extra, room, row, col)
+    """
+    room, row, col = Slot.allocate(special)
+    if room is None:
+        return (2, 'SPECIAL' if special else Slot.EXTRA, row, col)
+    return (1, room, row, col)
+
+
+def compute_baggage_map():
+    """
+    Occupancy grid of every room: one list per row with [bag id, type, color] in the occupied cells and null in
+    the free ones. Takes two queries no matter how many bags are stored.
+    """
+    rooms = {room: [[None] * cols for _ in range(rows)]
+             for room, rows, cols in Room.objects.order_by('room').values_list('room', 'row', 'col')}
+    for bid, room, row, col, btype, color in Bag.objects.filter(status=Bag.ADDED, room__isnull=False) \
+            .values_list('bid', 'room', 'row', 'col', 'btype', 'color').iterator():
+        grid = rooms.get(room)
+        row = ord(row[:1] or ' ') - 65
+        # Bags placed by hand may be outside of the room
+        if grid is not None and 0 <= row < len(grid) and col < len(grid[row]):
+            grid[row][col] = [bid, btype, color]
+    return {'rooms': [{'room': room, 'grid': grid} for room, grid in rooms.items()]}
+
+
+def get_baggage_map():
+    """
+    Baggage map snapshot, shared by every volunteer through the cache.
+    :return: dict with the map in 'data' and an 'etag' that only changes when the map does
+    """
+    snapshot = cache.get(BAGGAGE_MAP_CACHE_KEY)
+    if snapshot is None:
+        data = compute_baggage_map()
+        content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        data['update_time'] = timezone.now()
+        snapshot = {'etag': '"%s"' % hashlib.md5(content.encode('utf-8')).hexdigest(), 'data': data}
+        cache.set(BAGGAGE_MAP_CACHE_KEY, snapshot, BAGGAGE_MAP_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_baggage_map():
+    # Deleted once committed, otherwise a poll in the meantime could cache the map as it was before the change
+    transaction.on_commit(lambda: cache.delete(BAGGAGE_MAP_CACHE_KEY))
@@ -4,9 +4,13 @@ import time
 from django.contrib import messages
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.core.files.base import ContentFile
-from django.core.urlresolvers import reverse
-from django.http import HttpResponseRedirect, Http404
+from django.db import transaction
+from django.http import HttpResponseRedirect, Http404, JsonResponse
 from django.shortcuts import redirect
+from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import condition
 from django_filters.views import FilterView
 from django_tables2 import SingleTableMixin
 
@@ -14,7 +18,7 @@ from app.mixins import TabsViewMixin
 from app.slack import send_slack_message
 from app.views import TabsView
 from baggage import utils
-from baggage.models import Bag, Room
+from baggage.models import Bag, Room, Slot
 from baggage.tables import BaggageListTable, BaggageListFilter, BaggageUsersTable
 from baggage.tables import BaggageUsersFilter, BaggageCurrentHackerTable
 from checkin.models import CheckIn
@@ -128,20 +132,21 @@ class BaggageAdd(IsVolunteerMixin, TabsView):
         bagrow = request.POST.get('pos_row')
         bagcol = request.POST.get('pos_col')
         position = ()
-        if posmanual == 'manual' and bagspe != 'special' and bagroom and bagrow and bagcol:
-            position = (3, bagroom, bagrow, bagcol)
-            posempty = Bag.objects.filter(status=Bag.ADDED, room=bagroom, row=bagrow, col=bagcol).count()
-            if posempty > 0:
-                messages.success(self.request, 'Error! Position is already taken!')
-                return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-        else:
-            position = utils.get_position(bag.special)
-
+        with transaction.atomic():
+            if posmanual == 'manual' and bagspe != 'special' and bagroom and bagrow and bagcol:
+                position = (3, bagroom, bagrow, bagcol)
+                if not Slot.take(bagroom, bagrow, bagcol):
+                    messages.success(self.request, 'Error! Position is already taken!')
+                    return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
+            else:
+                position = utils.get_position(bag.special)
+
+            if position[0] != 0:
+                bag.room = Room.objects.filter(room=position[1]).first()
+                bag.row = position[2]
+                bag.col = position[3]
+                bag.save()
         if position[0] != 0:
-            bag.room = Room.objects.filter(room=position[1]).first()
-            bag.row = position[2]
-            bag.col = position[3]
-            bag.save()
             messages.success(self.request, 'Bag checked-in!')
             send_slack_message(bag.owner.email, '*Baggage check-in* :handbag:\nYou\'ve just '
                                                 'registered :memo: a bag with ID `' + str(bag.bid) + '` located '
@@ -177,10 +182,17 @@ class BaggageDetail(IsVolunteerMixin, TabsView):
 
     def post(self, request, *args, **kwargs):
         bagid = request.POST.get('bag_id')
-        bag = Bag.objects.filter(bid=bagid).first()
-        bag.status = Bag.REMOVED
-        bag.outby = request.user
-        bag.save()
+        with transaction.atomic():
+            bag = Bag.objects.select_for_update().filter(bid=bagid).first()
+            if not bag:
+                raise Http404
+            if bag.status == Bag.REMOVED:
+                messages.success(self.request, 'Error! Bag already checked-out!')
+                return redirect('baggage_search')
+            bag.status = Bag.REMOVED
+            bag.outby = request.user
+            bag.save()
+            Slot.release(bag)
         messages.success(self.request, 'Bag checked-out!')
         send_slack_message(bag.owner.email, '*Baggage check-out* :handbag:\nYour bag with ID `' +
                            str(bagid) + '` has been checked-out :truck:!')
@@ -195,15 +207,24 @@ class BaggageMap(IsVolunteerMixin, TabsView):
 
     def get_context_data(self, **kwargs):
         context = super(BaggageMap, self).get_context_data(**kwargs)
-        rooms = Room.objects.all()
-        bags = Bag.objects.filter(status=Bag.ADDED)
+        # Bags are loaded from BaggageMapData
         context.update({
-            'rooms': rooms,
-            'bags': bags
+            'rooms': Room.objects.order_by('room')
         })
         return context
 
 
+def baggage_map_etag(request, *args, **kwargs):
+    return utils.get_baggage_map()['etag']
+
+
+class BaggageMapData(IsVolunteerMixin, View):
+
+    @method_decorator(condition(etag_func=baggage_map_etag))
+    def get(self, request, *args, **kwargs):
+        return JsonResponse(utils.get_baggage_map()['data'])
+
+
 class BaggageHistory(IsVolunteerMixin, TabsView):
     template_name = 'baggage_history.html'
 
@@ -11,6 +11,10 @@ import queue
 from collections import OrderedDict
 from django.db.models import Q
 
+from derivatives.models import ImageDerivative
+
+BLOG_THUMBNAIL_SIZE = 480
+
 
 class BlogAdd(IsOrganizerMixin, FormView):
     template_name = 'blog_add.html'
@@ -74,6 +78,12 @@ class BlogHome(ListView):
             return blog_query
         return blog_query
 
+    def get_context_data(self, **kwargs):
+        context = super(BlogHome, self).get_context_data(**kwargs)
+        context['thumbnail_urls'] = ImageDerivative.urls([blog.thumbnail for blog in context['blogs']],
+                                                         BLOG_THUMBNAIL_SIZE)
+        return context
+
 class BlogDetail(DetailView):
     model = Blog
     template_name = 'blog_detail.html'
@@ -0,0 +1,13 @@
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+
+
+class CheckinConfig(AppConfig):
+    name = 'checkin'
+
+    def ready(self):
+        super(CheckinConfig, self).ready()
+        from .signals import application_badge_invalidate, user_badge_invalidate
+        application_badge_invalidate
+        user_badge_invalidate
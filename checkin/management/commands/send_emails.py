@@ -4,16 +4,10 @@ from django.core.management.base import BaseCommand
 from applications import emails
 from app.emails import render_mail
 from applications.models import Application
-
-import time
+from outbox.models import EmailOutbox
 
 class Command(BaseCommand):
 
-    # prevents gmail from getting angry :)
-    N_CHUNK_NO_THROTTLE = 50
-    THROTTLE_TIMEOUT = 120
-
-
     help = f'Command utility for sending out online check-in emails. \
             To send emails to all confirmed applicants, run the command with \
             the --all option. Non-Functional Test Example: \
@@ -121,51 +115,11 @@ class Command(BaseCommand):
         confirmed = input(confirm_msg)
 
         if confirmed.lower() == 'y':
-
-            def chunk(mlist, n):
-                """Yield successive n-sized chunks from lst."""
-                for i in range(0, len(mlist), n):
-                    yield mlist[i:i + n]
-
             self.stdout.write('Gathering confirmed applications...')
-            attended_applications = Application.objects.filter(status=Application.ATTENDED)
-            self.stdout.write(f'Found: {attended_applications.count()} ATTENDED applications.')
-            self.stdout.write('Sending self post_event emails...')
-
-            # gmail has a throttle @ 100 for emails; also doesn't like being spammed.
-            count = 0
-            conf_apps_count = attended_applications.count()
-            
-            if conf_apps_count >= self.N_CHUNK_NO_THROTTLE:
-                self.stdout.write(f'Due to gmail throttling, emails will be sent in batches.')
-
-            messages = []
-            for application in attended_applications:
-                messages.append(emails.create_post_event_email(application))
-            
-            chunked_messages = list(chunk(messages, self.N_CHUNK_NO_THROTTLE))
-
-            see_chunked = input('Would you like to see the generated chunks? [y/N] ')
-            if see_chunked.lower() == 'y':
-                for chunk in chunked_messages:
-                    self.stdout.write(f'{"-" * 12}CHUNK{"-" * 12}')
-                    self.stdout.write('\n'.join(map(lambda m: f'<{m.to}>', chunk)))
-                    self.stdout.write(f'{"-" * 12}CHUNK{"-" * 12}')
-
-            proceed_with_emails = input('Would you like to proceed? [y/N] ')
-            if proceed_with_emails.lower() == 'y':
-                for chunk in chunked_messages:
-                    self.stdout.write(f'Sending chunk{count + 1}...')
-                    count += 1
-                    connection = mail.get_connection()
-                    connection.send_messages(chunk)
-                    self.stdout.write(f'Sleeping for {self.THROTTLE_TIMEOUT}s...')
-                    time.sleep(self.THROTTLE_TIMEOUT) # don't hurt gmail :(
-
-                self.stdout.write(self.style.SUCCESS(f'Successfully sent {len(messages)} post_event emails.'))
-
-            else:
-                self.stdout.write(f'Sent 0 check-in emails.')
+            attended_applications = list(Application.objects.filter(status=Application.ATTENDED).select_related('user'))
+            self.stdout.write(f'Found: {len(attended_applications)} ATTENDED applications.')
+            messages = emails.create_post_event_emails(attended_applications)
+            self.queue_emails('mails/post_event', messages, attended_applications)
 
 
     def send_template_test(self, template_name, recipients, action_required = False, context = {}):
@@ -215,48 +169,27 @@ class Command(BaseCommand):
         confirmed = input(confirm_msg)
 
         if confirmed.lower() == 'y':
-
-            def chunk(mlist, n):
-                """Yield successive n-sized chunks from lst."""
-                for i in range(0, len(mlist), n):
-                    yield mlist[i:i + n]
-
             self.stdout.write('Gathering confirmed applications...')
-            confirmed_applications = Application.objects.filter(status=Application.CONFIRMED)
-            self.stdout.write(f'Found: {confirmed_applications.count()} confirmed applications.')
-            self.stdout.write('Sending self check-in emails...')
+            confirmed_applications = list(Application.objects.filter(status=Application.CONFIRMED)
+                                          .select_related('user'))
+            self.stdout.write(f'Found: {len(confirmed_applications)} confirmed applications.')
+            messages = emails.create_online_checkin_emails(confirmed_applications)
+            self.queue_emails('mails/online_checkin', messages, confirmed_applications)
 
-            # gmail has a throttle @ 100 for emails; also doesn't like being spammed.
-            count = 0
-            conf_apps_count = confirmed_applications.count()
-            
-            if conf_apps_count >= self.N_CHUNK_NO_THROTTLE:
-                self.stdout.write(f'Due to gmail throttling, emails will be sent in batches.')
 
-            messages = []
-            for application in confirmed_applications:
-                messages.append(emails.create_online_checkin_email(application))
-            
-            chunked_messages = list(chunk(messages, self.N_CHUNK_NO_THROTTLE))
-
-            see_chunked = input('Would you like to see the generated chunks? [y/N] ')
-            if see_chunked.lower() == 'y':
-                for chunk in chunked_messages:
-                    self.stdout.write(f'{"-" * 12}CHUNK{"-" * 12}')
-                    self.stdout.write('\n'.join(map(lambda m: f'<{m.to}>', chunk)))
-                    self.stdout.write(f'{"-" * 12}CHUNK{"-" * 12}')
-
-            proceed_with_emails = input('Would you like to proceed? [y/N] ')
-            if proceed_with_emails.lower() == 'y':
-                for chunk in chunked_messages:
-                    self.stdout.write(f'Sending chunk{count + 1}...')
-                    count += 1
-                    connection = mail.get_connection()
-                    connection.send_messages(chunk)
-                    self.stdout.write(f'Sleeping for {self.THROTTLE_TIMEOUT}s...')
-                    time.sleep(self.THROTTLE_TIMEOUT) # don't hurt gmail :(
-
-                self.stdout.write(self.style.SUCCESS(f'Successfully sent {len(messages)} check-in emails.'))
+    def queue_emails(self, template_prefix, messages, applications):
+        see_recipients = input('Would you like to see the recipients? [y/N] ')
+        if see_recipients.lower() == 'y':
+            self.stdout.write('\n'.join(map(lambda m: f'<{m.to}>', messages)))
 
-            else:
-                self.stdout.write(f'Sent 0 check-in emails.')
\ No newline at end of file
+        proceed_with_emails = input('Would you like to proceed? [y/N] ')
+        if proceed_with_emails.lower() == 'y':
+            # gmail has a throttle @ 100 for emails; also doesn't like being spammed.
+            # send_outbox delivers them throttled, and skips applications that already got this email.
+            queued = emails.send_batch_emails(messages, template_prefix,
+                                              [EmailOutbox.key(app) for app in applications])
+            self.stdout.write(self.style.SUCCESS(f'Successfully queued {queued} {template_prefix} emails, '
+                                                 f'{len(messages) - queued} already e-mailed were skipped. '
+                                                 f'Run send_outbox to send them.'))
+        else:
+            self.stdout.write(f'Sent 0 emails.')
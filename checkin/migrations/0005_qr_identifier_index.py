@@ -0,0 +1,18 @@
+# Generated by Django 2.2.13 on 2026-10-18 11:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('checkin', '0004_auto_20200525_1519'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='checkin',
+            name='qr_identifier',
+            field=models.CharField(db_index=True, max_length=255, null=True),
+        ),
+    ]
@@ -5,6 +5,7 @@ from django.db import models
 from django.utils.datetime_safe import datetime
 
 from applications.models import Application
+from checkin.utils import invalidate_badges
 from user.models import User
 
 
@@ -14,18 +15,26 @@ class CheckIn(models.Model):
     update_time = models.DateTimeField()
 
     # QR identifier for wristband identification
-    qr_identifier = models.CharField(max_length=255, null=True)
+    qr_identifier = models.CharField(max_length=255, null=True, db_index=True)
 
     is_active = models.BooleanField(default=True)
 
+    def __init__(self, *args, **kwargs):
+        super(CheckIn, self).__init__(*args, **kwargs)
+        # Needed to invalidate the old badge when it gets reissued. Read from __dict__ to not load it if deferred.
+        self._original_qr_identifier = self.__dict__.get('qr_identifier')
+
     def save(self, force_insert=False, force_update=False, using=None,
              update_fields=None):
         self.update_time = datetime.now()
         super(CheckIn, self).save(force_insert, force_update, using,
                                   update_fields)
+        invalidate_badges(self._original_qr_identifier, self.qr_identifier)
+        self._original_qr_identifier = self.qr_identifier
         self.application.status = Application.ATTENDED
 
     def delete(self, using=None, keep_parents=False):
         self.application.status = Application.CONFIRMED
         self.application.save()
         super(CheckIn, self).delete(using, keep_parents)
+        invalidate_badges(self._original_qr_identifier, self.qr_identifier)
@@ -0,0 +1,25 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+
+from applications.models import Application
+from checkin.models import CheckIn
+from checkin.utils import invalidate_badges
+from user.models import User
+
+
+# Badges cache the diet of the application, refresh it when the application changes
+@receiver(post_save, sender=Application)
+def application_badge_invalidate(sender, instance, created, *args, **kwargs):
+    if created:
+        return None
+    invalidate_badges(*CheckIn.objects.filter(application_id=instance.pk).values_list('qr_identifier', flat=True))
+
+
+# Badges cache the roles of the user, refresh them when the user changes
+@receiver(post_save, sender=User)
+def user_badge_invalidate(sender, instance, created, update_fields=None, *args, **kwargs):
+    # Logins only update last_login, no need to go to the database for them
+    if created or (update_fields and set(update_fields) == {'last_login'}):
+        return None
+    invalidate_badges(*CheckIn.objects.filter(application__user_id=instance.pk)
+                      .values_list('qr_identifier', flat=True))
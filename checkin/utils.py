@@ -0,0 +1,60 @@
+import hashlib
+from collections import namedtuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+# Badges only change on check-in, reissue, enable/disable or when the hacker updates their data, all of which
+# invalidate the cache, so they can live for the whole event.
+BADGE_CACHE_TIMEOUT = 24 * 60 * 60
+
+BADGE_FIELDS = (
+    ('qr_identifier', 'qr_identifier'),
+    ('user_id', 'application__user_id'),
+    ('is_active', 'is_active'),
+    ('diet', 'application__diet'),
+    ('other_diet', 'application__other_diet'),
+    ('is_volunteer', 'application__user__is_volunteer'),
+    ('is_organizer', 'application__user__is_organizer'),
+    ('is_sponsor', 'application__user__is_sponsor'),
+    ('is_mentor', 'application__user__is_mentor'),
+)
+
+# Everything a scan needs to know about the hacker wearing a badge
+Badge = namedtuple('Badge', [name for name, _ in BADGE_FIELDS])
+
+
+def badge_cache_key(qr_identifier):
+    # QR codes are free text, hash them so they are always valid cache keys
+    return 'badge:%s' % hashlib.md5(str(qr_identifier).encode('utf-8')).hexdigest()
+
+
+def get_badges(qr_identifiers):
+    """
+    Resolves many QR identifiers at once using the cache and a single query for the ones missing.
+    :return: dict of QR identifier -> Badge. Unknown QR codes are not included (and never cached).
+    """
+    from checkin.models import CheckIn
+    keys = {badge_cache_key(qr): qr for qr in set(qr_identifiers) if qr}
+    badges = {badge.qr_identifier: badge for badge in cache.get_many(list(keys)).values()}
+    missing = [qr for qr in keys.values() if qr not in badges]
+    if missing:
+        found = {
+            row[0]: Badge(*row)
+            for row in CheckIn.objects.filter(qr_identifier__in=missing)
+            .values_list(*[lookup for _, lookup in BADGE_FIELDS])
+        }
+        cache.set_many({badge_cache_key(qr): badge for qr, badge in found.items()}, BADGE_CACHE_TIMEOUT)
+        badges.update(found)
+    return badges
+
+
+def get_badge(qr_identifier):
+    return get_badges([qr_identifier]).get(qr_identifier)
+
+
+def invalidate_badges(*qr_identifiers):
+    # Deleted once committed, otherwise a scan in the meantime could cache the badge as it was before the change
+    keys = [badge_cache_key(qr) for qr in qr_identifiers if qr]
+    if keys:
+        transaction.on_commit(lambda: cache.delete_many(keys))
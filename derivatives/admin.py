@@ -0,0 +1,25 @@
+from django.contrib import admin
+
+from derivatives import models
+
+
+class ImageDerivativeAdmin(admin.ModelAdmin):
+    list_display = (
+        'source', 'size', 'status', 'width', 'height', 'bytes', 'updated'
+    )
+    search_fields = (
+        'source', 'name', 'content_hash'
+    )
+    list_filter = (
+        'status', 'size'
+    )
+    readonly_fields = (
+        'created', 'updated'
+    )
+    ordering = ('-updated',)
+
+    def get_actions(self, request):
+        return []
+
+
+admin.site.register(models.ImageDerivative, admin_class=ImageDerivativeAdmin)
@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class DerivativesConfig(AppConfig):
+    name = 'derivatives'
+
+    def ready(self):
+        super(DerivativesConfig, self).ready()
+        from .signals import connect_image_fields
+        connect_image_fields()
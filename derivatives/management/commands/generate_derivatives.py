@@ -0,0 +1,28 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand
+
+from derivatives.models import ImageDerivative
+from derivatives.utils import IMAGE_FIELDS
+
+
+class Command(BaseCommand):
+    help = 'Generates the resized copies of the uploaded images that are pending or whose runner died. With --all, ' \
+           'also queues the copies of every image uploaded before they existed.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='queue the copies of every uploaded image')
+
+    def handle(self, *args, **options):
+        if options['all']:
+            self.stdout.write('Queueing images...')
+            sources = set()
+            for app_label, model_name, field in IMAGE_FIELDS:
+                if apps.is_installed(app_label):
+                    sources.update(apps.get_model(app_label, model_name).objects.exclude(**{field: ''})
+                                   .exclude(**{field + '__isnull': True}).values_list(field, flat=True).distinct())
+            for source in sources:
+                ImageDerivative.request(source, background=False)
+            self.stdout.write(self.style.SUCCESS('Queueing images... Successfully queued %s images' % len(sources)))
+        self.stdout.write('Generating image copies...')
+        count = ImageDerivative.run()
+        self.stdout.write(self.style.SUCCESS('Generating image copies... Successfully generated %s copies' % count))
@@ -0,0 +1,158 @@
+import threading
+from datetime import timedelta
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connection, models, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from derivatives.utils import DERIVATIVE_PATH, DERIVATIVE_SIZES, content_hash, open_image, render_derivative
+
+DERIVATIVE_STALE_MINUTES = 5
+
+
+class ImageDerivative(models.Model):
+    """
+    Resized copy of an uploaded image, generated in the background. Copies are stored by the hash of the original,
+    so identical uploads (e.g. the default profile picture) share them.
+    """
+    PENDING = 'P'
+    RUNNING = 'R'
+    DONE = 'D'
+    FAILED = 'F'
+
+    STATUS = (
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    # Storage name of the original image
+    source = models.CharField(max_length=255)
+    # Longest side the copy fits in
+    size = models.PositiveIntegerField()
+    status = models.CharField(max_length=2, choices=STATUS, default=PENDING)
+    # Storage name of the copy, the original itself when the copy would not be smaller
+    name = models.CharField(max_length=255, blank=True, default='')
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+    width = models.PositiveIntegerField(null=True, blank=True)
+    height = models.PositiveIntegerField(null=True, blank=True)
+    bytes = models.PositiveIntegerField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    updated = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ('source', 'size')
+        index_together = [('status', 'updated')]
+
+    def __str__(self):
+        return '%s (%spx)' % (self.source, self.size)
+
+    @classmethod
+    def request(cls, source, background=True):
+        """
+        Queues the copies of an image that are missing and, with background, starts generating them once the
+        transaction commits. Does nothing but a query when they already exist.
+        """
+        if not source:
+            return
+        existing = set(cls.objects.filter(source=source).values_list('size', flat=True))
+        missing = [size for size in DERIVATIVE_SIZES if size not in existing]
+        if missing:
+            cls.objects.bulk_create([cls(source=source, size=size) for size in missing], ignore_conflicts=True)
+            if background:
+                transaction.on_commit(cls.run_in_background)
+
+    @classmethod
+    def claimable(cls):
+        stale = timezone.now() - timedelta(minutes=DERIVATIVE_STALE_MINUTES)
+        return Q(status=cls.PENDING) | Q(status=cls.RUNNING, updated__lt=stale)
+
+    @classmethod
+    def generate(cls, source):
+        """
+        Generates the copies of an image that are pending. Only one runner can take them.
+        :return: number of copies generated
+        """
+        pks = list(cls.objects.filter(cls.claimable(), source=source).values_list('pk', flat=True))
+        claimed = cls.objects.filter(cls.claimable(), pk__in=pks).update(status=cls.RUNNING, updated=timezone.now())
+        if not claimed:
+            return 0
+        derivatives = list(cls.objects.filter(pk__in=pks, status=cls.RUNNING).order_by('size'))
+        try:
+            with default_storage.open(source, 'rb') as f:
+                content = f.read()
+            hash_ = content_hash(content)
+            image = open_image(content)
+            for derivative in derivatives:
+                derivative.render(image, content, hash_)
+        except Exception as e:
+            cls.objects.filter(pk__in=pks, status=cls.RUNNING).update(status=cls.FAILED, error=str(e),
+                                                                      updated=timezone.now())
+            return 0
+        return len(derivatives)
+
+    def render(self, image, content, hash_):
+        data, extension, width, height = render_derivative(image, self.size)
+        self.content_hash = hash_
+        if len(data) >= len(content) and max(image.size) <= self.size:
+            # Small originals are already the best copy
+            self.name, self.bytes, (self.width, self.height) = self.source, len(content), image.size
+        else:
+            # Images smaller than the size are only recompressed, the same copy serves every bigger size
+            self.name = DERIVATIVE_PATH.format(hash_, self.size if max(image.size) > self.size else 'full', extension)
+            if not default_storage.exists(self.name):
+                self.name = default_storage.save(self.name, ContentFile(data))
+            self.bytes, self.width, self.height = len(data), width, height
+        self.status = self.DONE
+        self.error = ''
+        self.save()
+
+    @classmethod
+    def run(cls):
+        """Generates every pending copy. :return: number of copies generated"""
+        count = 0
+        while True:
+            source = cls.objects.filter(cls.claimable()).order_by('pk').values_list('source', flat=True).first()
+            if source is None:
+                return count
+            count += cls.generate(source)
+
+    @classmethod
+    def run_in_background(cls):
+        def run():
+            try:
+                cls.run()
+            finally:
+                # The thread has its own database connection
+                connection.close()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @classmethod
+    def best(cls, sources, size):
+        """
+        Picks the smallest generated copy that is at least size pixels, or the biggest one if none is.
+        :return: dict of source -> storage name, sources without copies yet are not included
+        """
+        candidates = {}
+        for source, name, width, height in cls.objects.filter(source__in=set(sources), status=cls.DONE) \
+                .order_by('size').values_list('source', 'name', 'width', 'height'):
+            if source not in candidates or max(candidates[source][1:]) < size:
+                candidates[source] = (name, width, height)
+        return {source: name for source, (name, _, _) in candidates.items()}
+
+    @classmethod
+    def urls(cls, images, size):
+        """
+        URLs of the best copy of many images at once, or of the originals while the copies are being generated.
+        :param images: image field files, empty ones are skipped
+        :return: dict of image name -> URL
+        """
+        images = [image for image in images if image]
+        names = cls.best([image.name for image in images], size)
+        return {image.name: default_storage.url(names[image.name]) if image.name in names else image.url
+                for image in images}
@@ -0,0 +1,23 @@
+from django.apps import apps
+from django.db.models.signals import post_save
+
+from derivatives.models import ImageDerivative
+from derivatives.utils import IMAGE_FIELDS
+
+
+def image_derivatives_request(field):
+    def receiver(sender, instance, update_fields=None, *args, **kwargs):
+        # e.g. logins only update last_login
+        if update_fields and field not in update_fields:
+            return None
+        ImageDerivative.request(getattr(instance, field).name)
+
+    return receiver
+
+
+# Copies of the uploaded images are generated when the model is saved
+def connect_image_fields():
+    for app_label, model_name, field in IMAGE_FIELDS:
+        if apps.is_installed(app_label):
+            post_save.connect(image_derivatives_request(field), sender=apps.get_model(app_label, model_name),
+                              weak=False, dispatch_uid='image_derivatives_%s_%s_%s' % (app_label, model_name, field))
@@ -0,0 +1,23 @@
+from django import template
+
+from derivatives.models import ImageDerivative
+
+register = template.Library()
+
+
+@register.filter
+def image_url(image, size):
+    """
+    URL of the smallest copy of an image that is at least size pixels, or of the original while the copies are being
+    generated. Usage: {{ blog.thumbnail|image_url:480 }}
+    """
+    return ImageDerivative.urls([image], int(size)).get(image.name, '') if image else ''
+
+
+@register.filter
+def image_url_from(image, urls):
+    """
+    Same as image_url but from the URLs the view got for the whole page with ImageDerivative.urls, so lists don't
+    take a query per image. Usage: {{ blog.thumbnail|image_url_from:thumbnail_urls }}
+    """
+    return urls.get(image.name, image.url) if image else ''
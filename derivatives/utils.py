@@ -0,0 +1,46 @@
+import hashlib
+from io import BytesIO
+
+from PIL import Image, ImageOps
+
+# Longest side of each variant, in pixels. Templates ask for the size they display and get the smallest variant
+# that is at least that big.
+DERIVATIVE_SIZES = (160, 480, 960)
+DERIVATIVE_PATH = 'derivatives/{0}/{1}.{2}'
+JPEG_QUALITY = 80
+
+# Image fields with derivatives, as (app label, model, field). Apps that are not installed are skipped.
+IMAGE_FIELDS = (
+    ('blog', 'Blog', 'thumbnail'),
+    ('user', 'User', 'profile_picture'),
+    ('sponsors', 'SponsorApplication', 'company_logo'),
+    ('baggage', 'Bag', 'image'),
+)
+
+
+def content_hash(content):
+    return hashlib.sha256(content).hexdigest()
+
+
+def render_derivative(image, size):
+    """
+    Resizes and recompresses an image to fit in a size x size box. Images with transparency are kept as PNG, the
+    rest become progressive JPEG.
+    :return: (content, extension, width, height)
+    """
+    image = image.copy()
+    image.thumbnail((size, size), Image.LANCZOS)
+    output = BytesIO()
+    if image.mode in ('RGBA', 'LA') or (image.mode == 'P' and 'transparency' in image.info):
+        image.save(output, format='PNG', optimize=True)
+        extension = 'png'
+    else:
+        image.convert('RGB').save(output, format='JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+        extension = 'jpg'
+    return output.getvalue(), extension, image.width, image.height
+
+
+def open_image(content):
+    image = Image.open(BytesIO(content))
+    # Camera captures are rotated with EXIF, which is lost when resizing
+    return ImageOps.exif_transpose(image)
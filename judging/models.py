@@ -1,4 +1,6 @@
-from django.db import models
+import heapq
+
+from django.db import models, transaction
 from django.db.models import Count, Q, Avg, F
 
 from app import settings
@@ -51,31 +53,72 @@ class Room(models.Model):
 class PresentationManager(models.Manager):
 
     def create_from_projects(self, projects):
+        """
+        Assigns every project to the room with the shortest queue of each challenge it wants, and of the hackathon
+        challenge. Projects already presenting for a challenge are skipped, so imports can be run again. Rooms,
+        challenges and presentations are loaded and created in bulk, a few queries no matter how many projects.
+        :return: presentations created
+        """
+        projects = list(projects)
+        wanted = []
         for project in projects:
-            challenge_names = {d.strip() for d in project.desired_prizes.split(',') if d}
-            global_challenge_name = settings.HACKATHON_NAME
-            challenge_names.add(global_challenge_name)
-            for challenge_name in challenge_names:
-                challenge, _ = Challenge.objects.get_or_create(name=challenge_name)
-                num_pending_presentations = Count('presentation', filter=Q(presentation__done=False))
-                rooms = Room.objects \
-                    .filter(challenge=challenge) \
-                    .annotate(queue_len=num_pending_presentations) \
-                    .order_by('queue_len')
-                room_to_assign = rooms.first()
-
-                if room_to_assign is None:
-                    room_name = challenge_name + ' auto room'
-                    room_to_assign = Room.objects.create(name=room_name, challenge=challenge)
-                    room_to_assign.queue_len = 0
-
-                Presentation.objects.get_or_create(project=project, room__challenge=challenge,
-                                                   defaults={
-                                                       'room': room_to_assign,
-                                                       'done': False,
-                                                       'turn': room_to_assign.queue_len
-                                                   })
-        return None
+            challenge_names = {d.strip() for d in project.desired_prizes.split(',') if d.strip()}
+            challenge_names.add(settings.HACKATHON_NAME)
+            wanted.append((project, sorted(challenge_names)))
+        names = {name for _, challenge_names in wanted for name in challenge_names}
+
+        with transaction.atomic():
+            challenges = self._get_or_create_challenges(names)
+            existing = set(Presentation.objects.filter(project__in=projects, room__challenge__in=challenges.values())
+                           .values_list('project_id', 'room__challenge_id'))
+            queues = self._room_queues(challenges.values())
+
+            presentations = []
+            for project, challenge_names in wanted:
+                for challenge_name in challenge_names:
+                    challenge = challenges[challenge_name]
+                    if (project.pk, challenge.pk) in existing:
+                        continue
+                    existing.add((project.pk, challenge.pk))
+                    # Shortest queue first, the oldest room on ties
+                    queue_len, room_pk, room = queues[challenge.pk][0]
+                    presentations.append(Presentation(project=project, room=room, done=False, turn=queue_len))
+                    heapq.heapreplace(queues[challenge.pk], (queue_len + 1, room_pk, room))
+            self.bulk_create(presentations)
+        return presentations
+
+    def _get_or_create_challenges(self, names):
+        """:return: dict of name -> challenge, creating the ones missing"""
+        challenges = {}
+        for challenge in Challenge.objects.filter(name__in=names).order_by('-pk'):
+            challenges[challenge.name] = challenge
+        missing = names - set(challenges)
+        if missing:
+            Challenge.objects.bulk_create([Challenge(name=name) for name in sorted(missing)])
+            # Not every database returns the ids of bulk inserts
+            for challenge in Challenge.objects.filter(name__in=missing).order_by('-pk'):
+                challenges[challenge.name] = challenge
+        return challenges
+
+    def _room_queues(self, challenges):
+        """
+        :return: dict of challenge id -> heap of (pending presentations, room id, room) with every room of the
+        challenge, creating an auto room for the challenges without rooms
+        """
+        num_pending_presentations = Count('presentation', filter=Q(presentation__done=False))
+        queues = {challenge.pk: [] for challenge in challenges}
+        rooms = Room.objects.filter(challenge__in=challenges).annotate(queue_len=num_pending_presentations)
+        for room in rooms:
+            queues[room.challenge_id].append((room.queue_len, room.pk, room))
+        missing = [challenge for challenge in challenges if not queues[challenge.pk]]
+        if missing:
+            Room.objects.bulk_create([Room(name=challenge.name + ' auto room', challenge=challenge)
+                                      for challenge in missing])
+            for room in Room.objects.filter(challenge__in=missing):
+                queues[room.challenge_id].append((0, room.pk, room))
+        for queue in queues.values():
+            heapq.heapify(queue)
+        return queues
 
     def get_last_turn(self, room):
         return Presentation.objects.filter(room=room).order_by('turn').last().turn
@@ -47,13 +47,10 @@ def handle_uploaded_projects(file):
         'additional_team_member_count': 'Additional Team Member Count'
     }
 
-    for row in reader:
-        # Create project instance
-        data = {target: row[original] for target, original in fieldnames_to_csv_cols.items()}
-        try:
-            Project.objects.create(**data)
-        except IntegrityError:
-            pass
+    # Projects already imported are skipped
+    Project.objects.bulk_create([
+        Project(**{target: row[original] for target, original in fieldnames_to_csv_cols.items()}) for row in reader
+    ], ignore_conflicts=True)
 
     projects = Project.objects.all()
     Presentation.objects.create_from_projects(projects)
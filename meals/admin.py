@@ -30,5 +30,21 @@ class MealsEatenAdmin(admin.ModelAdmin):
         return []
 
 
+class MealsEatenCounterAdmin(admin.ModelAdmin):
+    list_display = (
+        'id', 'meal', 'user', 'times'
+    )
+    search_fields = (
+        'user__name', 'user__email'
+    )
+    list_filter = (
+        'meal',
+    )
+
+    def get_actions(self, request):
+        return []
+
+
 admin.site.register(models.Meal, admin_class=MealsMealAdmin)
 admin.site.register(models.Eaten, admin_class=MealsEatenAdmin)
+admin.site.register(models.EatenCounter, admin_class=MealsEatenCounterAdmin)
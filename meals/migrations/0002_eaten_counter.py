@@ -0,0 +1,39 @@
+# Generated by Django 2.2.13 on 2026-10-18 11:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count
+
+
+def count_eaten(apps, schema_editor):
+    Eaten = apps.get_model('meals', 'Eaten')
+    EatenCounter = apps.get_model('meals', 'EatenCounter')
+    EatenCounter.objects.bulk_create([
+        EatenCounter(meal_id=eaten['meal_id'], user_id=eaten['user_id'], times=eaten['times'])
+        for eaten in Eaten.objects.values('meal_id', 'user_id').annotate(times=Count('id'))
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('meals', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EatenCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('times', models.PositiveIntegerField(default=0)),
+                ('meal', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='meals.Meal')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('meal', 'user')},
+            },
+        ),
+        migrations.RunPython(count_eaten, migrations.RunPython.noop),
+    ]
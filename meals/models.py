@@ -1,4 +1,7 @@
-from django.db import models
+from collections import defaultdict
+
+from django.db import IntegrityError, models, transaction
+from django.db.models import F
 
 from user.models import User
 
@@ -38,6 +41,28 @@ class Meal(models.Model):
     def eaten(self):
         return Eaten.objects.filter(meal=self).count()
 
+    def serve(self, user_id):
+        """
+        Logs that the user ate this meal if they have not reached the maximum number of times yet. The check and the
+        increment are a single conditional UPDATE on the EatenCounter row, so two scans of the same badge can never
+        get past Meal.times.
+        :return: tuple (served, times the user has eaten this meal)
+        """
+        counters = EatenCounter.objects.filter(meal=self, user_id=user_id)
+        with transaction.atomic():
+            served = counters.filter(times__lt=self.times).update(times=F('times') + 1)
+            if not served and self.times > 0:
+                try:
+                    with transaction.atomic():
+                        EatenCounter.objects.create(meal=self, user_id=user_id, times=1)
+                    served = True
+                except IntegrityError:
+                    # The counter already exists, either full or just created by another scan
+                    served = counters.filter(times__lt=self.times).update(times=F('times') + 1)
+            if served:
+                Eaten.objects.create(meal=self, user_id=user_id)
+        return bool(served), counters.values_list('times', flat=True).first() or 0
+
 
 class Eaten(models.Model):
     """Represents when a hacker has eatean a meal"""
@@ -48,3 +73,54 @@ class Eaten(models.Model):
     user = models.ForeignKey(User, null=False, on_delete=models.CASCADE)
     # Ate time
     time = models.DateTimeField(auto_now=False, auto_now_add=True)
+
+    def delete(self, using=None, keep_parents=False):
+        # Give the meal back to the user
+        EatenCounter.objects.filter(meal_id=self.meal_id, user_id=self.user_id, times__gt=0) \
+            .update(times=F('times') - 1)
+        return super(Eaten, self).delete(using, keep_parents)
+
+
+class EatenCounter(models.Model):
+    """Number of times a user has eaten a meal. Keeps Meal.times checks O(1) and free of races"""
+    meal = models.ForeignKey(Meal, null=False, on_delete=models.CASCADE)
+    user = models.ForeignKey(User, null=False, on_delete=models.CASCADE)
+    times = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('meal', 'user')
+
+    @classmethod
+    def lock_in_bulk(cls, keys):
+        """
+        Locks the counters of the given meals and users until the end of the transaction, creating the missing ones
+        first so that a concurrent Meal.serve can't insert them in the meantime.
+        :param keys: (meal id, user id) pairs
+        :return: dict (meal id, user id) -> locked EatenCounter
+        """
+        keys = set(keys)
+        if not keys:
+            return {}
+        cls.objects.bulk_create([cls(meal_id=meal_id, user_id=user_id) for meal_id, user_id in keys],
+                                ignore_conflicts=True)
+        return {
+            (counter.meal_id, counter.user_id): counter
+            for counter in cls.objects.select_for_update().filter(meal_id__in={meal_id for meal_id, _ in keys},
+                                                                  user_id__in={user_id for _, user_id in keys})
+            if (counter.meal_id, counter.user_id) in keys
+        }
+
+    @classmethod
+    def set_times_in_bulk(cls, counters, times_eaten):
+        """
+        Bulk version of Meal.serve for callers that checked the quotas themselves while holding the counters locked
+        with lock_in_bulk, like the offline scans sync.
+        :param counters: dict (meal id, user id) -> locked EatenCounter, one for every key in times_eaten
+        :param times_eaten: dict (meal id, user id) -> new number of times eaten
+        """
+        counters_by_times = defaultdict(list)
+        for key, counter in counters.items():
+            if times_eaten.get(key, counter.times) != counter.times:
+                counters_by_times[times_eaten[key]].append(counter.pk)
+        for times, pks in counters_by_times.items():
+            cls.objects.filter(pk__in=pks).update(times=times)
@@ -17,9 +17,8 @@ from rest_framework.views import APIView
 
 from app.mixins import TabsViewMixin
 from app.views import TabsView
-from applications import models as models_app
 from applications.models import Application
-from checkin.models import CheckIn
+from checkin.utils import get_badge
 from meals.models import Meal, Eaten
 from meals.tables import MealsListTable, MealsListFilter, MealsUsersTable, MealsUsersFilter
 from user.mixins import IsOrganizerMixin, IsVolunteerMixin
@@ -188,32 +187,24 @@ class MealsCheckin(IsVolunteerMixin, TemplateView):
                            'This meal is not open yet or it has ended. Reach out to an organizer to activate it again')
             return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
-        hacker_checkin = CheckIn.objects.filter(qr_identifier=qr_id).first()
-        if not hacker_checkin:
+        badge = get_badge(qr_id)
+        if not badge:
             messages.error(self.request, 'Invalid QR code!')
             return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
-        hacker_application = getattr(hacker_checkin, 'application', None)
-        if not hacker_application:
-            messages.error(self.request, 'No user found for this QR code!')
-            return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
-
-        times_hacker_ate = Eaten.objects.filter(meal=current_meal, user=hacker_application.user).count()
-        if times_hacker_ate >= current_meal.times:
+        served, times_hacker_ate = current_meal.serve(badge.user_id)
+        if not served:
             error_message = 'Warning! Hacker already ate %d out of %d available times!' % \
                             (times_hacker_ate, current_meal.times)
             messages.error(self.request, error_message)
             return HttpResponseRedirect(request.META.get('HTTP_REFERER'))
 
-        checkin = Eaten(meal=current_meal, user=hacker_application.user)
-        checkin.save()
-
-        if hacker_application.diet == models_app.D_NONE:
+        if badge.diet == Application.D_NONE:
             diet = 'No dietary restriction.'
-        elif hacker_application.diet == models_app.D_OTHER:
-            diet = hacker_application.other_diet
+        elif badge.diet == Application.D_OTHER:
+            diet = badge.other_diet
         else:
-            diet = hacker_application.diet
+            diet = badge.diet
 
         messages.success(self.request, f'Hacker has been successfully logged for this meal! DIET INFO: {diet}')
 
@@ -263,28 +254,16 @@ class MealsApi(APIView):
         if obj_meal is None:
             return HttpResponse(json.dumps({'code': 1, 'message': 'Invalid meal'}), content_type='application/json')
         if var_object == 'user':
-            var_repetitions = obj_meal.times
             var_user = request.GET.get('user')
-            obj_checkin = CheckIn.objects.filter(qr_identifier=var_user).first()
-            if obj_checkin is None:
+            badge = get_badge(var_user)
+            if badge is None:
                 return HttpResponse(json.dumps({'code': 1, 'message': 'Invalid user'}),
                                     content_type='application/json')
-            obj_user = obj_checkin.application_user
-            obj_application = Application.objects.filter(user=obj_user).first()
-            if obj_user.diet:
-                var_diet = obj_user.diet
-            elif obj_application:
-                var_diet = obj_application.diet
-            else:
-                var_diet = "UNKNOWN"
-            var_eatens = Eaten.objects.filter(meal=obj_meal, user=obj_user).count()
-            if var_eatens >= var_repetitions:
+            var_diet = badge.diet or "UNKNOWN"
+            served, _ = obj_meal.serve(badge.user_id)
+            if not served:
                 return HttpResponse(json.dumps({'code': 2, 'message': 'Hacker alreay ate'}),
                                     content_type='application/json')
-            obj_eaten = Eaten()
-            obj_eaten.meal = obj_meal
-            obj_eaten.user = obj_user
-            obj_eaten.save()
             return HttpResponse(json.dumps({'code': 0, 'content': {'diet': var_diet}}),
                                 content_type='application/json')
         var_repetitions = request.GET.get('times')
@@ -27,5 +27,27 @@ class VoteAdmin(OrganizerBaseAdmin):
 
 
 
+class ReviewerStatsAdmin(OrganizerBaseAdmin):
+    list_display = OrganizerBaseAdmin.list_display + ('user', 'count', 'tech_mean', 'tech_scale', 'personal_mean',
+                                                      'personal_scale')
+    search_fields = OrganizerBaseAdmin.search_fields + ('user__email', 'user__name')
+
+
+class ReviewQueueEntryAdmin(OrganizerBaseAdmin):
+    list_display = OrganizerBaseAdmin.list_display + ('application', 'vote_count', 'submission_date', 'leased_by',
+                                                      'lease_expires')
+    search_fields = OrganizerBaseAdmin.search_fields + ('application__user__email', 'application__user__name')
+
+
+class BulkActionJobAdmin(OrganizerBaseAdmin):
+    list_display = OrganizerBaseAdmin.list_display + ('action', 'status', 'created_by', 'created', 'total',
+                                                      'processed', 'skipped', 'finished')
+    list_filter = OrganizerBaseAdmin.list_filter + ('action', 'status')
+    exclude = ('applications',)
+
+
 admin.site.register(models.ApplicationComment, admin_class=CommentAdmin)
 admin.site.register(models.Vote, admin_class=VoteAdmin)
+admin.site.register(models.ReviewerStats, admin_class=ReviewerStatsAdmin)
+admin.site.register(models.ReviewQueueEntry, admin_class=ReviewQueueEntryAdmin)
+admin.site.register(models.BulkActionJob, admin_class=BulkActionJobAdmin)
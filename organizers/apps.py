@@ -0,0 +1,13 @@
+from __future__ import unicode_literals
+
+from django.apps import AppConfig
+
+
+class OrganizersConfig(AppConfig):
+    name = 'organizers'
+
+    def ready(self):
+        super(OrganizersConfig, self).ready()
+        from .signals import vote_stats_remove, application_review_queue
+        vote_stats_remove
+        application_review_queue
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from organizers.models import ReviewerStats, Vote
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the reviewer statistics and refreshes the stored calculated_vote of every vote, ' \
+           'one UPDATE per reviewer, and the stored score of every application. With --scores, only refreshes ' \
+           'the scores with a single UPDATE.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scores', action='store_true', help='only refresh the score of every application')
+
+    def handle(self, *args, **options):
+        if options['scores']:
+            self.stdout.write('Refreshing scores...')
+            count = Vote.update_scores()
+            self.stdout.write(self.style.SUCCESS('Refreshing scores... Successfully refreshed %s applications' % count))
+            return
+        reviewers = Vote.objects.order_by().values_list('user_id', flat=True).distinct()
+        self.stdout.write('Recalculating votes...')
+        count = 0
+        for user_id in reviewers:
+            with transaction.atomic():
+                ReviewerStats.lock(user_id)
+                count += ReviewerStats.rebuild(user_id).refresh_votes()
+        ReviewerStats.objects.exclude(user_id__in=reviewers).delete()
+        Vote.update_scores()
+        self.stdout.write(self.style.SUCCESS('Recalculating votes... Successfully recalculated %s votes' % count))
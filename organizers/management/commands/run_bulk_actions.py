@@ -0,0 +1,22 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+from django.utils import timezone
+
+from organizers.models import BULK_ACTION_STALE_MINUTES, BulkActionJob
+
+
+class Command(BaseCommand):
+    help = 'Runs the invite and wait list jobs that are queued or whose runner died, e.g. after a restart'
+
+    def handle(self, *args, **options):
+        stale = timezone.now() - timedelta(minutes=BULK_ACTION_STALE_MINUTES)
+        claimable = Q(status=BulkActionJob.QUEUED) | Q(status=BulkActionJob.RUNNING, heartbeat__lt=stale)
+        jobs = BulkActionJob.objects.filter(claimable).order_by('pk')
+        self.stdout.write('Running bulk actions...')
+        count = 0
+        for job in jobs:
+            if job.run():
+                count += 1
+        self.stdout.write(self.style.SUCCESS('Running bulk actions... Successfully ran %s jobs' % count))
@@ -0,0 +1,51 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:00
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def build_stats(apps, schema_editor):
+    Vote = apps.get_model('organizers', 'Vote')
+    ReviewerStats = apps.get_model('organizers', 'ReviewerStats')
+    votes = {}
+    for user_id, tech, personal in Vote.objects.filter(tech__isnull=False, personal__isnull=False) \
+            .values_list('user_id', 'tech', 'personal').iterator():
+        votes.setdefault(user_id, []).append((tech, personal))
+    stats = []
+    for user_id, user_votes in votes.items():
+        count = len(user_votes)
+        tech_mean = sum(tech for tech, _ in user_votes) / count
+        personal_mean = sum(personal for _, personal in user_votes) / count
+        tech_m2 = sum((tech - tech_mean) ** 2 for tech, _ in user_votes)
+        personal_m2 = sum((personal - personal_mean) ** 2 for _, personal in user_votes)
+        stats.append(ReviewerStats(user_id=user_id, count=count, tech_mean=tech_mean, tech_m2=tech_m2,
+                                   personal_mean=personal_mean, personal_m2=personal_m2,
+                                   tech_scale=round(tech_m2 / count, 2) or 1.0,
+                                   personal_scale=round(personal_m2 / count, 2) or 1.0))
+    ReviewerStats.objects.bulk_create(stats)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('user', '0013_auto_20200710_1556'),
+        ('organizers', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='reviewer_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('tech_mean', models.FloatField(default=0)),
+                ('tech_m2', models.FloatField(default=0)),
+                ('personal_mean', models.FloatField(default=0)),
+                ('personal_m2', models.FloatField(default=0)),
+                ('tech_scale', models.FloatField(default=1)),
+                ('personal_scale', models.FloatField(default=1)),
+            ],
+        ),
+        migrations.RunPython(build_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+from django.db.models import Count, Q
+
+
+def fill_queue(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    ReviewQueueEntry = apps.get_model('organizers', 'ReviewQueueEntry')
+    pending = Application.objects.filter(status='P') \
+        .annotate(count=Count('vote', filter=Q(vote__calculated_vote__isnull=False)))
+    ReviewQueueEntry.objects.bulk_create([
+        ReviewQueueEntry(application_id=application.pk, submission_date=application.submission_date,
+                         vote_count=application.count)
+        for application in pending.iterator()
+    ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('applications', '0039_application_mlh_promotional'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('organizers', '0002_reviewer_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ReviewQueueEntry',
+            fields=[
+                ('application', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='review_queue_entry', serialize=False, to='applications.Application')),
+                ('vote_count', models.PositiveIntegerField(default=0)),
+                ('submission_date', models.DateTimeField()),
+                ('lease_expires', models.DateTimeField(blank=True, null=True)),
+                ('leased_by', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'index_together': {('vote_count', 'submission_date')},
+            },
+        ),
+        migrations.RunPython(fill_queue, migrations.RunPython.noop),
+    ]
@@ -1,13 +1,29 @@
 from __future__ import unicode_literals
 
-from django.db import models
-# Votes weight
-from django.db.models import Avg, F
+import logging
+import threading
+from datetime import timedelta
+
+from django.apps import apps
+from django.db import connection, models, transaction
+from django.db.models import Avg, Count, ExpressionWrapper, F, FloatField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Cast, Coalesce
 from django.utils import timezone
 
+from applications import emails
 from applications.models import Application
+from outbox.models import EmailOutbox
+from stats.models import StatsCounter
+from stats.utils import invalidate_app_stats
 from user.models import User
 
+# Minutes an application is reserved for the reviewer it was handed to
+REVIEW_LEASE_MINUTES = 10
+# Applications whose e-mails are rendered at once by a bulk action job, small enough to render them in the job thread
+BULK_ACTION_CHUNK_SIZE = 100
+# Running jobs without progress for this long are considered dead and resumed by the run_bulk_actions command
+BULK_ACTION_STALE_MINUTES = 5
+
 
 class Vote(models.Model):
     TECH_WEIGHT = 0.2
@@ -36,53 +52,65 @@ class Vote(models.Model):
              update_fields=None):
         """
         We are overriding this in order to standarize each review vote with the
-        new vote.
-        Also we store a calculated vote for each vote so that we don't need to
-        do it later.
-
-        Thanks to Django awesomeness we do all the calculations with only 3
-        queries to the database. 2 selects and 1 update. The performance is way
-        faster than I thought.
-        If improvements need to be done using a better DB than SQLite should
-        increase performance. As long as the database can handle aggregations
-        efficiently this will be good.
-
-        By casassg
+        reviewer's mean and deviation.
+
+        The reviewer statistics are kept up to date incrementally in
+        ReviewerStats, so saving a vote is O(1) no matter how many votes the
+        reviewer has cast. Only this vote's calculated_vote is stored, the
+        score of the rest of the reviewer's votes is derived at read time from
+        the stats (see Vote.score), and the stored values can be refreshed in
+        bulk with the recalculate_votes command.
         """
-        super(Vote, self).save(force_insert, force_update, using,
-                               update_fields)
+        with transaction.atomic():
+            previous = None
+            if self.pk:
+                previous = Vote.objects.filter(pk=self.pk).values_list('tech', 'personal').first()
+            stats = None
+            if (previous and previous[0] and previous[1]) or (self.personal and self.tech):
+                stats = ReviewerStats.lock(self.user_id)
+                if previous and previous[0] and previous[1]:
+                    stats.remove(previous[0], previous[1])
+                if self.personal and self.tech:
+                    stats.add(self.tech, self.personal)
+                stats.save()
+            # only calculate when values are different than None
+            self.calculated_vote = stats.calculate(self.tech, self.personal) \
+                if self.personal and self.tech else None
+            super(Vote, self).save(force_insert, force_update, using,
+                                   update_fields)
+            scored = int(bool(self.personal and self.tech)) - int(bool(previous and previous[0] and previous[1]))
+            ReviewQueueEntry.vote_done(self.application_id, self.user_id, scored)
+            # New stats also change the score of the other applications the reviewer voted, those are
+            # refreshed in bulk by recalculate_votes --scores
+            Vote.update_scores([self.application_id])
 
-        # only recalculate when values are different than None
-        if not self.personal or not self.tech:
-            return
+    @classmethod
+    def score(cls, prefix=''):
+        """
+        Expression with the standardized score of a vote, computed from the
+        current statistics of its reviewer. Skipped votes score NULL.
+        :param prefix: lookup path to the vote, e.g. 'vote__' from Application
+        """
+        stats = prefix + 'user__reviewer_stats__'
+        personal = (Cast(F(prefix + 'personal'), FloatField()) - F(stats + 'personal_mean')) / \
+            F(stats + 'personal_scale')
+        tech = (Cast(F(prefix + 'tech'), FloatField()) - F(stats + 'tech_mean')) / F(stats + 'tech_scale')
+        return ExpressionWrapper(cls.PERSONAL_WEIGHT * personal + cls.TECH_WEIGHT * tech, output_field=FloatField())
 
-        # Retrieve averages
-        avgs = User.objects.filter(id=self.user_id).aggregate(
-            tech=Avg('vote__tech'),
-            pers=Avg('vote__personal'))
-        p_avg = round(avgs['pers'], 2)
-        t_avg = round(avgs['tech'], 2)
-
-        # Calculate standard deviation for each scores
-        sds = User.objects.filter(id=self.user_id).aggregate(
-            tech=Avg((F('vote__tech') - t_avg) * (F('vote__tech') - t_avg)),
-            pers=Avg((F('vote__personal') - p_avg) *
-                     (F('vote__personal') - p_avg)))
-
-        # Alternatively, if standard deviation is 0.0, set it as 1.0 to avoid
-        # division by 0.0 in the update statement
-        p_sd = round(sds['pers'], 2) or 1.0
-        t_sd = round(sds['tech'], 2) or 1.0
-
-        # Apply standarization. Standarization formula:
-        # x(new) = (x - u)/o
-        # where u is the mean and o is the standard deviation
-        #
-        # See this: http://www.dataminingblog.com/standardization-vs-
-        # normalization/
-        personal = self.PERSONAL_WEIGHT * (F('personal') - p_avg) / p_sd
-        tech = self.TECH_WEIGHT * (F('tech') - t_avg) / t_sd
-        Vote.objects.filter(user=self.user).update(calculated_vote=personal + tech)
+    @classmethod
+    def update_scores(cls, applications=None):
+        """
+        Stores the average score and the number of reviews of the applications with a single UPDATE
+        :param applications: ids (or a subquery of ids) of the applications to update, all of them when None
+        """
+        votes = cls.objects.filter(application_id=OuterRef('pk')).order_by().values('application_id')
+        score = votes.annotate(avg=Avg(cls.score())).values('avg')
+        count = votes.annotate(count=Count('pk')).values('count')
+        qs = Application.objects.all()
+        if applications is not None:
+            qs = qs.filter(pk__in=applications)
+        return qs.update(score=Subquery(score, output_field=FloatField()),
+                         review_count=Coalesce(Subquery(count), 0))
 
     class Meta:
         unique_together = ('application', 'user')
@@ -93,3 +121,297 @@ class ApplicationComment(models.Model):
     author = models.ForeignKey(User, on_delete=models.CASCADE)
     text = models.CharField(max_length=500)
     created_at = models.DateTimeField(default=timezone.now)
+
+
+class ReviewerStats(models.Model):
+    """
+    Running count, mean and sum of squared differences (Welford's method) of
+    the tech and personal votes of a reviewer. Skipped votes are not counted.
+    """
+    user = models.OneToOneField(User, primary_key=True, on_delete=models.CASCADE, related_name='reviewer_stats')
+    count = models.PositiveIntegerField(default=0)
+    tech_mean = models.FloatField(default=0)
+    tech_m2 = models.FloatField(default=0)
+    personal_mean = models.FloatField(default=0)
+    personal_m2 = models.FloatField(default=0)
+    # Divisors used to standarize the votes: the variance, or 1.0 when it is 0 to avoid dividing by 0
+    tech_scale = models.FloatField(default=1)
+    personal_scale = models.FloatField(default=1)
+
+    @classmethod
+    def lock(cls, user_id):
+        """Stats of the reviewer locked until the end of the transaction"""
+        cls.objects.get_or_create(user_id=user_id)
+        return cls.objects.select_for_update().get(user_id=user_id)
+
+    def add(self, tech, personal):
+        self.count += 1
+        tech, personal = float(tech), float(personal)
+        delta = tech - self.tech_mean
+        self.tech_mean += delta / self.count
+        self.tech_m2 += delta * (tech - self.tech_mean)
+        delta = personal - self.personal_mean
+        self.personal_mean += delta / self.count
+        self.personal_m2 += delta * (personal - self.personal_mean)
+        self.update_scales()
+
+    def remove(self, tech, personal):
+        if self.count <= 1:
+            self.count, self.tech_mean, self.tech_m2, self.personal_mean, self.personal_m2 = 0, 0, 0, 0, 0
+            self.update_scales()
+            return
+        tech, personal = float(tech), float(personal)
+        self.count -= 1
+        tech_mean = self.tech_mean - (tech - self.tech_mean) / self.count
+        self.tech_m2 = max(0.0, self.tech_m2 - (tech - self.tech_mean) * (tech - tech_mean))
+        self.tech_mean = tech_mean
+        personal_mean = self.personal_mean - (personal - self.personal_mean) / self.count
+        self.personal_m2 = max(0.0, self.personal_m2 - (personal - self.personal_mean) * (personal - personal_mean))
+        self.personal_mean = personal_mean
+        self.update_scales()
+
+    def update_scales(self):
+        if not self.count:
+            self.tech_scale = self.personal_scale = 1.0
+            return
+        self.tech_scale = round(self.tech_m2 / self.count, 2) or 1.0
+        self.personal_scale = round(self.personal_m2 / self.count, 2) or 1.0
+
+    def calculate(self, tech, personal):
+        """
+        Standarization formula:
+        x(new) = (x - u)/o
+        where u is the mean and o is the deviation
+
+        See this: http://www.dataminingblog.com/standardization-vs-normalization/
+        """
+        return Vote.PERSONAL_WEIGHT * (float(personal) - self.personal_mean) / self.personal_scale + \
+            Vote.TECH_WEIGHT * (float(tech) - self.tech_mean) / self.tech_scale
+
+    def refresh_votes(self):
+        """Rewrites the stored calculated_vote of every vote of the reviewer with a single UPDATE"""
+        personal = Vote.PERSONAL_WEIGHT * (F('personal') - self.personal_mean) / \
+            self.personal_scale
+        tech = Vote.TECH_WEIGHT * (F('tech') - self.tech_mean) / self.tech_scale
+        return Vote.objects.filter(user_id=self.user_id, tech__isnull=False, personal__isnull=False) \
+            .update(calculated_vote=personal + tech)
+
+    @classmethod
+    def rebuild(cls, user_id):
+        """Recomputes the stats of the reviewer from all their votes"""
+        stats = cls(user_id=user_id)
+        for tech, personal in Vote.objects.filter(user_id=user_id, tech__isnull=False, personal__isnull=False) \
+                .values_list('tech', 'personal').iterator():
+            stats.add(tech, personal)
+        stats.save()
+        return stats
+
+
+class ReviewQueueEntry(models.Model):
+    """
+    Pending application waiting for reviews. Applications are handed out by number of votes and then by age, each one
+    leased to a single reviewer for REVIEW_LEASE_MINUTES so that concurrent reviewers don't get the same one.
+    Expired leases make the application available again.
+    """
+    application = models.OneToOneField(Application, primary_key=True, on_delete=models.CASCADE,
+                                       related_name='review_queue_entry')
+    # Votes with a score, skips are not counted
+    vote_count = models.PositiveIntegerField(default=0)
+    # Copied from the application so that the queue order is a single index
+    submission_date = models.DateTimeField()
+    leased_by = models.ForeignKey(User, null=True, blank=True, on_delete=models.SET_NULL, related_name='+')
+    lease_expires = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        index_together = [('vote_count', 'submission_date')]
+
+    @classmethod
+    def pending(cls, user):
+        """Queue entries of pending applications the user has not voted yet, in review order"""
+        return cls.objects.filter(application__status=Application.PENDING) \
+            .exclude(application__vote__user_id=user.id) \
+            .order_by('vote_count', 'submission_date')
+
+    @classmethod
+    def lease(cls, user):
+        """
+        Reserves the next application for the user. The lease is taken with a conditional UPDATE, so when two
+        reviewers race for the same application only one gets it and the other moves on to the next one.
+        :return: the leased application or None if there is nothing left to review
+        """
+        now = timezone.now()
+        expires = now + timedelta(minutes=REVIEW_LEASE_MINUTES)
+        # Reloading the review page keeps the same application
+        current = cls.pending(user).filter(leased_by=user, lease_expires__gt=now).first()
+        if current:
+            cls.objects.filter(pk=current.pk).update(lease_expires=expires)
+            return current.application
+        available = Q(lease_expires__isnull=True) | Q(lease_expires__lte=now)
+        while True:
+            candidates = list(cls.pending(user).filter(available).values_list('pk', flat=True)[:5])
+            if not candidates:
+                return None
+            for pk in candidates:
+                if cls.objects.filter(available, pk=pk).update(leased_by=user, lease_expires=expires):
+                    return Application.objects.get(pk=pk)
+
+    @classmethod
+    def vote_done(cls, application_id, user_id, scored=1):
+        """Counts the vote and releases the application if the voter held its lease"""
+        cls.objects.filter(application_id=application_id).update(vote_count=F('vote_count') + scored)
+        cls.objects.filter(application_id=application_id, leased_by_id=user_id) \
+            .update(leased_by=None, lease_expires=None)
+
+    @classmethod
+    def sync(cls, application):
+        """Adds the application to the queue while it is pending and takes it out otherwise"""
+        if application.status != Application.PENDING:
+            cls.objects.filter(application_id=application.pk).delete()
+        elif not cls.objects.filter(application_id=application.pk).exists():
+            cls.objects.get_or_create(application_id=application.pk, defaults={
+                'submission_date': application.submission_date,
+                'vote_count': Vote.objects.filter(application_id=application.pk, calculated_vote__isnull=False).count()
+            })
+
+
+class BulkActionJob(models.Model):
+    """
+    Invite or wait list wave. The applications change status all at once when the job is created, then the job
+    renders and queues their e-mails in the background, chunk by chunk, so that the director can follow the progress.
+    A job interrupted by a restart resumes from the last chunk done.
+    """
+    INVITE = 'I'
+    WAITLIST = 'W'
+
+    ACTIONS = (
+        (INVITE, 'Invite'),
+        (WAITLIST, 'Wait list'),
+    )
+
+    QUEUED = 'Q'
+    RUNNING = 'R'
+    DONE = 'D'
+    FAILED = 'F'
+
+    STATUS = (
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    )
+
+    # Status the applications are moved to, and statuses that can't be moved (same rules as invite and reject)
+    NEW_STATUS = {INVITE: Application.INVITED, WAITLIST: Application.REJECTED}
+    NOT_ELIGIBLE = {INVITE: (Application.CONFIRMED, Application.ATTENDED), WAITLIST: (Application.ATTENDED,)}
+
+    action = models.CharField(max_length=1, choices=ACTIONS)
+    status = models.CharField(max_length=1, choices=STATUS, default=QUEUED)
+    created_by = models.ForeignKey(User, null=True, on_delete=models.SET_NULL, related_name='+')
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+    # Last time the job made progress
+    heartbeat = models.DateTimeField(null=True, blank=True)
+    # Used for the links of the e-mails, as there is no request in the background
+    base_url = models.CharField(max_length=200)
+    applications = models.ManyToManyField(Application, related_name='+')
+    total = models.PositiveIntegerField(default=0)
+    # Selected applications that could not be moved
+    skipped = models.PositiveIntegerField(default=0)
+    processed = models.PositiveIntegerField(default=0)
+    # Applications are processed in pk order, the ones up to this one are done
+    last_application_id = models.IntegerField(default=0)
+    error = models.TextField(blank=True)
+
+    @classmethod
+    def start(cls, action, user, queryset, base_url):
+        """
+        Moves the eligible applications of the queryset with a single UPDATE and creates the job that sends their
+        e-mails, which starts in the background once the transaction is committed.
+        """
+        values = {}
+        if action == cls.INVITE:
+            values = {'invited_by': Coalesce('invited_by', Value(user.pk)), 'last_invite': timezone.now()}
+        with transaction.atomic():
+            selected = queryset.count()
+            updated = StatsCounter.set_status(queryset.exclude(status__in=cls.NOT_ELIGIBLE[action]),
+                                              cls.NEW_STATUS[action], **values)
+            # Only pending applications can be reviewed
+            ReviewQueueEntry.objects.exclude(application__status=Application.PENDING).delete()
+            job = cls.objects.create(action=action, created_by=user, base_url=base_url, total=len(updated),
+                                     skipped=selected - len(updated))
+            cls.applications.through.objects.bulk_create([
+                cls.applications.through(bulkactionjob_id=job.pk, application_id=application_id)
+                for application_id in updated
+            ])
+            transaction.on_commit(job.run_in_background)
+        invalidate_app_stats()
+        return job
+
+    def claim(self):
+        """Takes the job if it is queued or its runner died. Only one runner can take it."""
+        now = timezone.now()
+        claimable = Q(status=self.QUEUED) | \
+            Q(status=self.RUNNING, heartbeat__lt=now - timedelta(minutes=BULK_ACTION_STALE_MINUTES))
+        return bool(BulkActionJob.objects.filter(claimable, pk=self.pk).update(status=self.RUNNING, heartbeat=now))
+
+    def run(self):
+        """Renders and queues the e-mails of the applications left. :return: False if the job was not claimed"""
+        if not self.claim():
+            return False
+        self.refresh_from_db()
+        # The invite e-mails show the reimbursement of the hacker
+        related = ['user', 'user__reimbursement'] if apps.is_installed('reimbursement') else ['user']
+        try:
+            while True:
+                # Applications that changed status since the job started don't get the e-mail
+                chunk = list(self.applications.filter(pk__gt=self.last_application_id,
+                                                      status=self.NEW_STATUS[self.action])
+                             .select_related(*related).order_by('pk')[:BULK_ACTION_CHUNK_SIZE])
+                if not chunk:
+                    break
+                with transaction.atomic():
+                    self.queue_emails(chunk)
+                    self.last_application_id = chunk[-1].pk
+                    self.processed = self.applications.filter(pk__lte=self.last_application_id).count()
+                    self.heartbeat = timezone.now()
+                    self.save(update_fields=['last_application_id', 'processed', 'heartbeat'])
+            self.status = self.DONE
+            self.processed = self.total
+        except Exception as e:
+            logging.exception('Bulk action job %s failed', self.pk)
+            self.status = self.FAILED
+            self.error = str(e)
+        self.finished = timezone.now()
+        self.save(update_fields=['status', 'processed', 'error', 'finished'])
+        return True
+
+    def queue_emails(self, applications):
+        if self.action == self.INVITE:
+            emails.send_batch_emails(emails.create_invite_emails(applications, None, self.base_url), 'mails/invitation',
+                                     [EmailOutbox.key(app, app.last_invite) for app in applications])
+        else:
+            emails.send_batch_emails(emails.create_waitlist_emails(applications), 'mails/waitlist',
+                                     [EmailOutbox.key(app, app.status_update_date) for app in applications])
+
+    def run_in_background(self):
+        def run():
+            try:
+                self.run()
+            finally:
+                # The thread has its own database connection
+                connection.close()
+
+        threading.Thread(target=run, daemon=True).start()
+
+    @property
+    def progress(self):
+        return {
+            'id': self.pk,
+            'action': self.get_action_display(),
+            'status': self.status,
+            'status_name': self.get_status_display(),
+            'total': self.total,
+            'processed': self.processed,
+            'skipped': self.skipped,
+            'error': self.error,
+        }
@@ -0,0 +1,26 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from applications.models import Application
+from organizers.models import ReviewerStats, ReviewQueueEntry, Vote
+
+
+# Also runs for the votes deleted in cascade with their application, keeps the reviewer stats in sync
+@receiver(post_delete, sender=Vote)
+def vote_stats_remove(sender, instance, *args, **kwargs):
+    if not instance.tech or not instance.personal:
+        Vote.update_scores([instance.application_id])
+        return None
+    stats = ReviewerStats.objects.select_for_update().filter(user_id=instance.user_id).first()
+    if stats:
+        stats.remove(instance.tech, instance.personal)
+        stats.save()
+    ReviewQueueEntry.vote_done(instance.application_id, instance.user_id, -1)
+    # The rest of the applications of the reviewer are refreshed by recalculate_votes --scores
+    Vote.update_scores([instance.application_id])
+
+
+# Only pending applications are in the review queue
+@receiver(post_save, sender=Application)
+def application_review_queue(sender, instance, *args, **kwargs):
+    ReviewQueueEntry.sync(instance)
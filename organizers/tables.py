@@ -99,7 +99,8 @@ class DubiousListTable(tables.Table):
 class AdminApplicationsListTable(tables.Table):
     selected = tables.CheckBoxColumn(accessor="pk", verbose_name='Select')
     counter = tables.TemplateColumn('{{ row_counter|add:1 }}', verbose_name='Position')
-    review_count = tables.Column(accessor='vote_set.count', verbose_name='# of reviews')
+    vote_avg = tables.Column(accessor='score', order_by='score', verbose_name='Vote avg')
+    review_count = tables.Column(accessor='review_count', verbose_name='# of reviews')
     detail = tables.TemplateColumn(
         "<a href='{% url 'app_detail' record.uuid %}'>Detail</a> ",
         verbose_name='Actions', orderable=False)
@@ -9,5 +9,6 @@ urlpatterns = [
     url(r'^all/$', views.ApplicationsListView.as_view(), name="app_list"),
     url(r'^invite/$', views.InviteListView.as_view(), name="invite_list"),
     url(r'^invite/teams/$', views.InviteTeamListView.as_view(), name="invite_teams_list"),
+    url(r'^invite/jobs/(?P<id>\d+)/$', views.BulkActionJobView.as_view(), name="bulk_action_job"),
     url(r'^dubious/$', views.DubiousApplicationsListView.as_view(), name="dubious"),
 ]
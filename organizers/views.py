@@ -4,18 +4,18 @@ from django.contrib import messages
 from django.core.exceptions import ValidationError
 from django.db import IntegrityError
 from django.db.models import Count, Avg, F
-from django.http import Http404, HttpResponseRedirect
+from django.http import Http404, HttpResponseRedirect, JsonResponse
+from django.shortcuts import get_object_or_404
 from django.urls import reverse
+from django.views import View
 from django.views.generic import TemplateView
 from django_filters.views import FilterView
 from django_tables2 import SingleTableMixin
-from django_tables2.export import ExportMixin
 
 from app import slack
-from app.mixins import TabsViewMixin
+from app.mixins import StreamingExportMixin, TabsViewMixin
 from app.slack import SlackInvitationException
 from applications import emails
-from applications.emails import send_batch_emails
 from applications.models import Application
 from organizers import models
 from organizers.tables import ApplicationsListTable, ApplicationFilter, AdminApplicationsListTable, RankingListTable, \
@@ -47,7 +47,7 @@ def add_comment(application, user, text):
 def organizer_tabs(user):
     t = [('Applications', reverse('app_list'), False),
          ('Review', reverse('review'),
-          'new' if models.Application.objects.exclude(vote__user_id=user.id).filter(status=Application.PENDING) else ''),
+          'new' if models.ReviewQueueEntry.pending(user).exists() else ''),
          ('Ranking', reverse('ranking'), False)]
     if user.is_director:
         t.append(('Invite', reverse('invite_list'), False))
@@ -68,7 +68,32 @@ class RankingView(TabsViewMixin, IsOrganizerMixin, SingleTableMixin, TemplateVie
                 .annotate(total_count=Count('vote')).exclude(total_count=0))
 
 
-class ApplicationsListView(TabsViewMixin, IsOrganizerMixin, ExportMixin, SingleTableMixin, FilterView):
+def start_bulk_action(request, applications, redirect_to):
+    """
+    Invites or wait lists the applications and redirects to the list, which follows the progress of their e-mails
+    """
+    action = models.BulkActionJob.WAITLIST if request.POST.get('waitlist') else models.BulkActionJob.INVITE
+    job = models.BulkActionJob.start(action, request.user, applications, request.build_absolute_uri('/'))
+    if job.total:
+        messages.success(request, "%s applications %s, their e-mails are being prepared" % (
+            job.total, 'wait listed' if action == models.BulkActionJob.WAITLIST else 'invited'))
+    else:
+        messages.error(request, "No applications %s" % (
+            'wait listed' if action == models.BulkActionJob.WAITLIST else 'invited'))
+    if job.skipped:
+        messages.warning(request, "%s applications skipped, they had already confirmed or attended" % job.skipped)
+    return HttpResponseRedirect('%s?job=%s' % (reverse(redirect_to), job.pk))
+
+
+def bulk_action_job(request):
+    job_id = request.GET.get('job')
+    if not job_id or not job_id.isdigit():
+        return None
+    return models.BulkActionJob.objects.filter(pk=job_id).first()
+
+
+class ApplicationsListView(TabsViewMixin, IsOrganizerMixin, StreamingExportMixin, SingleTableMixin,
+                           FilterView):
     template_name = 'applications_list.html'
     table_class = ApplicationsListTable
     filterset_class = ApplicationFilter
@@ -93,30 +118,16 @@ class InviteListView(TabsViewMixin, IsDirectorMixin, SingleTableMixin, FilterVie
         return organizer_tabs(self.request.user)
 
     def get_queryset(self):
-        return models.Application.annotate_vote(models.Application.objects.filter(status=Application.PENDING))
+        return models.Application.objects.filter(status=Application.PENDING).select_related('user')
+
+    def get_context_data(self, **kwargs):
+        c = super(InviteListView, self).get_context_data(**kwargs)
+        c.update({'job': bulk_action_job(self.request)})
+        return c
 
     def post(self, request, *args, **kwargs):
         ids = request.POST.getlist('selected')
-        apps = models.Application.objects.filter(pk__in=ids).all()
-        mails = []
-        errors = 0
-        for app in apps:
-            try:
-                app.invite(request.user)
-                m = emails.create_invite_email(app, request)
-                mails.append(m)
-            except ValidationError:
-                errors += 1
-        if mails:
-            send_batch_emails(mails)
-            messages.success(request, "%s applications invited" % len(mails))
-        else:
-            errorMsg = "No applications invited"
-            if errors != 0:
-                errorMsg = "%s applications not invited" % errors
-            messages.error(request, errorMsg)
-
-        return HttpResponseRedirect(reverse('invite_list'))
+        return start_bulk_action(request, models.Application.objects.filter(pk__in=ids), 'invite_list')
 
 
 class ApplicationDetailView(TabsViewMixin, IsOrganizerMixin, TemplateView):
@@ -234,17 +245,12 @@ class ReviewApplicationView(ApplicationDetailView):
 
     def get_application(self, kwargs):
         """
-        Django model to the rescue. This is transformed to an SQL sentence
-        that does exactly what we need
+        Leases the next application from the review queue so that no other
+        reviewer gets it at the same time
         :return: pending aplication that has not been voted by the current
         user and that has less votes and its older
         """
-        return models.Application.objects \
-            .exclude(vote__user_id=self.request.user.id) \
-            .filter(status=Application.PENDING) \
-            .annotate(count=Count('vote__calculated_vote')) \
-            .order_by('count', 'submission_date') \
-            .first()
+        return models.ReviewQueueEntry.lease(self.request.user)
 
     def get(self, request, *args, **kwargs):
         r = super(ReviewApplicationView, self).get(request, *args, **kwargs)
@@ -270,7 +276,7 @@ class ReviewApplicationView(ApplicationDetailView):
         # If application has already been voted -> Skip and bring next
         # application
         except IntegrityError:
-            pass
+            messages.warning(request, 'You had already reviewed this application.')
         return HttpResponseRedirect(reverse('review'))
 
     def can_vote(self):
@@ -287,40 +293,29 @@ class InviteTeamListView(TabsViewMixin, IsDirectorMixin, SingleTableMixin, Templ
 
     def get_queryset(self):
         return models.Application.objects.filter(status=Application.PENDING).exclude(user__team__team_code__isnull=True) \
-            .values('user__team__team_code').order_by().annotate(vote_avg=Avg('vote__calculated_vote'),
+            .values('user__team__team_code').order_by().annotate(vote_avg=Avg('score'),
                                                                  team=F('user__team__team_code'),
                                                                  members=Count('user', distinct=True))
 
     def get_context_data(self, **kwargs):
         c = super(InviteTeamListView, self).get_context_data(**kwargs)
-        c.update({'teams': True})
+        c.update({'teams': True, 'job': bulk_action_job(self.request)})
         return c
 
     def post(self, request, *args, **kwargs):
         ids = request.POST.getlist('selected')
-        apps = models.Application.objects.filter(user__team__team_code__in=ids).all()
-        mails = []
-        errors = 0
-        for app in apps:
-            try:
-                app.invite(request.user)
-                m = emails.create_invite_email(app, request)
-                mails.append(m)
-            except ValidationError:
-                errors += 1
-        if mails:
-            send_batch_emails(mails)
-            messages.success(request, "%s applications invited" % len(mails))
-        else:
-            errorMsg = "No applications invited"
-            if errors != 0:
-                errorMsg = "%s applications not invited" % errors
-            messages.error(request, errorMsg)
-
-        return HttpResponseRedirect(reverse('invite_teams_list'))
-
-
-class DubiousApplicationsListView(TabsViewMixin, IsOrganizerMixin, ExportMixin, SingleTableMixin, FilterView):
+        return start_bulk_action(request, models.Application.objects.filter(user__team__team_code__in=ids),
+                                 'invite_teams_list')
+
+
+class BulkActionJobView(IsDirectorMixin, View):
+    def get(self, request, *args, **kwargs):
+        job = get_object_or_404(models.BulkActionJob, pk=kwargs['id'])
+        return JsonResponse(job.progress)
+
+
+class DubiousApplicationsListView(TabsViewMixin, IsOrganizerMixin, StreamingExportMixin, SingleTableMixin,
+                                  FilterView):
     template_name = 'dubious_list.html'
     table_class = DubiousListTable
     filterset_class = DubiousApplicationFilter
@@ -0,0 +1,25 @@
+from django.contrib import admin
+
+from outbox import models
+
+
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = (
+        'template', 'recipient', 'status', 'attempts', 'next_attempt', 'created', 'sent'
+    )
+    search_fields = (
+        'recipient', 'subject', 'object_key'
+    )
+    list_filter = (
+        'status', 'template'
+    )
+    readonly_fields = (
+        'created', 'sent', 'locked_by', 'locked_until'
+    )
+    ordering = ('-created',)
+
+    def get_actions(self, request):
+        return []
+
+
+admin.site.register(models.EmailOutbox, admin_class=EmailOutboxAdmin)
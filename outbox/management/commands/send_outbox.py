@@ -0,0 +1,79 @@
+import os
+import socket
+import time
+import uuid
+from datetime import timedelta
+
+from django.core import mail
+from django.core.management.base import BaseCommand
+
+from outbox.models import EmailOutbox
+from outbox.utils import TokenBucket
+
+
+class Command(BaseCommand):
+    help = 'Sends the queued e-mails, at most --rate per second after a first burst of --burst e-mails. ' \
+           'Runs until stopped, or until the outbox is empty with --once. Safe to stop and restart at any time.'
+
+    # prevents gmail from getting angry :)
+    RATE = 0.5
+    BURST = 50
+    BATCH_SIZE = 100
+    IDLE_SLEEP = 10
+    # Extra time a worker has to send a batch before other workers can claim it
+    LEASE_MARGIN = 60
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rate', type=float, default=self.RATE, help='e-mails per second')
+        parser.add_argument('--burst', type=int, default=self.BURST, help='e-mails sent before throttling')
+        parser.add_argument('--batch', type=int, default=self.BATCH_SIZE, help='e-mails claimed at once')
+        parser.add_argument('--max-attempts', type=int, default=EmailOutbox.MAX_ATTEMPTS,
+                            help='attempts before giving up on an e-mail')
+        parser.add_argument('--once', action='store_true', help='stop when there are no e-mails left to send')
+
+    def handle(self, *args, **options):
+        worker = '%s:%s:%s' % (socket.gethostname(), os.getpid(), uuid.uuid4().hex[:8])
+        bucket = TokenBucket(options['rate'], options['burst'])
+        lease = timedelta(seconds=options['batch'] / options['rate'] + self.LEASE_MARGIN)
+        connection = None
+        sent = failed = 0
+        self.stdout.write('Sending e-mails...')
+        try:
+            while True:
+                emails = EmailOutbox.claim(worker, options['batch'], lease)
+                if not emails:
+                    if options['once']:
+                        break
+                    # Don't keep the SMTP connection open while idle
+                    if connection is not None:
+                        connection.close()
+                        connection = None
+                    time.sleep(self.IDLE_SLEEP)
+                    continue
+                for email in emails:
+                    bucket.consume()
+                    try:
+                        # One connection for every e-mail, reopened only after an error
+                        if connection is None:
+                            connection = mail.get_connection()
+                            connection.open()
+                        connection.send_messages([email.as_message()])
+                    except Exception as e:
+                        email.mark_failed(str(e), options['max_attempts'])
+                        failed += 1
+                        self.stdout.write(self.style.WARNING('Sending e-mails... %s failed: %s' % (email, e)))
+                        if connection is not None:
+                            try:
+                                connection.close()
+                            except Exception:
+                                pass
+                            connection = None
+                    else:
+                        email.mark_sent()
+                        sent += 1
+        finally:
+            EmailOutbox.release(worker)
+            if connection is not None:
+                connection.close()
+        self.stdout.write(self.style.SUCCESS(
+            'Sending e-mails... Successfully sent %s e-mails, %s failed attempts' % (sent, failed)))
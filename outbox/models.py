@@ -0,0 +1,144 @@
+from datetime import timedelta
+
+from django.core.mail import EmailMessage, EmailMultiAlternatives
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class EmailOutbox(models.Model):
+    """
+    E-mail waiting to be delivered by the send_outbox command. Messages are rendered when queued, so the worker only
+    has to send them. Each template is sent at most once per recipient and object.
+    """
+    PENDING = 'P'
+    SENT = 'S'
+    FAILED = 'F'
+
+    STATUS = (
+        (PENDING, 'Pending'),
+        (SENT, 'Sent'),
+        (FAILED, 'Failed'),
+    )
+
+    # Delay before the first retry, doubled after every failed attempt up to MAX_RETRY_DELAY
+    RETRY_DELAY = timedelta(minutes=1)
+    MAX_RETRY_DELAY = timedelta(hours=6)
+    MAX_ATTEMPTS = 5
+
+    template = models.CharField(max_length=100)
+    recipient = models.EmailField()
+    # Object the e-mail is about, see key
+    object_key = models.CharField(max_length=100, blank=True, default='')
+
+    subject = models.CharField(max_length=500)
+    from_email = models.CharField(max_length=300)
+    body = models.TextField(blank=True)
+    html = models.TextField(blank=True)
+
+    status = models.CharField(max_length=2, choices=STATUS, default=PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    # Worker sending the e-mail and until when, e-mails of workers that died are claimed again once the lease expires
+    locked_by = models.CharField(max_length=100, blank=True, default='')
+    locked_until = models.DateTimeField(null=True, blank=True)
+
+    created = models.DateTimeField(auto_now_add=True)
+    sent = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        verbose_name_plural = 'E-mail outbox'
+        unique_together = ('template', 'recipient', 'object_key')
+        index_together = [('status', 'next_attempt')]
+
+    def __str__(self):
+        return '%s to %s' % (self.template, self.recipient)
+
+    @staticmethod
+    def key(instance, *versions):
+        """
+        Object key of a model instance. Versions (e.g. the date of the invite) allow sending the same e-mail again
+        once they change.
+        """
+        return ':'.join([instance._meta.label_lower, str(instance.pk)] + [str(version) for version in versions])
+
+    @classmethod
+    def enqueue(cls, template_prefix, messages, object_keys):
+        """
+        Queues rendered messages, skipping the ones already queued or sent for the same recipient and object.
+        :param template_prefix: template the messages were rendered from
+        :param messages: messages with a single recipient, as returned by render_mail(s)
+        :param object_keys: key of the object of each message, see key
+        :return: number of messages queued, the ones skipped are not counted
+        """
+        queued = set(cls.objects.filter(template=template_prefix, object_key__in=set(object_keys))
+                     .values_list('recipient', 'object_key'))
+        emails = []
+        for message, object_key in zip(messages, object_keys):
+            if (message.to[0], object_key) in queued:
+                continue
+            queued.add((message.to[0], object_key))
+            html = ''
+            if message.content_subtype == 'html':
+                body, html = '', message.body
+            else:
+                body = message.body
+                for content, mimetype in getattr(message, 'alternatives', []):
+                    if mimetype == 'text/html':
+                        html = content
+            emails.append(cls(template=template_prefix, recipient=message.to[0], object_key=object_key,
+                              subject=message.subject, from_email=message.from_email, body=body, html=html))
+        # Still ignored in case the same e-mails are being queued concurrently
+        cls.objects.bulk_create(emails, ignore_conflicts=True)
+        return len(emails)
+
+    @classmethod
+    def claim(cls, worker, limit, lease):
+        """
+        Locks up to limit e-mails ready to be sent for the worker. The lock is taken with a conditional update, so
+        several workers never claim the same e-mail.
+        :param lease: how long the worker has to send them
+        """
+        now = timezone.now()
+        available = Q(status=cls.PENDING, next_attempt__lte=now) & \
+            (Q(locked_until__isnull=True) | Q(locked_until__lt=now))
+        ids = list(cls.objects.filter(available).order_by('next_attempt', 'pk').values_list('pk', flat=True)[:limit])
+        cls.objects.filter(available, pk__in=ids).update(locked_by=worker, locked_until=now + lease)
+        return list(cls.objects.filter(pk__in=ids, locked_by=worker, status=cls.PENDING).order_by('next_attempt', 'pk'))
+
+    @classmethod
+    def release(cls, worker):
+        """Unlocks the e-mails claimed by the worker that are still pending"""
+        cls.objects.filter(locked_by=worker, status=cls.PENDING).update(locked_by='', locked_until=None)
+
+    def as_message(self):
+        if not self.body:
+            message = EmailMessage(self.subject, self.html, self.from_email, [self.recipient])
+            message.content_subtype = 'html'
+            return message
+        message = EmailMultiAlternatives(self.subject, self.body, self.from_email, [self.recipient])
+        if self.html:
+            message.attach_alternative(self.html, 'text/html')
+        return message
+
+    def mark_sent(self):
+        self.status = self.SENT
+        self.sent = timezone.now()
+        self.attempts += 1
+        self.locked_by = ''
+        self.locked_until = None
+        self.save(update_fields=['status', 'sent', 'attempts', 'locked_by', 'locked_until'])
+
+    def mark_failed(self, error, max_attempts=MAX_ATTEMPTS):
+        """Schedules a retry with exponential backoff, or gives up after max_attempts"""
+        self.attempts += 1
+        self.last_error = error
+        if self.attempts >= max_attempts:
+            self.status = self.FAILED
+        else:
+            self.next_attempt = timezone.now() + min(self.RETRY_DELAY * 2 ** (self.attempts - 1),
+                                                     self.MAX_RETRY_DELAY)
+        self.locked_by = ''
+        self.locked_until = None
+        self.save(update_fields=['status', 'attempts', 'last_error', 'next_attempt', 'locked_by', 'locked_until'])
@@ -0,0 +1,28 @@
+import time
+
+
+class TokenBucket:
+    """
+    Rate limiter that allows bursts of up to capacity messages and then rate messages per second on average
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic, sleep=time.sleep):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.clock = clock
+        self.sleep = sleep
+        self.last = clock()
+
+    def refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last) * self.rate)
+        self.last = now
+
+    def consume(self):
+        """Takes a token, waiting for one if the bucket is empty"""
+        self.refill()
+        if self.tokens < 1:
+            self.sleep((1 - self.tokens) / self.rate)
+            self.refill()
+        self.tokens -= 1
@@ -1 +1,24 @@
-# Register your models here.
+from django.contrib import admin
+
+from points import models
+
+
+class PointsAdmin(admin.ModelAdmin):
+    list_display = ('user', 'points')
+    search_fields = ('user__name', 'user__email')
+
+    def get_actions(self, request):
+        return []
+
+
+class PointsTransactionAdmin(admin.ModelAdmin):
+    list_display = ('user', 'source', 'amount', 'scanner', 'timestamp')
+    search_fields = ('user__name', 'user__email', 'key')
+    list_filter = ('source',)
+
+    def get_actions(self, request):
+        return []
+
+
+admin.site.register(models.Points, admin_class=PointsAdmin)
+admin.site.register(models.PointsTransaction, admin_class=PointsTransactionAdmin)
@@ -0,0 +1,34 @@
+# Generated by Django 2.2.13 on 2026-10-18 11:48
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('points', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='points',
+            name='points',
+            field=models.IntegerField(db_index=True, default=0),
+        ),
+        migrations.CreateModel(
+            name='PointsTransaction',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('source', models.CharField(choices=[('W', 'Workshop attendance'), ('S', 'Sponsor scan'), ('M', 'Manual')], max_length=1)),
+                ('amount', models.IntegerField()),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('key', models.CharField(blank=True, max_length=255, null=True, unique=True)),
+                ('scanner', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_awarded', to=settings.AUTH_USER_MODEL)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='points_transactions', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:54
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def link_workshops(apps, schema_editor):
+    PointsTransaction = apps.get_model('points', 'PointsTransaction')
+    Workshop = apps.get_model('workshops', 'Workshop')
+    # Workshop transactions were keyed workshop-<workshop id>-<user id>
+    workshop_ids = set(Workshop.objects.values_list('id', flat=True))
+    for workshop_id in workshop_ids:
+        PointsTransaction.objects.filter(source='W', key__startswith='workshop-%s-' % workshop_id) \
+            .update(workshop_id=workshop_id)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0002_attendance_time'),
+        ('points', '0002_points_transaction'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='pointstransaction',
+            name='workshop',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='points_transactions', to='workshops.Workshop'),
+        ),
+        migrations.RunPython(link_workshops, migrations.RunPython.noop),
+    ]
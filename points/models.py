@@ -1,15 +1,149 @@
-from django.db import models
+from collections import defaultdict
+
+from django.core.cache import cache
+from django.db import IntegrityError, models, transaction
+from django.db.models import F, Sum
+from django.utils import timezone
 
 from user.models import User
 
+LEADERBOARD_SIZE = 10
+LEADERBOARD_CACHE_KEY = 'points_leaderboard'
+# The leaderboard is recomputed at most once every LEADERBOARD_CACHE_TIMEOUT seconds
+LEADERBOARD_CACHE_TIMEOUT = 30
 
-# Create your models here.
 
 class Points(models.Model):
+    """Current points balance of a user. Only changed through Points.award, which also writes the ledger"""
     user = models.OneToOneField(User, on_delete=models.CASCADE)
 
-    points = models.IntegerField(default=0)
+    points = models.IntegerField(default=0, db_index=True)
+
+    @classmethod
+    def award(cls, user_id, amount, source, scanner=None, key=None, workshop=None):
+        """
+        Records a PointsTransaction and adds its amount to the user balance with an atomic UPDATE, so concurrent
+        scans never lose points.
+        :param key: idempotency key, a transaction with an already used key is ignored
+        :param workshop: workshop attended, for workshop points
+        :return: True if the points were awarded, False if the key had already been used
+        """
+        with transaction.atomic():
+            try:
+                with transaction.atomic():
+                    PointsTransaction.objects.create(user_id=user_id, amount=amount, source=source, scanner=scanner,
+                                                     key=key, workshop=workshop)
+            except IntegrityError:
+                return False
+            if not cls.objects.filter(user_id=user_id).update(points=F('points') + amount):
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(user_id=user_id, points=amount)
+                except IntegrityError:
+                    # Someone created the balance in the meantime
+                    cls.objects.filter(user_id=user_id).update(points=F('points') + amount)
+        return True
+
+    @classmethod
+    def award_in_bulk(cls, transactions):
+        """
+        Bulk version of Points.award. Balances are grouped by the amount added so each group is a single
+        UPDATE points = points + amount. Must be called inside a transaction.
+        :param transactions: unsaved PointsTransaction instances
+        :return: the transactions that were awarded, the ones whose key had already been used are skipped
+        """
+        now = timezone.now()
+        keys, pending = set(), []
+        for points_transaction in transactions:
+            if points_transaction.amount and points_transaction.key not in keys:
+                points_transaction.timestamp = now
+                pending.append(points_transaction)
+                if points_transaction.key:
+                    keys.add(points_transaction.key)
+        # Keys already used, also by a concurrent award, are skipped by the database. The ones inserted are read
+        # back by their timestamp, shared by the whole batch.
+        PointsTransaction.objects.bulk_create(pending, ignore_conflicts=True)
+        inserted = set(PointsTransaction.objects.filter(key__in=keys, timestamp=now).values_list('key', flat=True))
+        awarded = [t for t in pending if not t.key or t.key in inserted]
+
+        amounts = defaultdict(int)
+        for points_transaction in awarded:
+            amounts[points_transaction.user_id] += points_transaction.amount
+        # Missing balances are created empty so every user is updated the same way, even if created concurrently
+        cls.objects.bulk_create([cls(user_id=user_id) for user_id in amounts], ignore_conflicts=True)
+        users_by_amount = defaultdict(list)
+        for user_id, amount in amounts.items():
+            users_by_amount[amount].append(user_id)
+        for amount, user_ids in users_by_amount.items():
+            cls.objects.filter(user_id__in=user_ids).update(points=F('points') + amount)
+        return awarded
+
+    @classmethod
+    def get_balance(cls, user_id):
+        return cls.objects.filter(user_id=user_id).values_list('points', flat=True).first() or 0
+
+    @classmethod
+    def get_leaderboard(cls):
+        """
+        Top LEADERBOARD_SIZE users by points. Read from the indexed points column and cached for a few seconds so
+        pages showing it don't hit the database on every load.
+        """
+        leaderboard = cache.get(LEADERBOARD_CACHE_KEY)
+        if leaderboard is None:
+            leaderboard = [
+                {'user_id': user_id, 'name': name, 'points': points}
+                for user_id, name, points in cls.objects.filter(points__gt=0).order_by('-points')
+                .values_list('user_id', 'user__name', 'points')[:LEADERBOARD_SIZE]
+            ]
+            cache.set(LEADERBOARD_CACHE_KEY, leaderboard, LEADERBOARD_CACHE_TIMEOUT)
+        return leaderboard
+
+    @classmethod
+    def get_leaderboard_position(cls, user_id):
+        """Position of the user in the leaderboard starting at 1 or None if not in it"""
+        for position, entry in enumerate(cls.get_leaderboard(), 1):
+            if entry['user_id'] == user_id:
+                return position
+        return None
+
+
+class PointsTransaction(models.Model):
+    """Append-only ledger of every points award"""
+    WORKSHOP = 'W'
+    SPONSOR = 'S'
+    MANUAL = 'M'
+
+    SOURCES = [
+        (WORKSHOP, 'Workshop attendance'),
+        (SPONSOR, 'Sponsor scan'),
+        (MANUAL, 'Manual'),
+    ]
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='points_transactions')
+    source = models.CharField(max_length=1, choices=SOURCES)
+    amount = models.IntegerField()
+    # Who scanned the badge, if anyone
+    scanner = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True,
+                                related_name='points_awarded')
+    timestamp = models.DateTimeField(default=timezone.now)
+    # Workshop attended, for workshop points
+    workshop = models.ForeignKey('workshops.Workshop', on_delete=models.SET_NULL, null=True, blank=True,
+                                 related_name='points_transactions')
+    # Idempotency key, e.g. workshop-<workshop id>-<user id> or scan-<scan id>. Retried scans with the same key are
+    # ignored
+    key = models.CharField(max_length=255, unique=True, null=True, blank=True)
+
+    @staticmethod
+    def workshop_key(workshop_id, user_id):
+        return 'workshop-%s-%s' % (workshop_id, user_id)
+
+    @staticmethod
+    def scan_key(scan_id):
+        """Key of a scan that has no natural key, from the id the scanning page generates for each scan"""
+        return 'scan-%s' % scan_id
 
-    # TODO: Add self.save()
-    def add_points(self, value):
-        self.points += value
+    @classmethod
+    def workshop_totals(cls):
+        """Points awarded for attending each workshop: dict workshop id -> points"""
+        return dict(cls.objects.filter(workshop__isnull=False).order_by().values('workshop')
+                    .annotate(total=Sum('amount')).values_list('workshop', 'total'))
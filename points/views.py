@@ -1,7 +1,8 @@
 from django.views import View
 from django.views.generic.base import TemplateView
 
-from .models import Points
+from checkin.utils import get_badge
+from .models import Points, PointsTransaction
 
 
 # Create your views here.
@@ -12,11 +13,10 @@ class PointsHomeView(TemplateView):
     # TODO: Deny access if user is not authenticated.
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        user = Points.objects.get(user=self.request.user)
-        points = user.points
-        context = {
-            'points': points,
-        }
+        context.update({
+            'points': Points.get_balance(self.request.user.id),
+            'leaderboard': Points.get_leaderboard(),
+        })
         return context
 
 
@@ -27,18 +27,11 @@ class AddPointsView(View):
         points = request.POST.get('points', None)
 
         # TODO: Add error handling for below
-        # Checkin object of a participants
-        hacker_checkin = CheckIn.objects.filter(qr_identifier=qr_id).first()
+        # Badge of the participant
+        badge = get_badge(qr_id)
 
-        # The user model
-        hacker = hacker_checkin.application.user
-
-        # Points model with user
-        hacker_points = Points.objects.filter(user=hacker)
-
-        if hacker_points:
-            hacker_points[0].points += points
-            hacker_points[0].save()
+        if badge and points:
+            Points.award(badge.user_id, int(points), PointsTransaction.MANUAL, scanner=request.user)
         else:
             pass
             # Error handling.
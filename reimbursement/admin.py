@@ -2,10 +2,11 @@ import logging
 
 from django.contrib import admin, messages
 # Register your models here.
-from django.core import mail
 from django.core.exceptions import ValidationError
 from django.utils.timesince import timesince
 
+from applications.emails import send_batch_emails
+from outbox.models import EmailOutbox
 from reimbursement import models, emails
 
 
@@ -47,20 +48,21 @@ class ReimbursementAdmin(admin.ModelAdmin):
 
     def send(self, request, queryset):
         msgs = []
+        keys = []
         sent = 0
         errors = 0
         for reimb in queryset:
             try:
                 reimb.send(request.user)
                 msgs.append(emails.create_reimbursement_email(reimb, request))
+                keys.append(EmailOutbox.key(reimb, reimb.status, reimb.expiration_time))
                 sent += 1
             except ValidationError as e:
                 errors += 1
                 logging.error(e.message)
 
         if msgs:
-            connection = mail.get_connection()
-            connection.send_messages(msgs)
+            send_batch_emails(msgs, 'mails/reimbursement', keys)
         if sent > 0 and errors > 0:
             self.message_user(request, (
                 "%s reimbursements sent, %s reimbursements not sent. Did you "
@@ -0,0 +1,17 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:22
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reimbursement', '0006_auto_20200602_0200'),
+    ]
+
+    operations = [
+        migrations.AlterIndexTogether(
+            name='reimbursement',
+            index_together={('status', 'expiration_time')},
+        ),
+    ]
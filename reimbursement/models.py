@@ -87,6 +87,10 @@ class Reimbursement(models.Model):
     status = models.CharField(max_length=2, choices=STATUS,
                               default=DRAFT)
 
+    class Meta:
+        # run_scheduler looks for the pending reimbursements past their expiration
+        index_together = [('status', 'expiration_time')]
+
     @property
     def max_assignable_money(self):
         if self.friend_submission:
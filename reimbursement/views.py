@@ -10,6 +10,7 @@ from app.utils import reverse, hacker_tabs
 from app.views import TabsView
 from applications.emails import send_batch_emails
 from applications.models import Application
+from outbox.models import EmailOutbox
 from reimbursement import forms, emails
 from reimbursement.models import Reimbursement
 from reimbursement.tables import ReimbursementTable, ReimbursementFilter, SendReimbursementTable, \
@@ -173,6 +174,7 @@ class SendReimbursementListView(IsDirectorMixin, TabsViewMixin, SingleTableMixin
         no_reimb = request.POST.get('no_reimb', False)
         reimbs = Reimbursement.objects.filter(pk__in=ids).all()
         mails = []
+        keys = []
         errors = 0
         for reimb in reimbs:
             try:
@@ -186,11 +188,12 @@ class SendReimbursementListView(IsDirectorMixin, TabsViewMixin, SingleTableMixin
                     reimb.no_reimb(request.user)
                     m = emails.create_no_reimbursement_email(reimb, request)
                 mails.append(m)
+                keys.append(EmailOutbox.key(reimb, reimb.status, reimb.expiration_time))
             except ValidationError:
                 errors += 1
 
         if mails:
-            send_batch_emails(mails)
+            send_batch_emails(mails, 'mails/no_reimbursement' if no_reimb else 'mails/reimbursement', keys)
             if no_reimb:
                 msg = "%s no reimbursements message sent"
             else:
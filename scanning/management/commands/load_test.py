@@ -0,0 +1,285 @@
+import random
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from datetime import timedelta
+from importlib import import_module
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections, transaction
+from django.http import HttpRequest
+from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.utils import timezone
+
+from applications.models import Application
+from checkin.models import CheckIn
+from meals.models import Meal
+from stats.models import StatsCounter
+from user.models import User
+from workshops.models import Workshop
+
+# Every user created by the load test has an email in this domain, so that they can always be cleaned up
+LOAD_TEST_DOMAIN = 'loadtest.ugahacks.com'
+LOAD_TEST_NAME = 'Load test'
+DEFAULT_MIX = 'checkin=1,meal=4,workshop=2,stats=1,dashboard=2'
+OPERATIONS = ('checkin', 'meal', 'workshop', 'stats', 'dashboard')
+PERCENTILES = (50, 95, 99)
+
+
+def login(user):
+    """
+    Creates a session for the user without going through the login form
+    :return: the cookies of the session and the CSRF token to send in the X-CSRFToken header
+    """
+    session = import_module(settings.SESSION_ENGINE).SessionStore()
+    session[SESSION_KEY] = user._meta.pk.value_to_string(user)
+    session[BACKEND_SESSION_KEY] = settings.AUTHENTICATION_BACKENDS[0]
+    session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+    session.save()
+    request = HttpRequest()
+    csrf_token = get_token(request)
+    cookies = {
+        settings.SESSION_COOKIE_NAME: session.session_key,
+        settings.CSRF_COOKIE_NAME: request.META['CSRF_COOKIE'],
+    }
+    return cookies, csrf_token
+
+
+def parse_mix(mix):
+    weights = {}
+    for item in mix.split(','):
+        operation, _, weight = item.partition('=')
+        operation = operation.strip()
+        if operation not in OPERATIONS:
+            raise CommandError('Unknown operation %s. Choose from %s' % (operation, ', '.join(OPERATIONS)))
+        try:
+            weights[operation] = float(weight or 1)
+        except ValueError:
+            raise CommandError('Invalid weight for %s: %s' % (operation, weight))
+    if not any(weights.values()):
+        raise CommandError('At least one operation needs a positive weight')
+    return weights
+
+
+def run_worker(plan):
+    """
+    Sends requests until the plan duration or number of requests is reached. Runs in a thread or in its own process,
+    so it only uses the plain data in the plan and never touches the database.
+    :return: dict endpoint -> list of (latency in seconds, HTTP status). Status 0 means the request failed.
+    """
+    rnd = random.Random(plan['seed'])
+    mix = dict(plan['mix'])
+    pending_checkins = list(plan['checkins'])
+    http = requests.Session()
+    results = defaultdict(list)
+    deadline = time.perf_counter() + plan['duration']
+    sent = 0
+    while time.perf_counter() < deadline and (not plan['requests'] or sent < plan['requests']):
+        if not pending_checkins:
+            # Every hacker of this worker is already checked in
+            mix.pop('checkin', None)
+            if not any(mix.values()):
+                break
+        operation = rnd.choices(list(mix), list(mix.values()))[0]
+        method, path, data, auth = 'POST', plan['scan_url'], None, plan['organizer']
+        if operation == 'checkin':
+            participant_qr, badge_qr = pending_checkins.pop()
+            data = {'type': 'checkin', 'participantQR': participant_qr, 'badgeQR': badge_qr}
+        elif operation == 'meal':
+            data = {'type': 'meal', 'id': plan['meal_id'], 'badgeQR': rnd.choice(plan['badges'])}
+        elif operation == 'workshop':
+            data = {'type': 'workshop', 'id': plan['workshop_id'], 'badgeQR': rnd.choice(plan['badges'])}
+        elif operation == 'stats':
+            method, path = 'GET', plan['stats_url']
+        else:
+            method, path, auth = 'GET', plan['dashboard_url'], rnd.choice(plan['hackers'])
+        cookies, csrf_token = auth
+        start = time.perf_counter()
+        try:
+            status = http.request(method, plan['base_url'] + path, data=data, cookies=cookies,
+                                  headers={'Host': plan['host'], 'X-CSRFToken': csrf_token},
+                                  allow_redirects=False, timeout=plan['timeout']).status_code
+        except requests.RequestException:
+            status = 0
+        results[operation].append((time.perf_counter() - start, status))
+        # Don't let cookies set by the server leak between the users we impersonate
+        http.cookies.clear()
+        sent += 1
+    return dict(results)
+
+
+def percentile(values, p):
+    """Nearest rank percentile of an already sorted list"""
+    if not values:
+        return 0
+    return values[min(len(values) - 1, max(0, int(round(p / 100.0 * len(values) + 0.5)) - 1))]
+
+
+class Command(BaseCommand):
+    """
+    Runs against an instance that is already up (runserver or gunicorn) and uses the same database settings to create
+    the users, badges, meal and workshop it needs. They are deleted at the end unless --keep is given.
+    """
+    help = 'Replays event-day traffic (check-ins, meal and workshop scans, stats polling and hacker dashboards) ' \
+           'against a running instance and reports throughput and latency percentiles per endpoint'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--url', default='http://127.0.0.1:8000',
+                            help='Base URL of the running instance. Default: http://127.0.0.1:8000')
+        parser.add_argument('--host', default=settings.HACKATHON_DOMAIN,
+                            help='Host header sent with every request. Default: %s' % settings.HACKATHON_DOMAIN)
+        parser.add_argument('--workers', type=int, default=8, help='Number of concurrent clients. Default: 8')
+        parser.add_argument('--processes', action='store_true',
+                            help='Run each client in its own process instead of a thread')
+        parser.add_argument('--duration', type=float, default=30, help='Seconds to run for. Default: 30')
+        parser.add_argument('--requests', type=int, default=0,
+                            help='Stop each client after this many requests. Default: no limit')
+        parser.add_argument('--hackers', type=int, default=200,
+                            help='Number of test hackers. Half of them start checked in. Default: 200')
+        parser.add_argument('--meal-times', type=int, default=3,
+                            help='Times each hacker can eat the test meal. Default: 3')
+        parser.add_argument('--mix', default=DEFAULT_MIX,
+                            help='Relative weight of each operation. Default: %s' % DEFAULT_MIX)
+        parser.add_argument('--timeout', type=float, default=30, help='Request timeout in seconds. Default: 30')
+        parser.add_argument('--seed', type=int, default=None, help='Random seed, for repeatable runs')
+        parser.add_argument('--keep', action='store_true', help='Keep the test data after the run')
+
+    def handle(self, *args, **options):
+        mix = parse_mix(options['mix'])
+        if options['workers'] < 1 or options['hackers'] < 2:
+            raise CommandError('At least one worker and two hackers are needed')
+        seed = options['seed'] if options['seed'] is not None else random.randrange(2 ** 32)
+        run_id = uuid.uuid4().hex[:8]
+
+        self.stdout.write('Creating %s test hackers...' % options['hackers'])
+        fixtures = self.create_fixtures(run_id, options['hackers'], options['meal_times'])
+        try:
+            plans = self.make_plans(fixtures, mix, seed, options)
+            # Forked processes must not share the database connections of the parent
+            connections.close_all()
+            executor_class = ProcessPoolExecutor if options['processes'] else ThreadPoolExecutor
+            self.stdout.write('Running %s %s for %ss against %s (seed %s)...' % (
+                options['workers'], 'processes' if options['processes'] else 'threads', options['duration'],
+                options['url'], seed))
+            start = time.perf_counter()
+            with executor_class(max_workers=options['workers']) as executor:
+                worker_results = list(executor.map(run_worker, plans))
+            elapsed = time.perf_counter() - start
+            self.report(worker_results, elapsed)
+        finally:
+            if options['keep']:
+                self.stdout.write('Test data kept. Run id: %s' % run_id)
+            else:
+                self.delete_fixtures(fixtures)
+
+    def create_fixtures(self, run_id, hackers, meal_times):
+        now = timezone.now()
+        with transaction.atomic():
+            organizer = User(email='organizer-%s@%s' % (run_id, LOAD_TEST_DOMAIN), name=LOAD_TEST_NAME,
+                             is_organizer=True, is_volunteer=True, email_verified=True)
+            organizer.set_unusable_password()
+            organizer.save()
+            users = [User(email='hacker%s-%s@%s' % (i, run_id, LOAD_TEST_DOMAIN), name=LOAD_TEST_NAME,
+                          email_verified=True, password='!')
+                     for i in range(hackers)]
+            User.objects.bulk_create(users)
+            users = list(User.objects.filter(email__endswith='-%s@%s' % (run_id, LOAD_TEST_DOMAIN))
+                         .exclude(pk=organizer.pk).order_by('pk'))
+            checked_in = users[:hackers // 2]
+            Application.objects.bulk_create([
+                Application(user=user, origin='Load test', first_timer=True, first_ugahacks=True,
+                            description=LOAD_TEST_NAME, university='Load test', degree='Load test',
+                            status=Application.ATTENDED if user in checked_in else Application.CONFIRMED,
+                            status_update_date=now)
+                for user in users
+            ])
+            StatsCounter.track(added=Application.objects.filter(user__in=users).values(*StatsCounter.FIELDS))
+            applications = list(Application.objects.filter(user__in=users).select_related('user'))
+            checked_in_ids = set(user.pk for user in checked_in)
+            checkins = [CheckIn(application=application, user=organizer, update_time=now,
+                                qr_identifier='lt-%s' % uuid.uuid4().hex)
+                        for application in applications if application.user_id in checked_in_ids]
+            CheckIn.objects.bulk_create(checkins)
+            meal = Meal.objects.create(name=LOAD_TEST_NAME, kind=Meal.OTHER, times=meal_times, opened=True,
+                                       starts=now, ends=now + timedelta(hours=1))
+            workshop = Workshop.objects.create(title=LOAD_TEST_NAME, host=LOAD_TEST_NAME, open=True, points=1)
+        return {
+            'organizer': organizer,
+            'users': users,
+            'badges': [checkin.qr_identifier for checkin in checkins],
+            'pending': [(str(application.uuid), 'lt-%s' % uuid.uuid4().hex)
+                        for application in applications if application.user_id not in checked_in_ids],
+            'meal': meal,
+            'workshop': workshop,
+            'sessions': [],
+        }
+
+    def make_plans(self, fixtures, mix, seed, options):
+        organizer = login(fixtures['organizer'])
+        hackers = [login(user) for user in fixtures['users'][:50]]
+        fixtures['sessions'] = [cookies[settings.SESSION_COOKIE_NAME] for cookies, _ in [organizer] + hackers]
+        workers = options['workers']
+        return [
+            {
+                'seed': seed + i,
+                'base_url': options['url'].rstrip('/'),
+                'host': options['host'],
+                'timeout': options['timeout'],
+                'duration': options['duration'],
+                'requests': options['requests'],
+                'mix': mix,
+                'organizer': organizer,
+                'hackers': hackers,
+                'badges': fixtures['badges'],
+                # Each worker checks in its own hackers so that no check-in is sent twice
+                'checkins': fixtures['pending'][i::workers],
+                'meal_id': fixtures['meal'].pk,
+                'workshop_id': fixtures['workshop'].pk,
+                'scan_url': reverse('scanning'),
+                'stats_url': reverse('api_app_stats'),
+                'dashboard_url': reverse('dashboard'),
+            }
+            for i in range(workers)
+        ]
+
+    def delete_fixtures(self, fixtures):
+        self.stdout.write('Deleting test data...')
+        session_store = import_module(settings.SESSION_ENGINE).SessionStore
+        for session_key in fixtures['sessions']:
+            session_store(session_key).delete()
+        fixtures['meal'].delete()
+        fixtures['workshop'].delete()
+        User.objects.filter(pk__in=[user.pk for user in fixtures['users']] + [fixtures['organizer'].pk]).delete()
+
+    def report(self, worker_results, elapsed):
+        results = defaultdict(list)
+        for worker_result in worker_results:
+            for operation, samples in worker_result.items():
+                results[operation].extend(samples)
+        header = '%-10s %8s %8s %7s %9s %9s %9s %9s  %s' % (
+            'endpoint', 'requests', 'req/s', 'errors', 'p50 ms', 'p95 ms', 'p99 ms', 'max ms', 'statuses')
+        self.stdout.write(header)
+        self.stdout.write('-' * len(header))
+        total = 0
+        for operation in OPERATIONS:
+            samples = results.get(operation)
+            if not samples:
+                continue
+            total += len(samples)
+            latencies = sorted(latency * 1000 for latency, _ in samples)
+            statuses = defaultdict(int)
+            for _, status in samples:
+                statuses[status] += 1
+            errors = sum(count for status, count in statuses.items() if status == 0 or status >= 500)
+            self.stdout.write('%-10s %8s %8.1f %7s %9.1f %9.1f %9.1f %9.1f  %s' % (
+                operation, len(samples), len(samples) / elapsed, errors,
+                *[percentile(latencies, p) for p in PERCENTILES], latencies[-1],
+                ', '.join('%s: %s' % (status, count) for status, count in sorted(statuses.items()))))
+        self.stdout.write('-' * len(header))
+        throughput = total / elapsed if elapsed else 0
+        self.stdout.write('Total: %s requests in %.1fs (%.1f req/s)' % (total, elapsed, throughput))
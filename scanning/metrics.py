@@ -0,0 +1,206 @@
+"""
+Latency instrumentation for the scanning endpoints.
+
+Every instrumented call adds one sample (wall time, number of queries, time spent in the database and response status)
+to fixed bucket histograms kept in process memory, so recording a scan is a few additions and no I/O. Samples are
+grouped in one minute slots and only the last METRICS_WINDOW_SLOTS are reported, which makes the percentiles rolling.
+Each worker publishes its histograms to the cache every few seconds so that the stats page can merge all of them.
+"""
+import os
+import socket
+import threading
+import time
+from bisect import bisect_left
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import connection
+
+# Upper bounds in milliseconds of the latency buckets, the last one catches everything slower
+LATENCY_BUCKETS = (1, 2, 3, 5, 7, 10, 15, 20, 30, 50, 75, 100, 150, 200, 300, 500, 750, 1000, 1500, 2000, 3000,
+                   5000, 10000, float('inf'))
+QUERY_BUCKETS = (0, 1, 2, 3, 4, 5, 6, 8, 10, 15, 20, 30, 50, 100, 200, float('inf'))
+METRICS_SLOT_SECONDS = 60
+METRICS_WINDOW_SLOTS = 15
+# How often each worker copies its histograms to the cache
+METRICS_PUBLISH_INTERVAL = 10
+METRICS_WORKERS_CACHE_KEY = 'scan_metrics_workers'
+PERCENTILES = (50, 95, 99)
+
+_worker_key = 'scan_metrics:%s:%s' % (socket.gethostname(), os.getpid())
+_lock = threading.Lock()
+# slot number -> scan type -> aggregate
+_slots = {}
+_last_publish = 0
+
+
+class QueryCounter:
+    """Database execute wrapper that counts the queries run and the time spent on them"""
+
+    def __init__(self):
+        self.count = 0
+        self.time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.count += 1
+            self.time += time.perf_counter() - start
+
+
+def new_aggregate():
+    return {
+        'count': 0,
+        'status': {},
+        'latency': [0] * len(LATENCY_BUCKETS),
+        'latency_sum': 0.0,
+        'latency_max': 0.0,
+        'db_time': [0] * len(LATENCY_BUCKETS),
+        'db_time_sum': 0.0,
+        'db_time_max': 0.0,
+        'queries': [0] * len(QUERY_BUCKETS),
+        'queries_sum': 0,
+        'queries_max': 0,
+    }
+
+
+def add_sample(aggregate, name, value, buckets):
+    aggregate[name][bisect_left(buckets, value)] += 1
+    aggregate[name + '_sum'] += value
+    if value > aggregate[name + '_max']:
+        aggregate[name + '_max'] = value
+
+
+def record(scan_type, latency, queries, db_time, status):
+    """
+    Adds a sample to the histograms of the scan type
+    :param latency: wall time in seconds
+    :param db_time: time spent in the database in seconds
+    """
+    now = time.time()
+    slot = int(now // METRICS_SLOT_SECONDS)
+    with _lock:
+        aggregates = _slots.get(slot)
+        if aggregates is None:
+            aggregates = _slots[slot] = {}
+            for old_slot in [s for s in _slots if s <= slot - METRICS_WINDOW_SLOTS]:
+                del _slots[old_slot]
+        aggregate = aggregates.get(scan_type)
+        if aggregate is None:
+            aggregate = aggregates[scan_type] = new_aggregate()
+        aggregate['count'] += 1
+        aggregate['status'][status] = aggregate['status'].get(status, 0) + 1
+        add_sample(aggregate, 'latency', latency * 1000, LATENCY_BUCKETS)
+        add_sample(aggregate, 'db_time', db_time * 1000, LATENCY_BUCKETS)
+        add_sample(aggregate, 'queries', queries, QUERY_BUCKETS)
+    if now - _last_publish > METRICS_PUBLISH_INTERVAL:
+        publish(now)
+
+
+def window_slots(now=None):
+    current = int((now or time.time()) // METRICS_SLOT_SECONDS)
+    with _lock:
+        return {slot: {scan_type: dict(aggregate, status=dict(aggregate['status']),
+                                       latency=list(aggregate['latency']), db_time=list(aggregate['db_time']),
+                                       queries=list(aggregate['queries']))
+                       for scan_type, aggregate in aggregates.items()}
+                for slot, aggregates in _slots.items() if slot > current - METRICS_WINDOW_SLOTS}
+
+
+def publish(now=None):
+    """Copies the histograms of this worker to the cache and makes sure the worker is in the workers list"""
+    global _last_publish
+    now = now or time.time()
+    _last_publish = now
+    timeout = METRICS_SLOT_SECONDS * METRICS_WINDOW_SLOTS
+    cache.set(_worker_key, window_slots(now), timeout)
+    workers = cache.get(METRICS_WORKERS_CACHE_KEY) or []
+    if _worker_key not in workers:
+        cache.set(METRICS_WORKERS_CACHE_KEY, workers + [_worker_key], timeout)
+
+
+def instrument_scan(scan_type):
+    """Decorator recording the latency, queries and response status of every call to a scan handler"""
+
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            counter = QueryCounter()
+            status = 500
+            start = time.perf_counter()
+            try:
+                with connection.execute_wrapper(counter):
+                    response = func(*args, **kwargs)
+                status = getattr(response, 'status_code', 200)
+                return response
+            finally:
+                record(scan_type, time.perf_counter() - start, counter.count, counter.time, status)
+
+        return wrapper
+
+    return decorator
+
+
+def merge(target, aggregate):
+    for name in ('latency', 'db_time', 'queries'):
+        target[name] = [a + b for a, b in zip(target[name], aggregate[name])]
+        target[name + '_sum'] += aggregate[name + '_sum']
+        target[name + '_max'] = max(target[name + '_max'], aggregate[name + '_max'])
+    target['count'] += aggregate['count']
+    for status, count in aggregate['status'].items():
+        target['status'][status] = target['status'].get(status, 0) + count
+
+
+def percentile(histogram, buckets, maximum, p):
+    """Value below which p% of the samples are, interpolated linearly inside the bucket that contains it"""
+    total = sum(histogram)
+    if not total:
+        return 0
+    rank = total * p / 100.0
+    seen = 0
+    for index, count in enumerate(histogram):
+        if count and seen + count >= rank:
+            lower = buckets[index - 1] if index else 0
+            upper = min(buckets[index], maximum)
+            return round(lower + (upper - lower) * (rank - seen) / count, 2)
+        seen += count
+    return round(maximum, 2)
+
+
+def summary(aggregate, name, buckets):
+    result = {'p%s' % p: percentile(aggregate[name], buckets, aggregate[name + '_max'], p) for p in PERCENTILES}
+    result['avg'] = round(aggregate[name + '_sum'] / aggregate['count'], 2) if aggregate['count'] else 0
+    result['max'] = round(aggregate[name + '_max'], 2)
+    return result
+
+
+def get_scan_metrics():
+    """
+    Merges the histograms of every worker for the current window
+    :return: list of dicts with the count, status counts and latency (ms), db time (ms) and queries percentiles of
+    each scan type
+    """
+    now = time.time()
+    current = int(now // METRICS_SLOT_SECONDS)
+    workers = [key for key in cache.get(METRICS_WORKERS_CACHE_KEY) or [] if key != _worker_key]
+    snapshots = [window_slots(now)] + [snapshot for snapshot in cache.get_many(workers).values() if snapshot]
+    aggregates = {}
+    for snapshot in snapshots:
+        for slot, slot_aggregates in snapshot.items():
+            if slot <= current - METRICS_WINDOW_SLOTS:
+                continue
+            for scan_type, aggregate in slot_aggregates.items():
+                merge(aggregates.setdefault(scan_type, new_aggregate()), aggregate)
+    return [
+        {
+            'type': scan_type,
+            'count': aggregate['count'],
+            'status': {str(status): count for status, count in sorted(aggregate['status'].items())},
+            'latency': summary(aggregate, 'latency', LATENCY_BUCKETS),
+            'db_time': summary(aggregate, 'db_time', LATENCY_BUCKETS),
+            'queries': summary(aggregate, 'queries', QUERY_BUCKETS),
+        }
+        for scan_type, aggregate in sorted(aggregates.items())
+    ]
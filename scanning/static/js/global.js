@@ -41,10 +41,19 @@ const global = (() => {
             }
         },
 
-        sendScan: (type, id, badgeQR) => {
+        // random UUID v4 identifying a scan, kept when the scan is retried
+        newScanId: () => {
+            const bytes = crypto.getRandomValues(new Uint8Array(16));
+            bytes[6] = (bytes[6] & 0x0f) | 0x40;
+            bytes[8] = (bytes[8] & 0x3f) | 0x80;
+            const hex = Array.from(bytes, (byte) => byte.toString(16).padStart(2, "0")).join("");
+            return `${hex.slice(0, 8)}-${hex.slice(8, 12)}-${hex.slice(12, 16)}-${hex.slice(16, 20)}-${hex.slice(20)}`;
+        },
+
+        sendScan: (type, id, badgeQR, scanId) => {
             return $.ajax({
                 type: "post",
-                data: {type, id, badgeQR}
+                data: {type, id, badgeQR, scanId}
             });
         },
 
@@ -55,6 +64,15 @@ const global = (() => {
             });
         },
 
+        syncScans: (scans) => {
+            return $.ajax({
+                type: "post",
+                url: "/scan/sync/",
+                contentType: "application/json",
+                data: JSON.stringify({scans})
+            });
+        },
+
         generateTestCredentials: (count = 1) => {
             return $.get("/scan/generate?count=" + count);
         }
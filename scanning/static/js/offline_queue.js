@@ -0,0 +1,75 @@
+/**
+ * Keeps the scans that could not reach the server (no connection) in localStorage and sends them to the sync
+ * endpoint in a single request once the connection is back.
+ */
+const offlineQueue = (() => {
+    /** Key for the localStorage functionality */
+    const OFFLINE_QUEUE_LOCALSTORAGE_KEY = "offline_scan_queue";
+    /** Types of scans that the sync endpoint accepts */
+    const SYNCABLE_TYPES = ["workshop", "meal", "award", "checkin"];
+    /** How often we try to flush the queue while there are scans pending */
+    const SYNC_INTERVAL = 30000;
+
+    let syncing = false;
+
+    function getQueue() {
+        return JSON.parse(localStorage.getItem(OFFLINE_QUEUE_LOCALSTORAGE_KEY) || "[]");
+    }
+
+    function setQueue(queue) {
+        localStorage.setItem(OFFLINE_QUEUE_LOCALSTORAGE_KEY, JSON.stringify(queue));
+        $("#offline-queue-count").text(queue.length).parent().toggle(queue.length > 0);
+    }
+
+    /**
+     * Sends all the queued scans. Scans are only removed from the queue once the server has answered for them, the
+     * scans that failed are shown in the alert box so that they can be fixed by hand.
+     */
+    function flush() {
+        const queue = getQueue();
+        if (syncing || queue.length === 0 || !navigator.onLine) {
+            return;
+        }
+        syncing = true;
+        global.syncScans(queue).done((response) => {
+            // scans queued while the request was in flight are kept
+            setQueue(getQueue().slice(queue.length));
+            const errors = response.message
+                .map((result, i) => result.status !== 200 ? `${queue[i].badgeQR}: [${result.status}] ${result.message}` : null)
+                .filter((error) => error !== null);
+            if (errors.length) {
+                $(".alert").show().html(`Some offline scans could not be saved:<br>${errors.join("<br>")}`);
+            }
+        }).always(() => {
+            syncing = false;
+        });
+    }
+
+    $(document).ready(() => {
+        setQueue(getQueue());
+        $(window).on("online", flush);
+        setInterval(flush, SYNC_INTERVAL);
+        flush();
+    });
+
+    return {
+        /**
+         * Whether a failed AJAX response was caused by a missing connection and the scan can be queued
+         * @param type the type of scan
+         * @param response the failed jqXHR
+         */
+        canQueue: (type, response) => response.status === 0 && SYNCABLE_TYPES.includes(type),
+
+        /**
+         * Stores a scan to be sent later
+         * @param scan object with the same fields as a regular scan POST
+         */
+        push: (scan) => {
+            const queue = getQueue();
+            queue.push(scan);
+            setQueue(queue);
+        },
+
+        flush: flush
+    }
+})();
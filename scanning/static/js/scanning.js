@@ -133,6 +133,9 @@ const scanningQr = (() => {
                 <div class="row">
                     <div class="col"><strong>Points</strong>: ${user.points || 0}</div>
                 </div>
+                <div class="row">
+                    <div class="col"><strong>Leaderboard</strong>: ${user.leaderboardPosition ? '#' + user.leaderboardPosition : 'Not ranked'}</div>
+                </div>
                 ${application}
             </div>
             <div class="col col-xs-5 col-sm-5 col-md-5 text-right">
@@ -218,7 +221,18 @@ const scanningQr = (() => {
                     setTimeout(() => {
                         scanner.startFlow();
                     }, 1500);
-                }).fail((response) => handleError(response, scanner)); // else error with a message and require a click to start flow
+                }).fail((response) => {
+                    // without connection the scan is queued and sent once we are back online
+                    if (offlineQueue.canQueue(type, response)) {
+                        offlineQueue.push({type, participantQR: emailQr, badgeQR: participantQr});
+                        setStatus("success-checkmark", "Offline: check-in queued");
+                        setTimeout(() => {
+                            scanner.startFlow();
+                        }, 1500);
+                        return;
+                    }
+                    handleError(response, scanner); // else error with a message and require a click to start flow
+                });
             })
         );
     }
@@ -239,7 +253,9 @@ const scanningQr = (() => {
         scanner.registerFlows(
             new AsyncFlow("Scan", (content, flow) => {
                 setStatus("scanning");
-                global.sendScan(type, value, content).done((response) => {
+                // the same id is sent if the scan is queued, so the server applies it only once
+                const scanId = global.newScanId();
+                global.sendScan(type, value, content, scanId).done((response) => {
                     let waitTime = 750;
 
                     if (type === "meal") {
@@ -260,7 +276,18 @@ const scanningQr = (() => {
                     timer = setTimeout(() => {
                         scanner.startFlow();
                     }, waitTime);
-                }).fail((response) => handleError(response, scanner)); // else error with a message and require a click to start flow
+                }).fail((response) => {
+                    // without connection the scan is queued and sent once we are back online
+                    if (offlineQueue.canQueue(type, response)) {
+                        offlineQueue.push({type, id: value, badgeQR: content, scanId});
+                        setStatus("success-checkmark", "Offline: scan queued");
+                        timer = setTimeout(() => {
+                            scanner.startFlow();
+                        }, 750);
+                        return;
+                    }
+                    handleError(response, scanner); // else error with a message and require a click to start flow
+                });
             })
         );
 
@@ -4,5 +4,6 @@ from scanning import views
 
 urlpatterns = [
     path('', views.ScanningView.as_view(), name='scanning'),
-    path('generate/', views.scanning_generate_view)
+    path('generate/', views.scanning_generate_view),
+    path('sync/', views.ScanningSyncView.as_view(), name='scanning_sync'),
 ]
@@ -1,16 +1,24 @@
+import json
+from collections import defaultdict
 from random import randint
 
 import uuid
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.db import IntegrityError
+from django.db import IntegrityError, transaction
 from django.db.models import Case, Value, When
 from django.http import JsonResponse
+from django.utils import timezone
+from django.views import View
 from django.views.generic.base import TemplateView
 
 from applications.models import Application
 from checkin.models import CheckIn
-from meals.models import Meal, Eaten
-from points.models import Points
+from checkin.utils import Badge, get_badge, get_badges, invalidate_badges
+from meals.models import Meal, Eaten, EatenCounter
+from points.models import Points, PointsTransaction
+from scanning.metrics import instrument_scan
+from stats.models import StatsCounter
 from user.models import User
 from workshops.models import Workshop, Attendance
 
@@ -30,6 +38,7 @@ class ScanningView(LoginRequiredMixin, TemplateView):
         })
         return context
 
+    @instrument_scan('all')
     def post(self, request, *args, **kwargs):
         type = request.POST.get('type', None)
         if type == 'workshop':
@@ -52,6 +61,39 @@ class ScanningView(LoginRequiredMixin, TemplateView):
             return volunteer_duty_change(request)
 
 
+# Maximum number of queued scans accepted by a single sync request
+MAX_SYNC_SCANS = 500
+SYNC_SCAN_TYPES = ('workshop', 'meal', 'award', 'checkin')
+
+
+class ScanningSyncView(LoginRequiredMixin, View):
+    """
+    Receives the scans the scanning page queued while it was offline. The body is a JSON object with a `scans` list,
+    each scan having the same fields as a regular scan POST (type, id, badgeQR, participantQR and scanId).
+    """
+    login_url = '/user/login/'
+
+    def post(self, request, *args, **kwargs):
+        try:
+            scans = json.loads(request.body.decode('utf-8')).get('scans', None)
+        except (ValueError, AttributeError):
+            scans = None
+        if not isinstance(scans, list):
+            return JsonResponse({
+                'status': 400,
+                'message': 'The scan queue is not valid.'
+            }, status=400)
+        if len(scans) > MAX_SYNC_SCANS:
+            return JsonResponse({
+                'status': 413,
+                'message': 'Too many scans in this request. Max. %s' % MAX_SYNC_SCANS
+            }, status=413)
+        return JsonResponse({
+            'status': 200,
+            'message': sync_scans(request.user, scans)
+        })
+
+
 def scanning_generate_view(request):
     if request.method == 'GET':
         credentials = []
@@ -63,12 +105,14 @@ def scanning_generate_view(request):
                 'message': 'The count in this request is not included or too high. Max. 10'
             }, status=500)
 
+        # Testers share the password, hash it once. Use the generate_dataset command for bigger datasets.
+        password_hash = make_password('password1')
         for x in range(count):
             user = User(
                 email='tester' + str(randint(999, 9999999999)) + '@ugahacks.com',
-                name='Tester Account'
+                name='Tester Account',
+                password=password_hash
             )
-            user.set_password('password1')
             user.save()
 
             application = Application(
@@ -92,10 +136,11 @@ def scanning_generate_view(request):
         }, status=200)
 
 
+@instrument_scan('workshop')
 def workshop_scan(request):
     id = request.POST.get('id', None)
     qr_code = request.POST.get('badgeQR', None)
-    response, hacker_user = get_user_from_qr(qr_code)
+    response, badge = get_badge_from_qr(qr_code)
     if response is not None:
         return response
 
@@ -105,29 +150,29 @@ def workshop_scan(request):
             'status': 403,
             'message': 'This workshop is not open yet or it has ended.'
         }, status=403)
-    hacker_attended = workshop.attendance_set.filter(user=hacker_user).first()
+    hacker_attended = workshop.attendance_set.filter(user_id=badge.user_id).exists()
     if hacker_attended:
         return JsonResponse({
             'status': 409,
             'message': 'This hacker has already been marked for attendance for this workshop!'
         }, status=409)
-    attendance = Attendance(workshop=workshop, user=hacker_user)
+    attendance = Attendance(workshop=workshop, user_id=badge.user_id)
     attendance.save()
-    # Adding points to the hacker for attending the hackathon
-    points = Points.objects.filter(user=hacker_user).first()
-    if not points:
-        points = Points(user=hacker_user)
-    points.add_points(workshop.points)
+    # Adding points to the hacker for attending the workshop
+    if workshop.points:
+        Points.award(badge.user_id, workshop.points, PointsTransaction.WORKSHOP, scanner=request.user,
+                     key=PointsTransaction.workshop_key(workshop.id, badge.user_id), workshop=workshop)
     return JsonResponse({
         'status': 200,
         'message': 'Attendance logged!'
     })
 
 
+@instrument_scan('meal')
 def meal_scan(request):
     id = request.POST.get('id', None)
     qr_code = request.POST.get('badgeQR', None)
-    response, hacker_user = get_user_from_qr(qr_code)
+    response, badge = get_badge_from_qr(qr_code)
     if response is not None:
         return response
 
@@ -137,25 +182,23 @@ def meal_scan(request):
             'status': 403,
             'message': 'This meal is not open yet or it has ended. Reach out to an organizer to activate it again'
         }, status=403)
-    times_hacker_ate = Eaten.objects.filter(meal=meal, user=hacker_user).count()
-    if times_hacker_ate == meal.times:
+    served, times_hacker_ate = meal.serve(badge.user_id)
+    if not served:
         return JsonResponse({
             'status': 409,
             'message': f'Warning! Hacker already ate the max number of available times ({times_hacker_ate})!'
         }, status=409)
-    eaten = Eaten(meal=meal, user=hacker_user)
-    eaten.save()
-    user_application = Application.objects.filter(user_id=hacker_user.id).first()
     return JsonResponse({
         'status': 200,
         'message': 'Hacker successfully logged for this meal!',
         'data': {
-            'diet': user_application.diet,
-            'other_diet': user_application.other_diet
+            'diet': badge.diet,
+            'other_diet': badge.other_diet
         }
     })
 
 
+@instrument_scan('checkin')
 def checkin_scan(request):
     response, user_application = get_application_from_request(request)
     if response is not None:
@@ -180,6 +223,7 @@ def checkin_scan(request):
     })
 
 
+@instrument_scan('reissue')
 def reissue_scan(request):
     response, user_application = get_application_from_request(request)
     if response is not None:
@@ -194,6 +238,7 @@ def reissue_scan(request):
     })
 
 
+@instrument_scan('award')
 def sponsor_scan(request):
     from sponsors.models import Sponsor
     tier_points = request.user.get_tier_value()
@@ -203,23 +248,23 @@ def sponsor_scan(request):
             'message': 'We cannot verify you as a sponsor. Please contact an organizer.'
         }, status=401)
     badge_qr = request.POST.get('badgeQR', None)
-    response, hacker_user = get_user_from_qr(badge_qr)
+    response, badge = get_badge_from_qr(badge_qr)
     if response is not None:
         return response
-    points = Points.objects.filter(user=hacker_user).first()
-    if not points:
-        points = Points(user=hacker_user)
-    points.add_points(tier_points)
-    points.save()
     sponsor_domain = request.user.email.split('@')[1]
     sponsor = Sponsor.objects.filter(email_domain=sponsor_domain).first()
-    sponsor.scanned_hackers.add(hacker_user)
+    # A retried scan is only awarded once, it already succeeded the first time
+    Points.award(badge.user_id, tier_points, PointsTransaction.SPONSOR, scanner=request.user,
+                 key=get_scan_key(request.POST.get('scanId', None)))
+    if sponsor:
+        sponsor.scanned_hackers.add(badge.user_id)
     return JsonResponse({
         'status': 200,
         'message': 'Points successfully added to participant!'
     })
 
 
+@instrument_scan('view')
 def view_badge_scan(request):
     qr_code = request.POST.get('badgeQR', None)
     response, hacker_checkin = get_checkin_from_qr(qr_code, True)
@@ -228,20 +273,17 @@ def view_badge_scan(request):
     user_application = hacker_checkin.application
     user_application_serialized = user_application.serialize()
 
-    # TODO: Move this logic into the user model as a "get_points" method OR more points with user
-    points = Points.objects.filter(user=user_application.user).first()
-    if not points:
-        points = 0
-    else:
-        points = points.points
     user_application_serialized['isActive'] = hacker_checkin.is_active
-    user_application_serialized['user']['points'] = points
+    user_application_serialized['user']['points'] = Points.get_balance(user_application.user_id)
+    user_application_serialized['user']['leaderboardPosition'] = \
+        Points.get_leaderboard_position(user_application.user_id)
     return JsonResponse({
         'status': 200,
         'message': user_application_serialized
     })
 
 
+@instrument_scan('change_user_active')
 def change_user_active(request, active):
     qr_code = request.POST.get('badgeQR', None)
     response, hacker_checkin = get_checkin_from_qr(qr_code, True)
@@ -257,27 +299,27 @@ def change_user_active(request, active):
     })
 
 
+@instrument_scan('volunteer_checkin')
 def volunteer_duty_change(request):
-    from django.utils import timezone
-
     qr_code = request.POST.get('badgeQR', None)
-    response, hacker_user = get_user_from_qr(qr_code)
+    response, badge = get_badge_from_qr(qr_code)
     if response is not None:
         return response
-    if not hacker_user.is_volunteer:
+    if not badge.is_volunteer:
         return JsonResponse({
             'status': 403,
             'message': 'User is not a volunteer.'
         }, status=403)
 
-    User.objects.filter(pk=hacker_user.id).update(on_duty=Case(
+    User.objects.filter(pk=badge.user_id).update(on_duty=Case(
         When(on_duty=True, then=Value(False)),
         default=Value(True)
     ))
 
+    hacker_user = User.objects.get(pk=badge.user_id)
     if hacker_user.on_duty:
         hacker_user.duty_update_time = timezone.now()
-    hacker_user.save()
+        hacker_user.save(update_fields=['duty_update_time'])
 
     return JsonResponse({
         'status': 200,
@@ -285,18 +327,199 @@ def volunteer_duty_change(request):
     })
 
 
-def get_user_from_qr(qr_code):
-    response, hacker_checkin = get_checkin_from_qr(qr_code)
-    if response is not None:
-        return response, hacker_checkin
-    hacker_user = hacker_checkin.application.user
-    if not hacker_user:
+@instrument_scan('sync')
+@transaction.atomic
+def sync_scans(scanner, scans):
+    """
+    Applies a batch of scans in order and returns one {status, message} result per scan. Badges, applications,
+    meals and workshops are resolved with one query each and every write is done in bulk. The whole
+    batch runs in one transaction.
+    """
+    results = [None] * len(scans)
+    pending = []
+    for index, scan in enumerate(scans):
+        if not isinstance(scan, dict) or scan.get('type') not in SYNC_SCAN_TYPES:
+            results[index] = scan_result(400, 'This scan type can not be synchronized.')
+        elif not scan.get('badgeQR'):
+            results[index] = scan_result(404, 'The QR code is not available.')
+        else:
+            pending.append((index, scan))
+
+    badges = get_badges(scan['badgeQR'] for _, scan in pending if scan['type'] != 'checkin')
+    applications = {
+        str(application.uuid): application
+        for application in Application.objects.select_related('user').filter(
+            uuid__in={scan.get('participantQR') for _, scan in pending
+                      if scan['type'] == 'checkin' and is_uuid(scan.get('participantQR'))}
+        )
+    }
+    checked_in = set(CheckIn.objects.filter(application__in=applications.values())
+                     .values_list('application_id', flat=True))
+    object_ids = defaultdict(set)
+    for _, scan in pending:
+        if scan['type'] in ('meal', 'workshop') and str(scan.get('id', '')).isdigit():
+            object_ids[scan['type']].add(int(scan['id']))
+    meals = Meal.objects.in_bulk(object_ids['meal'])
+    workshops = Workshop.objects.in_bulk(object_ids['workshop'])
+    user_ids = [badge.user_id for badge in badges.values()]
+    # Badges checked-in in this same batch can already be scanned for meals
+    scanned_users = {badge_qr: badge.user_id for badge_qr, badge in badges.items()}
+    for _, scan in pending:
+        if scan['type'] == 'checkin' and scan.get('participantQR') in applications:
+            scanned_users.setdefault(scan['badgeQR'], applications[scan['participantQR']].user_id)
+    meal_keys = set()
+    for _, scan in pending:
+        meal_id = int(scan['id']) if scan['type'] == 'meal' and str(scan.get('id', '')).isdigit() else None
+        if meal_id in meals and scan['badgeQR'] in scanned_users:
+            meal_keys.add((meal_id, scanned_users[scan['badgeQR']]))
+    # Locked until the end of the sync so that concurrent meal scans wait for our quotas
+    eaten_counters = EatenCounter.lock_in_bulk(meal_keys)
+    times_eaten = defaultdict(int, {key: counter.times for key, counter in eaten_counters.items()})
+    attended = set(Attendance.objects.filter(workshop_id__in=list(workshops), user_id__in=user_ids)
+                   .values_list('workshop_id', 'user_id'))
+    sponsor, tier_points = None, None
+    if any(scan['type'] == 'award' for _, scan in pending):
+        from sponsors.models import Sponsor
+        tier_points = scanner.get_tier_value()
+        sponsor = Sponsor.objects.filter(email_domain=scanner.email.split('@')[1]).first()
+
+    new_checkins, new_eatens, new_attendances, new_transactions = [], [], [], []
+    sponsor_scanned = set()
+    now = timezone.now()
+    for index, scan in pending:
+        type, badge_qr = scan['type'], scan['badgeQR']
+        if type == 'checkin':
+            application = applications.get(scan.get('participantQR'))
+            if scan.get('participantQR') == badge_qr:
+                results[index] = scan_result(403, 'ParticipantQR and BadgeQr should not equal.')
+            elif not application:
+                results[index] = scan_result(404, 'Hacker\'s application is not found')
+            elif application.pk in checked_in:
+                results[index] = scan_result(403, 'User already checked-in!')
+            else:
+                checked_in.add(application.pk)
+                badges[badge_qr] = Badge(
+                    qr_identifier=badge_qr, user_id=application.user_id, is_active=True, diet=application.diet,
+                    other_diet=application.other_diet, is_volunteer=application.user.is_volunteer,
+                    is_organizer=application.user.is_organizer, is_sponsor=application.user.is_sponsor,
+                    is_mentor=application.user.is_mentor)
+                new_checkins.append(CheckIn(application=application, user=scanner, qr_identifier=badge_qr,
+                                            update_time=now))
+                results[index] = scan_result(200, 'Hacker checked-in! Good job! Nothing else to see here, '
+                                                  'you can move on :D')
+            continue
+
+        badge = badges.get(badge_qr)
+        if not badge:
+            results[index] = scan_result(404, 'Invalid QR code!')
+        elif not badge.is_active:
+            results[index] = scan_result(403, 'Badge is disabled.')
+        elif type == 'award':
+            if not tier_points or not sponsor:
+                results[index] = scan_result(401, 'We cannot verify you as a sponsor. Please contact an organizer.')
+            else:
+                new_transactions.append(PointsTransaction(
+                    user_id=badge.user_id, amount=tier_points, source=PointsTransaction.SPONSOR, scanner=scanner,
+                    key=get_scan_key(scan.get('scanId'))))
+                sponsor_scanned.add(badge.user_id)
+                results[index] = scan_result(200, 'Points successfully added to participant!')
+        elif type == 'workshop':
+            workshop = workshops.get(int(scan['id'])) if str(scan.get('id', '')).isdigit() else None
+            if not workshop:
+                results[index] = scan_result(404, 'This workshop does not exist.')
+            elif not workshop.open and not scanner.is_organizer:
+                results[index] = scan_result(403, 'This workshop is not open yet or it has ended.')
+            elif (workshop.id, badge.user_id) in attended:
+                results[index] = scan_result(
+                    409, 'This hacker has already been marked for attendance for this workshop!')
+            else:
+                attended.add((workshop.id, badge.user_id))
+                new_attendances.append(Attendance(workshop=workshop, user_id=badge.user_id))
+                new_transactions.append(PointsTransaction(
+                    user_id=badge.user_id, amount=workshop.points, source=PointsTransaction.WORKSHOP, scanner=scanner,
+                    key=PointsTransaction.workshop_key(workshop.id, badge.user_id), workshop=workshop))
+                results[index] = scan_result(200, 'Attendance logged!')
+        elif type == 'meal':
+            meal = meals.get(int(scan['id'])) if str(scan.get('id', '')).isdigit() else None
+            key = (getattr(meal, 'id', None), badge.user_id)
+            if not meal:
+                results[index] = scan_result(404, 'This meal does not exist.')
+            elif not meal.opened and not scanner.is_organizer:
+                results[index] = scan_result(403, 'This meal is not open yet or it has ended. Reach out to an '
+                                                  'organizer to activate it again')
+            elif times_eaten[key] >= meal.times:
+                results[index] = scan_result(409, f'Warning! Hacker already ate the max number of available times '
+                                                  f'({times_eaten[key]})!')
+            else:
+                times_eaten[key] += 1
+                new_eatens.append(Eaten(meal=meal, user_id=badge.user_id))
+                results[index] = scan_result(200, 'Hacker successfully logged for this meal!', data={
+                    'diet': badge.diet,
+                    'other_diet': badge.other_diet
+                })
+
+    CheckIn.objects.bulk_create(new_checkins)
+    invalidate_badges(*[checkin.qr_identifier for checkin in new_checkins])
+    checked_in = Application.objects.filter(pk__in=[checkin.application_id for checkin in new_checkins])
+    previous = list(checked_in.values(*StatsCounter.FIELDS))
+    checked_in.update(status=Application.ATTENDED, status_update_date=now)
+    StatsCounter.track(removed=previous, added=[dict(values, status=Application.ATTENDED) for values in previous])
+    Attendance.objects.bulk_create(new_attendances)
+    Eaten.objects.bulk_create(new_eatens)
+    EatenCounter.set_times_in_bulk(eaten_counters, times_eaten)
+    Points.award_in_bulk(new_transactions)
+    if sponsor_scanned:
+        sponsor.scanned_hackers.add(*sponsor_scanned)
+    return results
+
+
+def scan_result(status, message, data=None):
+    result = {'status': status, 'message': message}
+    if data is not None:
+        result['data'] = data
+    return result
+
+
+def get_scan_key(scan_id):
+    """Idempotency key of a scan from the id sent by the scanning page, None for clients that don't send it"""
+    return PointsTransaction.scan_key(scan_id) if scan_id and is_uuid(scan_id) else None
+
+
+def is_uuid(value):
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+
+def get_badge_from_qr(qr_code, ignore_disabled_badge=False):
+    """
+    Same as get_checkin_from_qr but returns the cached checkin.utils.Badge instead of the CheckIn. Use it for scans
+    that only need the hacker's id, diet or roles.
+    """
+    badge = None
+    response = None
+    if not qr_code:
         response = JsonResponse({
             'status': 404,
-            'message': 'No user found for this QR code!'
+            'message': 'The QR code is not available.'
         }, status=404)
-    # response == None if hacker_user is found.
-    return response, hacker_user
+        return response, badge
+
+    badge = get_badge(qr_code)
+    if not badge:
+        response = JsonResponse({
+            'status': 404,
+            'message': 'Invalid QR code!'
+        }, status=404)
+        return response, badge
+    if not badge.is_active and not ignore_disabled_badge:
+        response = JsonResponse({
+            'status': 403,
+            'message': 'Badge is disabled.'
+        }, status=403)
+    return response, badge
 
 
 def get_application_from_request(request):
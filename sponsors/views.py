@@ -3,9 +3,8 @@ from django.views.generic import ListView, TemplateView
 from django.views.generic.edit import FormView, UpdateView
 from django_filters.views import FilterView
 from django_tables2 import SingleTableMixin
-from django_tables2.export import ExportMixin
 
-from app.mixins import TabsViewMixin
+from app.mixins import StreamingExportMixin, TabsViewMixin
 from applications.models import Application
 from user.mixins import IsOrganizerMixin, IsSponsorMixin
 from .forms import SponsorForm, SponsorAddForm
@@ -13,7 +12,7 @@ from .models import Sponsor, SponsorApplication
 from .tables import ApplicationsListSponsor, SponsorListTable, SponsorListFilter, HackerListFilter
 
 
-class SponsorHomePage(TabsViewMixin, ExportMixin, SingleTableMixin, IsSponsorMixin, FilterView):
+class SponsorHomePage(TabsViewMixin, StreamingExportMixin, SingleTableMixin, IsSponsorMixin, FilterView):
     template_name = 'sponsor_home.html'
     table_class = ApplicationsListSponsor
     filterset_class = HackerListFilter
@@ -0,0 +1,21 @@
+from django.contrib import admin
+
+from stats import models
+
+
+class StatsCounterAdmin(admin.ModelAdmin):
+    list_display = (
+        'dimension', 'value', 'status', 'count'
+    )
+    search_fields = (
+        'value',
+    )
+    list_filter = (
+        'dimension', 'status'
+    )
+
+    def get_actions(self, request):
+        return []
+
+
+admin.site.register(models.StatsCounter, admin_class=StatsCounterAdmin)
@@ -3,3 +3,11 @@ from django.apps import AppConfig
 
 class StatsConfig(AppConfig):
     name = 'stats'
+
+    def ready(self):
+        super(StatsConfig, self).ready()
+        from .signals import app_stats_invalidate, stats_counter_previous, stats_counter_update, stats_counter_remove
+        app_stats_invalidate
+        stats_counter_previous
+        stats_counter_update
+        stats_counter_remove
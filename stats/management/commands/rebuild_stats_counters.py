@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from stats.models import StatsCounter
+from stats.utils import invalidate_app_stats
+
+
+class Command(BaseCommand):
+    help = 'Recomputes the application stats counters from the applications table, repairing any drift'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Rebuilding stats counters...')
+        count = StatsCounter.rebuild()
+        invalidate_app_stats()
+        self.stdout.write(self.style.SUCCESS('Rebuilding stats counters... Successfully rebuilt %s counters' % count))
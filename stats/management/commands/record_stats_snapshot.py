@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from stats.models import StatsSnapshot
+
+
+class Command(BaseCommand):
+    help = 'Records the current application status, diet, shirt and check-in counts for the trend charts. ' \
+           'Running it again within the same bucket replaces that bucket'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucket', type=int, default=15, help='Minutes of each snapshot bucket')
+
+    def handle(self, *args, **options):
+        if options['bucket'] < 1:
+            raise CommandError('The bucket must be at least one minute')
+        self.stdout.write('Recording stats snapshot...')
+        count = StatsSnapshot.record(options['bucket'])
+        self.stdout.write(self.style.SUCCESS('Recording stats snapshot... Successfully recorded %s counts' % count))
@@ -0,0 +1,49 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:09
+
+from collections import Counter
+
+from django.db import migrations, models
+
+DIMENSIONS = ('status', 'gender', 'class_status', 'degree', 'hearabout', 'attendance_type', 'first_timer',
+              'tshirt_size', 'diet')
+
+
+def build_counters(apps, schema_editor):
+    Application = apps.get_model('applications', 'Application')
+    StatsCounter = apps.get_model('stats', 'StatsCounter')
+    counters = Counter()
+    for values in Application.objects.order_by().values(*DIMENSIONS, 'participant').annotate(count=models.Count('pk')):
+        for dimension in DIMENSIONS:
+            # Mentors have no class
+            if dimension == 'class_status' and values['participant'] == 'Mentor':
+                continue
+            value = values[dimension]
+            counters[(dimension, '' if value is None else str(value), values['status'])] += values['count']
+    StatsCounter.objects.bulk_create([StatsCounter(dimension=dimension, value=value, status=status, count=count)
+                                      for (dimension, value, status), count in counters.items()])
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('applications', '0040_application_score'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StatsCounter',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dimension', models.CharField(max_length=20)),
+                ('value', models.CharField(max_length=300)),
+                ('status', models.CharField(choices=[('P', 'Under review'), ('R', 'Wait listed'), ('I', 'Invited'), ('LR', 'Last reminder'), ('C', 'Confirmed'), ('X', 'Cancelled'), ('A', 'Attended'), ('E', 'Expired'), ('D', 'Dubious')], max_length=2)),
+                ('count', models.IntegerField(default=0)),
+            ],
+            options={
+                'unique_together': {('dimension', 'value', 'status')},
+            },
+        ),
+        migrations.RunPython(build_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,187 @@
+from collections import Counter, OrderedDict
+from datetime import timedelta
+
+from django.db import connection, models, transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from applications.models import Application
+from checkin.models import CheckIn
+
+
+class StatsCounter(models.Model):
+    """
+    Number of applications with a value in one of the DIMENSIONS, by application status. Kept up to date by the
+    application signals (and by track for bulk operations) so that stats read a few hundred rows instead of grouping
+    the applications table. Use the rebuild_stats_counters command to repair any drift.
+    """
+    DIMENSIONS = ('status', 'gender', 'class_status', 'degree', 'hearabout', 'attendance_type', 'first_timer',
+                  'tshirt_size', 'diet')
+    # Application fields needed to compute the counters
+    FIELDS = DIMENSIONS + ('participant',)
+    UPDATE_BATCH_SIZE = 50
+
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=300)
+    status = models.CharField(max_length=2, choices=Application.STATUS)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ('dimension', 'value', 'status')
+
+    @classmethod
+    def keys(cls, values):
+        """
+        Counters an application adds to.
+        :param values: dict with the FIELDS of the application
+        """
+        keys = []
+        for dimension in cls.DIMENSIONS:
+            # Mentors have no class
+            if dimension == 'class_status' and values['participant'] == Application.P_MENTOR:
+                continue
+            value = values[dimension]
+            keys.append((dimension, '' if value is None else str(value), values['status']))
+        return keys
+
+    @classmethod
+    def track(cls, removed=(), added=()):
+        """
+        Applies the changes of many applications at once: one INSERT for the new counters and one UPDATE for all.
+        :param removed: FIELDS dicts of the applications as they were
+        :param added: FIELDS dicts of the applications as they are now
+        """
+        deltas = Counter()
+        for values in removed:
+            deltas.subtract(cls.keys(values))
+        for values in added:
+            deltas.update(cls.keys(values))
+        deltas = {key: delta for key, delta in deltas.items() if delta}
+        if not deltas:
+            return
+        cls.objects.bulk_create([cls(dimension=dimension, value=value, status=status)
+                                 for dimension, value, status in deltas], ignore_conflicts=True)
+        keys = list(deltas)
+        # Chunked so that bulk changes stay within the query parameters limit of the database
+        for start in range(0, len(keys), cls.UPDATE_BATCH_SIZE):
+            conditions = {key: Q(dimension=key[0], value=key[1], status=key[2])
+                          for key in keys[start:start + cls.UPDATE_BATCH_SIZE]}
+            lookup = Q()
+            for condition in conditions.values():
+                lookup |= condition
+            cls.objects.filter(lookup).update(count=F('count') + Case(
+                *[When(condition, then=Value(deltas[key])) for key, condition in conditions.items()],
+                default=Value(0), output_field=IntegerField()))
+
+    @classmethod
+    def set_status(cls, queryset, status, **values):
+        """
+        Moves every application of the queryset to status (and sets values) in bulk, keeping the counters right. Must
+        run in a transaction: the rows are locked first, so the ids returned are exactly the applications updated even
+        when two processes change the same applications at once.
+        :return: dict id of each application updated -> date of its previous status update
+        """
+        previous = list(queryset.select_for_update().values('pk', 'status_update_date', *cls.FIELDS))
+        updated = {}
+        for application in previous:
+            updated[application.pop('pk')] = application.pop('status_update_date')
+        ids = list(updated)
+        # A single UPDATE unless the database limits the number of query parameters
+        batch_size = connection.ops.bulk_batch_size(['pk'], ids) or 1
+        for start in range(0, len(ids), batch_size):
+            Application.objects.filter(pk__in=ids[start:start + batch_size]) \
+                .update(status=status, status_update_date=timezone.now(), **values)
+        cls.track(removed=previous, added=[dict(application, status=status) for application in previous])
+        return updated
+
+    @classmethod
+    def counts(cls, dimension, statuses=None):
+        """
+        :param statuses: statuses of the applications counted, all of them when None
+        :return: dict value -> number of applications
+        """
+        counters = cls.objects.filter(dimension=dimension, count__gt=0)
+        if statuses is not None:
+            counters = counters.filter(status__in=statuses)
+        result = Counter()
+        for value, count in counters.values_list('value', 'count'):
+            result[value] += count
+        return dict(result)
+
+    @classmethod
+    def rebuild(cls):
+        """Recomputes every counter from the applications table"""
+        counters = Counter()
+        for values in Application.objects.order_by().values(*cls.FIELDS).annotate(count=models.Count('pk')):
+            for key in cls.keys(values):
+                counters[key] += values['count']
+        with transaction.atomic():
+            cls.objects.all().delete()
+            cls.objects.bulk_create([cls(dimension=dimension, value=value, status=status, count=count)
+                                     for (dimension, value, status), count in counters.items()])
+        return len(counters)
+
+
+class StatsSnapshot(models.Model):
+    """
+    Counts recorded periodically by the record_stats_snapshot command, one row per dimension and value for each time
+    bucket, so that trends over any range are read straight from this table.
+    """
+    DIMENSIONS = ('status', 'diet', 'tshirt_size', 'checkin')
+    # Statuses of the applications counted in the diet and shirt snapshots
+    GOING = (Application.CONFIRMED, Application.ATTENDED)
+
+    time = models.DateTimeField()
+    dimension = models.CharField(max_length=20)
+    value = models.CharField(max_length=300)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        # Also the index of the trend queries, which filter by dimension and time range
+        unique_together = ('dimension', 'time', 'value')
+
+    @classmethod
+    def current_counts(cls):
+        """:return: dict dimension -> value -> count with the current state"""
+        return {
+            'status': StatsCounter.counts('status'),
+            'diet': StatsCounter.counts('diet', cls.GOING),
+            'tshirt_size': StatsCounter.counts('tshirt_size', cls.GOING),
+            'checkin': {
+                'checked_in': CheckIn.objects.order_by().values('application_id').distinct().count(),
+                'confirmed': sum(StatsCounter.counts('status', cls.GOING).values()),
+            },
+        }
+
+    @classmethod
+    def record(cls, bucket_minutes, now=None):
+        """
+        Records the current counts in the time bucket of now, replacing any previous snapshot of the same bucket
+        :return: number of rows recorded
+        """
+        now = now or timezone.now()
+        bucket = bucket_minutes * 60
+        time = now - timedelta(seconds=int(now.timestamp()) % bucket, microseconds=now.microsecond)
+        snapshots = [cls(time=time, dimension=dimension, value=value, count=count)
+                     for dimension, counts in cls.current_counts().items() for value, count in counts.items()]
+        with transaction.atomic():
+            cls.objects.filter(time=time).delete()
+            cls.objects.bulk_create(snapshots)
+        return len(snapshots)
+
+    @classmethod
+    def trends(cls, dimension, start, end, max_points):
+        """
+        Snapshots of the dimension between start and end, evenly thinned to at most max_points.
+        :return: list of dicts with the time and the count of each value
+        """
+        points = OrderedDict()
+        for time, value, count in cls.objects.filter(dimension=dimension, time__gte=start, time__lte=end) \
+                .order_by('time').values_list('time', 'value', 'count'):
+            points.setdefault(time, {'time': time})[value] = count
+        points = list(points.values())
+        if len(points) > max_points:
+            step = len(points) / max_points
+            # Always keep the most recent snapshot
+            points = [points[int(index * step)] for index in range(max_points - 1)] + [points[-1]]
+        return points
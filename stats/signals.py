@@ -0,0 +1,36 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from applications.models import Application
+from stats.models import StatsCounter
+from stats.utils import invalidate_app_stats
+
+
+# The application stats snapshot is computed again on the next request
+@receiver(post_save, sender=Application)
+@receiver(post_delete, sender=Application)
+def app_stats_invalidate(sender, instance, *args, **kwargs):
+    invalidate_app_stats()
+
+
+# Remember what the application counted for before the save, locked so that concurrent saves count once each
+@receiver(pre_save, sender=Application)
+def stats_counter_previous(sender, instance, *args, **kwargs):
+    instance._stats_counter_previous = None
+    if instance.pk:
+        instance._stats_counter_previous = Application.objects.select_for_update().filter(pk=instance.pk) \
+            .values(*StatsCounter.FIELDS).first()
+
+
+@receiver(post_save, sender=Application)
+def stats_counter_update(sender, instance, update_fields=None, *args, **kwargs):
+    previous = getattr(instance, '_stats_counter_previous', None)
+    current = {field: getattr(instance, field) for field in StatsCounter.FIELDS}
+    if previous and update_fields:
+        current = dict(previous, **{field: current[field] for field in update_fields if field in current})
+    StatsCounter.track(removed=[previous] if previous else [], added=[current])
+
+
+@receiver(post_delete, sender=Application)
+def stats_counter_remove(sender, instance, *args, **kwargs):
+    StatsCounter.track(removed=[{field: getattr(instance, field) for field in StatsCounter.FIELDS}])
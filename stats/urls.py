@@ -5,11 +5,15 @@ from django.views.decorators.cache import cache_page
 from stats import views
 
 urlpatterns = [
-    url(r'^api/apps/$', cache_page(5 * 60)(views.app_stats_api), name='api_app_stats'),
+    url(r'^api/apps/$', views.app_stats_api, name='api_app_stats'),
     url(r'^api/reimb/$', cache_page(5 * 60)(views.reimb_stats_api), name='api_reimb_stats'),
-    url(r'^api/workshops/$', cache_page(5 * 60)(views.workshop_stats_api), name='api_workshop_stats'),
+    url(r'^api/workshops/$', views.workshop_stats_api, name='api_workshop_stats'),
+    url(r'^api/scans/$', views.scan_stats_api, name='api_scan_stats'),
+    url(r'^api/trends/$', views.trends_stats_api, name='api_trends_stats'),
     url(r'^apps/$', views.AppStats.as_view(), name='app_stats'),
+    url(r'^trends/$', views.TrendsStats.as_view(), name='trends_stats'),
     url(r'^workshops/$', views.WorkshopStats.as_view(), name='workshop_stats'),
+    url(r'^scans/$', views.ScanStats.as_view(), name='scan_stats'),
 ]
 
 if getattr(settings, 'REIMBURSEMENT_ENABLED', False):
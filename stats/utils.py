@@ -0,0 +1,184 @@
+import hashlib
+import json
+from collections import Counter, OrderedDict, defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import TruncDate, TruncMinute
+from django.utils import timezone
+
+from applications.models import Application, DraftApplication
+from points.models import PointsTransaction
+from stats.models import StatsCounter
+from workshops.models import Attendance, Workshop
+
+# The snapshot is dropped whenever an application changes, the timeout only bounds how stale the draft count can be
+APP_STATS_CACHE_KEY = 'app_stats'
+APP_STATS_CACHE_TIMEOUT = 5 * 60
+# Open workshops without a timeslot going on show the attendance of the last LIVE_WORKSHOP_MINUTES
+LIVE_WORKSHOP_MINUTES = 120
+# Degrees with fewer applications are grouped in 'Other'
+MIN_MAJOR_APPLICATIONS = 5
+
+ATTENDED = (Application.ATTENDED,)
+CONFIRMED = (Application.CONFIRMED,)
+FIRST_TIMER = ((True, True), (False, False))
+
+# Result key, counter dimension, display key and name of each value, choices and statuses counted (None for all)
+CHOICE_COUNTS = (
+    ('status', 'status', 'status_name', Application.STATUS, None),
+    ('gender', 'gender', 'gender_name', Application.GENDERS, None),
+    ('gender_attended', 'gender', 'gender_name', Application.GENDERS, ATTENDED),
+    # Mentors are not counted in the class_status dimension
+    ('class', 'class_status', 'class_name', Application.CLASSSTATUS, None),
+    ('class_attended', 'class_status', 'class_name', Application.CLASSSTATUS, ATTENDED),
+    ('hearabout_count', 'hearabout', None, Application.HEARABOUT, None),
+    ('attendance_type_count', 'attendance_type', None, Application.ATTENDANCE, None),
+    ('firsttimer_count', 'first_timer', None, FIRST_TIMER, None),
+    ('firsttimer_count_attended', 'first_timer', None, FIRST_TIMER, ATTENDED),
+    # Shirt sizes are shown with their names
+    ('shirt_count', 'tshirt_size', 'tshirt_size', Application.TSHIRT_SIZES, None),
+    ('shirt_count_confirmed', 'tshirt_size', 'tshirt_size', Application.TSHIRT_SIZES, CONFIRMED),
+    ('diet', 'diet', None, Application.DIETS, None),
+    ('diet_confirmed', 'diet', None, Application.DIETS, CONFIRMED),
+)
+
+NO_HARDWARE = ('N/A', 'na', 'NA', 'n/a', 'None', 'Nothing')
+
+
+def load_counters():
+    """:return: dict dimension -> status -> value -> number of applications, from the stats counters"""
+    counters = defaultdict(lambda: defaultdict(dict))
+    for dimension, value, status, count in StatsCounter.objects.filter(count__gt=0) \
+            .values_list('dimension', 'value', 'status', 'count'):
+        counters[dimension][status][value] = count
+    return counters
+
+
+def sum_counters(counters, dimension, statuses=None):
+    result = Counter()
+    for status, values in counters[dimension].items():
+        if statuses is None or status in statuses:
+            result.update(values)
+    return result
+
+
+def choice_counts(counters):
+    """Every count of CHOICE_COUNTS, in the order of the choices"""
+    result = {'app_count': sum(sum_counters(counters, 'status').values())}
+    for key, dimension, display_key, choices, statuses in CHOICE_COUNTS:
+        counts = sum_counters(counters, dimension, statuses)
+        result[key] = []
+        for value, name in choices:
+            if not counts.get(str(value)):
+                continue
+            entry = {dimension: value, 'applications': counts[str(value)]}
+            if display_key:
+                entry[display_key] = name
+            result[key].append(entry)
+    return result
+
+
+def major_counts(counters, statuses=None):
+    """Applications per degree, the ones with few applications are grouped in 'Other'"""
+    majors = sum_counters(counters, 'degree', statuses)
+    counts = [{'degree': degree, 'applications': count} for degree, count in majors.items()
+              if count > MIN_MAJOR_APPLICATIONS]
+    other = sum(majors.values()) - sum(major['applications'] for major in counts)
+    counts.append({'degree': 'Other', 'applications': other})
+    return counts
+
+
+def free_text():
+    """Other diets of the confirmed applications and hardware requests, from a single query"""
+    has_hardware = Q(hardware__isnull=False)
+    for value in NO_HARDWARE:
+        has_hardware &= ~Q(hardware__icontains=value)
+    other_diets, hardware = [], []
+    for status, other_diet, hardware_request in Application.objects \
+            .filter(Q(status=Application.CONFIRMED) | has_hardware) \
+            .values_list('status', 'other_diet', 'hardware').iterator():
+        if status == Application.CONFIRMED and other_diet:
+            other_diets.append(other_diet)
+        if hardware_request and not any(value.lower() in hardware_request.lower() for value in NO_HARDWARE):
+            hardware.append(hardware_request)
+    return '<br>'.join(other_diets), '<br>'.join(hardware)
+
+
+def compute_app_stats():
+    counters = load_counters()
+    stats = choice_counts(counters)
+    stats['major_count'] = major_counts(counters)
+    stats['major_count_attended'] = major_counts(counters, ATTENDED)
+    stats['other_diet'], stats['hardware'] = free_text()
+    stats['timeseries'] = list(Application.objects.order_by().annotate(date=TruncDate('submission_date'))
+                               .values('date').annotate(applications=Count('pk')))
+    stats['draft_app_count'] = DraftApplication.objects.count()
+    return stats
+
+
+def get_app_stats():
+    """
+    Application statistics snapshot, shared by every organizer through the cache.
+    :return: dict with the stats in 'data' and an 'etag' that only changes when the stats do
+    """
+    snapshot = cache.get(APP_STATS_CACHE_KEY)
+    if snapshot is None:
+        data = compute_app_stats()
+        content = json.dumps(data, cls=DjangoJSONEncoder, sort_keys=True)
+        data['update_time'] = timezone.now()
+        snapshot = {'etag': '"%s"' % hashlib.md5(content.encode('utf-8')).hexdigest(), 'data': data}
+        cache.set(APP_STATS_CACHE_KEY, snapshot, APP_STATS_CACHE_TIMEOUT)
+    return snapshot
+
+
+def invalidate_app_stats():
+    # Deleted once committed, otherwise a request in the meantime could cache the stats as they were before the change
+    transaction.on_commit(lambda: cache.delete(APP_STATS_CACHE_KEY))
+
+
+def get_workshop_stats():
+    """
+    Attendance and points awarded of every workshop, attendance per timeslot and attendance per minute of the
+    workshops going on. Takes the same few queries no matter how many workshops there are.
+    """
+    now = timezone.now()
+    workshops = list(Workshop.annotate_stats(Workshop.objects.order_by('pk'))
+                     .values('id', 'title', 'host', 'location', 'open', 'points', 'attendance_count', 'slot_id',
+                             'slot_start', 'slot_end'))
+    points = PointsTransaction.workshop_totals()
+    timeslots = OrderedDict()
+    live = {}
+    # Timeslots in chronological order
+    for workshop in sorted(workshops, key=lambda workshop: workshop['slot_start'] or now):
+        workshop['attendance'] = workshop.pop('attendance_count')
+        workshop['points_awarded'] = points.get(workshop['id'], 0)
+        if workshop['slot_id']:
+            timeslot = timeslots.setdefault(workshop['slot_id'], {
+                'id': workshop['slot_id'], 'start': workshop['slot_start'], 'end': workshop['slot_end'],
+                'attendance': 0, 'workshops': []
+            })
+            timeslot['attendance'] += workshop['attendance']
+            timeslot['workshops'].append(workshop['title'])
+        if workshop['slot_start'] and workshop['slot_start'] <= now <= workshop['slot_end']:
+            live[workshop['id']] = workshop['slot_start']
+        elif workshop['open']:
+            live[workshop['id']] = now - timedelta(minutes=LIVE_WORKSHOP_MINUTES)
+    per_minute = defaultdict(list)
+    if live:
+        for workshop_id, minute, attendance in Attendance.objects \
+                .filter(workshop_id__in=list(live), time__gte=min(live.values())) \
+                .annotate(minute=TruncMinute('time')).order_by().values('workshop_id', 'minute') \
+                .annotate(attendance=Count('pk')).order_by('minute') \
+                .values_list('workshop_id', 'minute', 'attendance'):
+            if minute >= live[workshop_id].replace(second=0, microsecond=0):
+                per_minute[workshop_id].append({'minute': minute, 'attendance': attendance})
+    return {
+        'workshops': workshops,
+        'timeslots': list(timeslots.values()),
+        'live': [{'id': workshop['id'], 'title': workshop['title'], 'per_minute': per_minute[workshop['id']]}
+                 for workshop in workshops if workshop['id'] in live],
+    }
@@ -142,8 +142,8 @@ class User(AbstractBaseUser):
         if not self.is_sponsor:
             return None
         domain = self.email.split('@')[1]
-        sponsor = Sponsor.objects.filter(email_domain=domain)
-        return sponsor.get_tier_value()
+        sponsor = Sponsor.objects.filter(email_domain=domain).first()
+        return sponsor.get_tier_value() if sponsor else None
 
     # Used by django auth. Please do not remove.
     @property
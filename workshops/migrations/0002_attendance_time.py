@@ -0,0 +1,24 @@
+# Generated by Django 2.2.13 on 2026-10-18 12:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workshops', '0001_initial'),
+    ]
+
+    operations = [
+        # Added without auto_now_add first, so that the existing attendances are left without a time
+        migrations.AddField(
+            model_name='attendance',
+            name='time',
+            field=models.DateTimeField(null=True),
+        ),
+        migrations.AlterField(
+            model_name='attendance',
+            name='time',
+            field=models.DateTimeField(auto_now_add=True, null=True),
+        ),
+    ]
@@ -1,6 +1,8 @@
 from datetime import timedelta
 
 from django.db import models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 
 from user.models import User
 
@@ -25,8 +27,9 @@ class Workshop(models.Model):
 
     def time_period(self):
         # Time printed is 5 hours ahead so i just adjust it manually.
-        adjusted_start = self.get_time_slot().start - timedelta(hours=5)
-        adjusted_end = self.get_time_slot().end - timedelta(hours=5)
+        timeslot = self.get_time_slot()
+        adjusted_start = timeslot.start - timedelta(hours=5)
+        adjusted_end = timeslot.end - timedelta(hours=5)
         return f'{adjusted_start.strftime("%m/%d %l:%M %p")} to {adjusted_end.strftime("%m/%d %l:%M %p")}'
 
     # Finds the timeslot associated with this workshop. Needed for tables.py !
@@ -36,6 +39,22 @@ class Workshop(models.Model):
             timeslot = Timeslot.objects.filter(workshop_two=self).first()
         return timeslot
 
+    @classmethod
+    def annotate_stats(cls, qs):
+        """
+        Adds the attendance and the id, start and end of the timeslot (same one get_time_slot returns) of each
+        workshop, so that listing workshops takes a single query.
+        """
+        annotations = {}
+        for field in ('id', 'start', 'end'):
+            slot_one = Timeslot.objects.filter(workshop_one=OuterRef('pk')).order_by('pk').values(field)[:1]
+            slot_two = Timeslot.objects.filter(workshop_two=OuterRef('pk')).order_by('pk').values(field)[:1]
+            annotations['slot_' + field] = Coalesce(Subquery(slot_one), Subquery(slot_two))
+        attendance = Attendance.objects.filter(workshop=OuterRef('pk')).order_by().values('workshop') \
+            .annotate(count=Count('pk')).values('count')
+        return qs.annotate(attendance_count=Coalesce(Subquery(attendance, output_field=models.IntegerField()), 0),
+                           **annotations)
+
 
 # Attended model not implemented yet. Ignore this for now.
 # def attended(self):
@@ -66,3 +85,6 @@ class Attendance(models.Model):
     workshop = models.ForeignKey(Workshop, null=False, on_delete=models.CASCADE)
 
     user = models.ForeignKey(User, null=False, on_delete=models.CASCADE)
+
+    # When the attendance was logged, unknown for the ones logged before it was recorded
+    time = models.DateTimeField(auto_now=False, auto_now_add=True, null=True)
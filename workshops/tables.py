@@ -9,12 +9,13 @@ class WorkshopListTable(tables.Table):
     title = tables.TemplateColumn(
         "<a href='{% url 'workshop_detail' record.id %}'>{{ record.title }}</a> ")
     # starts = tables.DateTimeColumn(accessor='get_time_slot', verbose_name='Starts', format='d/m G:i')
+    # Annotated by Workshop.annotate_stats
     start = tables.TemplateColumn(
-        "{{ record.get_time_slot.start }}",
+        "{{ record.slot_start }}",
         orderable=False
     )
     end = tables.TemplateColumn(
-        "{{ record.get_time_slot.end }}",
+        "{{ record.slot_end }}",
         orderable=False,
     )
     update = tables.TemplateColumn(
@@ -94,6 +94,9 @@ class WorkshopList(IsVolunteerMixin, TabsViewMixin, SingleTableMixin, FilterView
     filterset_class = WorkshopListFilter
     table_pagination = {'per_page': 100}
 
+    def get_queryset(self):
+        return Workshop.annotate_stats(Workshop.objects.all())
+
 
 ## TODO:
 # Make a better message for users when workshop/timeslot is not found.
@@ -102,26 +105,24 @@ class WorkshopDetail(IsVolunteerMixin, DetailView):
     model = Workshop
     template_name = 'workshop_detail.html'
 
+    def get_queryset(self):
+        return Workshop.annotate_stats(Workshop.objects.all())
+
     def get_context_data(self, **kwargs):
         context = super(WorkshopDetail, self).get_context_data(**kwargs)
         workshop = kwargs['object']
-        # Since workshop is a ForeignKey in timeslot, the start and end attributes are retrieved from
-        # the timeslot model.
-        # There should only be two workshops per timeslot. Gets the timeslot related to the given workshop.
-        timeslot = workshop.workshop_one_set.first() or workshop.workshop_two_set.first()
-        # Recieves the total amount of people that attended this workshop
-        attendance = workshop.attendance_set.count()
+        # The start and end of its timeslot and the attendance are annotated by get_queryset
         # TODO: Make this statement more descriptive.
-        if not workshop or not timeslot:
+        if not workshop or not workshop.slot_id:
             raise Http404
         context.update({
             'title': workshop.title,
             'description': workshop.description,
             'location': workshop.location,
             'host': workshop.host,
-            'start': timeslot.start,
-            'end': timeslot.end,
-            'attendance': attendance,  # This is an int
+            'start': workshop.slot_start,
+            'end': workshop.slot_end,
+            'attendance': workshop.attendance_count,  # This is an int
         })
         return context
 